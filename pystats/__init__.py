@@ -20,6 +20,16 @@ try:
 except Exception:
     from app.pystats_app import PyStatsApp
 
+try:
+    from pystats.results.result_cache import ResultCache
+except Exception:
+    from results.result_cache import ResultCache
+
+# >> for module, stats in pystats.analyze_sources([('mod.py', source_text)], cache=ResultCache()): ...
+analyze_sources = PyStatsApp.analyze_sources
+
+__all__ = ['PyStatsApp', 'analyze_sources', 'ResultCache']
+
 
 # paths = PyStatsApp(verbose=True).getReports(packagename_path=[
 # '/Users/yutahayashi/VisualStudioProjects/ModuleAnalyzer/pystats',
@@ -28,8 +38,8 @@ except Exception:
 # paths = PyStatsApp(verbose=True).run(
 #             '/Users/yutahayashi/VisualStudioProjects/ModuleAnalyzer/pystats',
 #         )
-paths = PyStatsApp(verbose=True).getReports(
-            '/Users/yutahayashi/VisualStudioProjects/ModuleAnalyzer/pystats',
-        )
+# paths = PyStatsApp(verbose=True).getReports(
+#             '/Users/yutahayashi/VisualStudioProjects/ModuleAnalyzer/pystats',
+#         )
 # print(args): Namespace(input=['statistic.py'], stats=[], reports=[], output_filename=['out'], verbose=True)
 # PyStatsApp(verbose=True).printTree(['pystats'])
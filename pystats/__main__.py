@@ -12,16 +12,71 @@ import sys
 try:
     from app.pystats_app import PyStatsApp, PackageContext
     from logger.logger import Logger
+    from report import STDOUT
 # COMMANDLINE
 except Exception:
     from pystats.app.pystats_app import PyStatsApp, PackageContext
     from pystats.logger.logger import Logger
+    from pystats.report import STDOUT
 
 logger = Logger(__name__).logger
 
 
+def use_stdout(filename_base):
+    '''Moves the logs to the standard error if a report is written to the standard output.'''
+    if filename_base == STDOUT:
+        Logger.use_stream(sys.stderr)
+
+
+def merge(arguments):
+    args = PackageContext.parse_merge_args(arguments)
+    use_stdout(args.output_filename[0])
+    app = PyStatsApp(args.verbose)
+
+    app.merge(
+        args.input,
+        filename_base=args.output_filename[0],
+        report_names=args.reports,
+        snapshot=args.snapshot,
+        result_store=args.result_store
+    )
+    logger.info(f'Successfully merged the partial results in {__name__}')
+
+
+def diff(arguments):
+    args = PackageContext.parse_diff_args(arguments)
+    app = PyStatsApp(args.verbose)
+
+    app.diff(args.old, args.new, output=args.output_filename)
+
+
+def query(arguments):
+    args = PackageContext.parse_query_args(arguments)
+    app = PyStatsApp(args.verbose)
+
+    options = {}
+    if args.query != 'runs':
+        options = dict(metric=args.metric, minimum=args.minimum, kind=args.kind, path=args.path)
+    if args.query == 'blocks':
+        options.update(run_id=args.run_id, limit=args.limit)
+
+    app.query(args.store, args.query, output=args.output_filename, **options)
+
+
+COMMANDS = {
+    'merge': merge,
+    'diff': diff,
+    'query': query,
+}
+
+
 def main():
+    if sys.argv[1:2] and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
     args = PackageContext.parse_args(sys.argv[1:])
+    use_stdout(args.output_filename[0])
     logger.info(f'''Parsing arguments from command line. INPUT : {args.input},\
                     STATS: {args.stats}, REPORTS: {args.reports},
                     OUTPUT FILENAME: {args.output_filename}, VERBOSE: {args.verbose}'''
@@ -30,9 +85,17 @@ def main():
 
     app.run(
         args.input,
-        filename_base=args.output_filename,
+        filename_base=args.output_filename[0],
         stat_names=args.stats,
-        report_names=args.reports
+        report_names=args.reports,
+        shard=args.shard,
+        since=args.since,
+        cache_dir=args.cache_dir,
+        snapshot=args.snapshot,
+        memory_limit=args.memory_limit,
+        stream_threshold=args.stream_threshold,
+        result_store=args.result_store,
+        jobs=args.jobs
     )
     logger.info(f'Successfully finished the job in {__name__}')
 
@@ -7,23 +7,61 @@ In a package, we can write imports either relative to the package `pystats`,
   or relative to this file using `.`.
 '''
 
-from collections import defaultdict
-from functools import wraps
 import os
+import sys
+from collections import defaultdict
+from functools import partial, wraps
+from itertools import chain
 from plistlib import InvalidFileException
 
 try:
     # DEBUG
     from config.config import OUTPUT_FILENAME_BASE
+    from context.archive_context import Archive, count_unread, is_archive
     from context.package_context import PackageContext
+    from context.scheduler import Scheduler
     from utils.format_tree import DisplayablePath
     from logger.logger import Logger
+    from results.diff import diff_snapshots, render_diff
+    from results.distributions import Distributions
+    from results.packed import pack_results, unpack_results
+    from results.result_cache import ResultCache
+    from report import STDOUT, NDJSONReport
+    from report_model import ModuleEntry, ReportModel, ReportTotals
+    from statistic import Statistic
+    from results.partial import merge_partials, write_partial
+    from results.result_store import ResultStore, render_table
+    from results.snapshot import write_snapshot
+    from results.spill_store import SpillStore
+    from utils.memory import format_size
+    from utils.module_list import is_module_list, iter_module_list
+    from utils.string_table import PathList, StringTable
+    from utils.git_changes import get_added_and_deleted_files, get_changed_files, get_head, get_repo_root
+    from utils.tree_cache import DEFAULT_CACHE_DIR, load_tree_snapshot, save_tree_snapshot, walk_files
 except Exception:
     # COMMANDLINE
     from pystats.config.config import OUTPUT_FILENAME_BASE
     from pystats.logger.logger import Logger
+    from pystats.context.archive_context import Archive, count_unread, is_archive
     from pystats.context.package_context import PackageContext
+    from pystats.context.scheduler import Scheduler
     from pystats.utils.format_tree import DisplayablePath
+    from pystats.results.diff import diff_snapshots, render_diff
+    from pystats.results.distributions import Distributions
+    from pystats.results.packed import pack_results, unpack_results
+    from pystats.results.result_cache import ResultCache
+    from pystats.report import STDOUT, NDJSONReport
+    from pystats.report_model import ModuleEntry, ReportModel, ReportTotals
+    from pystats.statistic import Statistic
+    from pystats.results.partial import merge_partials, write_partial
+    from pystats.results.result_store import ResultStore, render_table
+    from pystats.results.snapshot import write_snapshot
+    from pystats.results.spill_store import SpillStore
+    from pystats.utils.memory import format_size
+    from pystats.utils.module_list import is_module_list, iter_module_list
+    from pystats.utils.string_table import PathList, StringTable
+    from pystats.utils.git_changes import get_added_and_deleted_files, get_changed_files, get_head, get_repo_root
+    from pystats.utils.tree_cache import DEFAULT_CACHE_DIR, load_tree_snapshot, save_tree_snapshot, walk_files
 
 
 logger = Logger(__name__).logger
@@ -38,6 +76,18 @@ class PyStatsApp:
         self.modules = []
         self.stats = defaultdict(list)
         self.verbose = verbose
+        self.num_modules = None
+        # The path of the root of each tree in `tree_markdown`, relative to the working directory
+        self.tree_roots = []
+        self.distributions = None
+        # The `ReportTotals` gathered by `analyze`
+        self.totals = None
+        # Whether only the modules changed since a commit were analyzed (`--since`)
+        self.changed_only = False
+        self.peak_rss = None
+        self.scheduler = None
+        # The run's `StringTable`, interning paths and signatures
+        self.strings = None
 
     def __repr__(self):
         return (
@@ -173,12 +223,247 @@ class PyStatsApp:
             with open(absolute_report_path, mode='w') as f:
                 f.write('hello!')
 
+    def discover(self, pypackage_paths):
+        '''
+        Finds the Python modules to analyze.
+
+        Args:
+        - pypackage_paths: A list of package directories, archives (wheels, sdists, zip files),
+          module filenames and/or module lists (`@FILE` or `-`, see `module_list`).
+
+        Returns:
+        - (module_paths, tree): The module filenames (a `PathList`), and the Markdown tree lines of each package.
+          Module lists are not read here: `module_paths` is then an iterator reading them as it goes.
+          The modules of an archive are `ArchiveMember`s, listed from the archive's index.
+          The root of each tree is recorded in `self.tree_roots`.
+        '''
+        parts = []
+        tree = []
+        self.tree_roots = []
+        for pypackage_path in pypackage_paths:
+            if is_module_list(pypackage_path):
+                parts.append(iter_module_list(pypackage_path))
+                continue
+            if is_archive(pypackage_path):
+                archive = Archive(pypackage_path)
+                tree.extend(archive.get_markdown_tree())
+                self.tree_roots.append(os.path.relpath(pypackage_path, os.getcwd()))
+                parts.append(archive.modules())
+                continue
+
+            if not parts or not isinstance(parts[-1], PathList):
+                parts.append(PathList(strings=self.strings))
+            if os.path.isdir(pypackage_path):
+                root = os.path.relpath(pypackage_path, os.getcwd())
+                tree.extend(self.getMarkdownPath(root))
+                self.tree_roots.append(root)
+                parts[-1].extend(self.getPaths(pypackage_path))
+            else:
+                parts[-1].append(pypackage_path)
+
+        if not parts:
+            return PathList(strings=self.strings), tree
+        if len(parts) == 1 and isinstance(parts[0], PathList):
+            return parts[0], tree
+        return chain.from_iterable(parts), tree
+
+    def get_tree_snapshot(self, pypackage_path, cache_dir=DEFAULT_CACHE_DIR):
+        '''
+        Returns the snapshot of a full walk of `pypackage_path` (see `tree_cache`).
+
+        A cached snapshot is reused as long as git reports no file of the package (module or not)
+        added or deleted since it was taken; otherwise the package is walked again and the cache refreshed.
+        Git does not see empty directories: adding or removing one does not refresh the snapshot.
+        '''
+        package_root = os.path.realpath(pypackage_path)
+        snapshot = load_tree_snapshot(cache_dir, package_root)
+
+        if snapshot is not None:
+            cached = {os.path.join(package_root, f) for f in snapshot['files']}
+            try:
+                added, deleted = get_added_and_deleted_files(snapshot['commit'], package_root)
+            except ValueError:
+                # e.g. the cached commit no longer exists
+                added, deleted = None, None
+
+            if added is not None and not any(
+                path.startswith(package_root + os.sep) and (path in added) != (path in cached)
+                for path in added | deleted
+            ):
+                return snapshot
+
+        if self.verbose:
+            logger.info(f'Walking {pypackage_path} to refresh the cached tree snapshot')
+
+        module_paths = [str(path) for path in self.getPaths(pypackage_path)]
+        modules = [os.path.relpath(os.path.realpath(path), package_root) for path in module_paths]
+        return save_tree_snapshot(
+            cache_dir,
+            package_root,
+            self.getMarkdownPath(os.path.relpath(pypackage_path, os.getcwd())),
+            modules,
+            [m for m, path in zip(modules, module_paths) if os.path.getsize(path) > 0],
+            get_head(package_root),
+            walk_files(package_root),
+        )
+
+    def discover_changed(self, pypackage_paths, since, cache_dir=DEFAULT_CACHE_DIR):
+        '''
+        Finds the Python modules changed between the git revision `since` and the working tree.
+
+        The tree and the module count of each package come from its cached full snapshot,
+        so only the changed modules need to be read. The changed files are asked once
+        to each git repository holding some of `pypackage_paths`.
+
+        Returns:
+        - (module_paths, tree, num_modules): The changed module filenames, the Markdown tree
+          lines of each package, and the number of (non-empty) modules in all packages.
+          The root of each tree is recorded in `self.tree_roots`.
+        '''
+        module_paths = PathList(strings=self.strings)
+        tree = []
+        self.tree_roots = []
+        num_modules = 0
+        changed = set()
+        # The root of the repository holding each directory, asked once per directory
+        repo_roots = {}
+        # Modules listed in `@FILE` or `-` count as modules given one by one
+        pypackage_paths = chain.from_iterable(
+            iter_module_list(path) if is_module_list(path) else [path] for path in pypackage_paths
+        )
+        for pypackage_path in pypackage_paths:
+            directory = os.path.abspath(pypackage_path)
+            if not os.path.isdir(directory):
+                directory = os.path.dirname(directory)
+            if directory not in repo_roots:
+                root = get_repo_root(directory)
+                if root not in repo_roots.values():
+                    changed.update(get_changed_files(since, root))
+                repo_roots[directory] = root
+
+            if os.path.isdir(pypackage_path):
+                package_root = os.path.realpath(pypackage_path)
+                snapshot = self.get_tree_snapshot(pypackage_path, cache_dir=cache_dir)
+                tree.extend(snapshot['tree'])
+                self.tree_roots.append(os.path.relpath(pypackage_path, os.getcwd()))
+
+                nonempty = set(snapshot['nonempty'])
+                for module in snapshot['modules']:
+                    path = os.path.join(package_root, module)
+                    if path in changed:
+                        module_paths.append(path)
+                        if os.path.getsize(path) > 0:
+                            nonempty.add(module)
+                        else:
+                            nonempty.discard(module)
+                num_modules += len(nonempty)
+            else:
+                num_modules += 1
+                if os.path.realpath(pypackage_path) in changed:
+                    module_paths.append(pypackage_path)
+
+        if self.verbose:
+            logger.info(f'{len(module_paths)} of {num_modules} module(s) changed since {since}')
+
+        return module_paths, tree, num_modules
+
+    def write_snapshot(self, snapshot_filename):
+        '''Saves the numeric results of the analyzed modules as a snapshot (see `diff`).'''
+        write_snapshot(snapshot_filename, self.modules, self.stats)
+        if self.verbose:
+            logger.info(f'Saved snapshot to "{snapshot_filename}".')
+
+    def store_results(self, result_store_filename, model, label=None):
+        '''Adds the results in `model` (a `ReportModel`) as a new run of the SQLite result store.'''
+        with ResultStore(result_store_filename) as result_store:
+            run_id = result_store.add_run(model, label=label)
+        if self.verbose:
+            logger.info(f'Saved results as run {run_id} of "{result_store_filename}".')
+
+    def query(self, result_store_filename, query_name, output=None, **options):
+        '''
+        Writes the answer to `query_name` (one of `QUERIES`) on the SQLite result store
+        as a Markdown table to `output`, or prints it if `output` is None.
+
+        `options` are passed on to the `ResultStore` method of the same name.
+        '''
+        if not os.path.exists(result_store_filename):
+            raise FileNotFoundError(f'No result store: {result_store_filename}')
+
+        with ResultStore(result_store_filename) as result_store:
+            if query_name == 'runs':
+                columns, rows = result_store.runs()
+            else:
+                columns, rows = getattr(result_store, query_name)(**options)
+        lines = render_table(columns, rows)
+
+        if output is None:
+            for line in lines:
+                print(line)
+            return
+
+        with open(output, 'w') as f:
+            for line in lines:
+                f.write(line + '\n')
+        if self.verbose:
+            logger.info(f'Saved query results to "{output}".')
+
+    def diff(self, old_snapshot, new_snapshot, output=None):
+        '''
+        Writes a Markdown report of what changed between two snapshots to `output`,
+        or prints it if `output` is None.
+        '''
+        lines = render_diff(diff_snapshots(old_snapshot, new_snapshot))
+
+        if output is None:
+            for line in lines:
+                print(line)
+            return
+
+        with open(output, 'w') as f:
+            for line in lines:
+                f.write(line + '\n')
+        if self.verbose:
+            logger.info(f'Saved diff to "{output}".')
+
+    @staticmethod
+    def get_requested_stats(stat_names=None):
+        '''Returns the `Statistic` classes named in `stat_names`, or the default stats.'''
+        if stat_names:
+            return [s for s in PackageContext.AVAILABLE_STATS if s.name() in stat_names]
+        return PackageContext.DEFAULT_STATS
+
+    @staticmethod
+    def get_requested_reports(report_names, filename_base=OUTPUT_FILENAME_BASE):
+        '''
+        Returns the `Report` classes named in `report_names`, or the default reports.
+
+        Only one report can be written to the standard output (`filename_base` is `STDOUT`).
+        '''
+        if report_names:
+            requested_reports = [
+                r for r in PackageContext.AVAILABLE_REPORTS
+                if r.name() in report_names
+            ]
+        else:
+            requested_reports = PackageContext.DEFAULT_REPORTS
+
+        if filename_base == STDOUT and len(requested_reports) > 1:
+            raise ValueError(
+                'only one report can be written to the standard output: '
+                f'got {", ".join(r.name() for r in requested_reports)}'
+            )
+
+        return requested_reports
+
     def write_report(
         self,
         ComputedReport,
         stats,
         tree,
-        filename_base=OUTPUT_FILENAME_BASE
+        filename_base=OUTPUT_FILENAME_BASE,
+        model=None,
+        **options
     ):
         '''
         Generates a report of type `ComputedReport` and writes it to disk.
@@ -186,13 +471,15 @@ class PyStatsApp:
         Args:
         - ComputedReport: A class that inherits from `Report`.
         - stats: A dict mapping `ParsedFile`s to a list of `Stat`s generated from it.
+        - model: The run's `ReportModel`, shared by every report (built if None).
+        - options: Keyword arguments of `ComputedReport`, e.g. `modules_written` of `NDJSONReport`.
 
         Returns:
         - None (Writes the report file to disk.)
         '''
-        report = ComputedReport(self.modules, stats, tree)
+        report = ComputedReport(self.modules, stats, tree, num_modules=self.num_modules, model=model, **options)
 
-        out_filename = filename_base + report.file_extension()
+        out_filename = 'stdout' if filename_base == STDOUT else filename_base + report.file_extension()
 
         # Write the report to disk.
         try:
@@ -224,29 +511,56 @@ class PyStatsApp:
         filename_base=OUTPUT_FILENAME_BASE,
         stat_names=[],
         report_names=[],
-        package_stats_names=[]
+        package_stats_names=[],
+        shard=None,
+        since=None,
+        cache_dir=DEFAULT_CACHE_DIR,
+        snapshot=None,
+        memory_limit=None,
+        stream_threshold=PackageContext.STREAM_THRESHOLD,
+        result_store=None,
+        jobs=1
     ):
         '''
         Parses each Python file/module, computes each `stats` statistic per module,
         then generates each of the `reports`.
+
+        `pypackage_paths` is a package directory, a module, or a list of them, where a
+        module list (`@FILE`, or `-` for the standard input) is read as the modules are parsed.
+        If `shard` is given as (i, N), only the i-th of N size-balanced parts of the
+        discovered modules is analyzed, and a partial result file is written instead
+        of the reports. Use `merge` to generate the reports from all partial results.
+        If `since` is a git revision, only the modules changed between it and the working
+        tree are analyzed; the tree and module count come from a snapshot cached in `cache_dir`.
+        If `snapshot` is a filename, the numeric results are also saved there (see `diff`).
+        If `memory_limit` is a number of bytes, results are spilled to a temporary on-disk store
+        whenever the process reaches it, and read back when the reports are written.
+        Modules of at least `stream_threshold` bytes are parsed in a single streaming pass.
+        If `result_store` is a filename, the results are also added as a run to that SQLite store (see `query`).
+        If `jobs` is more than 1, modules are parsed and their stats computed in that many worker processes.
+        An `NDJSONReport` written alone to the standard output gets the records of each module as it is analyzed.
         '''
-        self.tree_markdown = self.getMarkdownPath(os.path.relpath(pypackage_paths, os.getcwd()))
+        if isinstance(pypackage_paths, str):
+            pypackage_paths = [pypackage_paths]
+
+        self.strings = StringTable()
+        self.changed_only = bool(since)
+        if since:
+            module_paths, self.tree_markdown, self.num_modules = self.discover_changed(
+                pypackage_paths,
+                since,
+                cache_dir=cache_dir
+            )
+        else:
+            module_paths, self.tree_markdown = self.discover(pypackage_paths)
+            if (shard or jobs > 1) and not isinstance(module_paths, PathList):
+                # Balancing work needs every module's size up front
+                module_paths = list(module_paths)
 
         # Map each
-        if stat_names:
-            requested_stats = [
-                s for s in PackageContext.AVAILABLE_STATS if s.name() in stat_names
-            ]
-        else:
-            requested_stats = PackageContext.AVAILABLE_STATS
+        requested_stats = self.get_requested_stats(stat_names)
 
-        if report_names:
-            requested_reports = [
-                r for r in PackageContext.AVAILABLE_REPORTS
-                if r.name() in report_names
-            ]
-        else:
-            requested_reports = PackageContext.AVAILABLE_REPORTS
+        requested_reports = self.get_requested_reports(report_names, filename_base)
 
         if package_stats_names:
             requested_stats_name = [
@@ -255,25 +569,25 @@ class PyStatsApp:
         else:
             requested_stats_name = PackageContext.PACKAGE_STATS
 
-        # scenario when its package
-        if PackageContext.is_package(pypackage_paths):
-            module_paths = self.getPaths(pypackage_paths)
-
-        # "Parse Module": store in ParsedFile class
+        shard_info = None
+        if shard:
+            shard_index, num_shards = shard
+            num_discovered = len(module_paths)
+            assigned = PackageContext.partition_modules(module_paths, shard_index, num_shards)
+            module_indexes = [i for i, _ in assigned]
+            module_paths = [path for _, path in assigned]
+            # Archives are closed after the last of their members in this shard
+            count_unread(module_paths)
+            shard_info = (shard_index, num_shards, module_indexes, module_paths, num_discovered)
+
+        # "Parse Module" and "Compute Stats" one module at a time
         # module_paths is a collection of filenames: [file1, file2...]
-        self.modules = PackageContext.parse_modules(
-            filenames=module_paths,
-            verbose=self.verbose
-        )
-
-        if self.verbose:
-            logger.info(f'Parsed {len(self.modules)} Python module(s)')
-
-        # 2. COMPUTE STATS
-        # Maps each `ParsedFile` to a list of `Statistic`s.
-        for module in self.modules:
-            for ComputedStat in requested_stats:
-                self.stats[module].append(ComputedStat(module))
+        store = SpillStore(memory_limit) if memory_limit else None
+        stream_file = None
+        if filename_base == STDOUT and not shard and requested_reports == [NDJSONReport]:
+            stream_file = sys.stdout
+        self.analyze(module_paths, requested_stats, store=store, stream_threshold=stream_threshold, jobs=jobs,
+                     stream_file=stream_file)
 
         # package directory list for Package statistics
         # package_stats_name inherits from the args
@@ -281,6 +595,60 @@ class PyStatsApp:
             for stats in requested_stats_name:
                 self.pkgstats['PackageStats'].append(stats(self.dir_list))
 
+        try:
+            self.save_results(
+                requested_reports,
+                filename_base,
+                snapshot=snapshot,
+                shard=shard_info,
+                result_store=result_store,
+                label=' '.join(str(path) for path in pypackage_paths),
+                modules_written=stream_file is not None
+            )
+        finally:
+            if store is not None:
+                self.report_memory(store)
+                store.close()
+
+    def save_results(self, requested_reports, filename_base, snapshot=None, shard=None,
+                     result_store=None, label=None, modules_written=False):
+        '''
+        Writes the partial result file of a shard, or the snapshot, the run in `result_store`
+        (labeled `label`) and each of the reports.
+        If `modules_written` is True, the module records of the `NDJSONReport` were already written by `analyze`.
+
+        `shard` is (shard_index, num_shards, module_indexes, module_paths, num_discovered), where
+        `module_indexes` are the positions of the shard's `module_paths` among all discovered modules.
+        '''
+        if shard:
+            shard_index, num_shards, module_indexes, module_paths, num_discovered = shard
+            # Modules without lines are skipped by parse_modules, so map indexes by filename
+            index_of = {str(path).strip(): i for i, path in zip(module_indexes, module_paths)}
+            partial_filename = f'{filename_base}.shard-{shard_index}-of-{num_shards}.json'
+            write_partial(
+                partial_filename,
+                self.modules,
+                self.stats,
+                [index_of[module.filename] for module in self.modules],
+                self.tree_markdown,
+                shard_index,
+                num_shards,
+                num_assigned=len(module_indexes),
+                num_discovered=num_discovered,
+                distributions=self.distributions,
+                roots=self.tree_roots,
+            )
+            if self.verbose:
+                logger.info(f'Saved shard {shard_index}/{num_shards} results to "{partial_filename}".')
+            return
+
+        if snapshot:
+            self.write_snapshot(snapshot)
+
+        model = self.build_report_model()
+        if result_store:
+            self.store_results(result_store, model, label=label)
+
         # Generate Reports
         for ComputedReport in requested_reports:
             logger.info(f'parsing {ComputedReport.name()}')
@@ -289,5 +657,233 @@ class PyStatsApp:
                 ComputedReport,
                 self.stats,
                 self.tree_markdown,
-                filename_base=filename_base
+                filename_base=filename_base,
+                model=model,
+                **({'modules_written': True} if modules_written else {})
+            )
+
+    def build_report_model(self):
+        '''
+        Returns the `ReportModel` of the results, built once and shared by every report.
+
+        Results spilled to a `SpillStore` are read back for each report instead of being kept.
+        '''
+        return ReportModel(
+            self.modules,
+            self.stats,
+            self.tree_markdown,
+            num_modules=self.num_modules,
+            cache=not isinstance(self.stats, SpillStore),
+            distributions=self.distributions,
+            roots=self.tree_roots,
+            totals=self.totals,
+            changed_only=self.changed_only
+        )
+
+    @staticmethod
+    def compute_stats(module, requested_stats, shared_stats):
+        '''
+        Returns the list of `requested_stats` computed on `module`.
+
+        Content-only stats are computed once per unique module content, and kept in `shared_stats`.
+        '''
+        stats = []
+        for ComputedStat in requested_stats:
+            if ComputedStat.CONTENT_ONLY and module.content_hash is not None:
+                key = (module.content_hash, ComputedStat)
+                if key not in shared_stats:
+                    shared_stats[key] = ComputedStat(module)
+                stats.append(shared_stats[key])
+            else:
+                stats.append(ComputedStat(module))
+
+        return stats
+
+    @staticmethod
+    def analyze_sources(sources, stat_names=None, cache=None):
+        '''
+        Parses each (name, source) of `sources` in memory, and computes the stats named in `stat_names` on it
+        (the default stats if None). No file is read or written.
+
+        `name` stands for the module's filename, and `source` is its text (or raw `bytes`).
+        `sources` can be any iterable, e.g. a generator reading them from a VCS.
+        `cache` is a `ResultCache` kept across calls: contents it has seen are neither parsed
+        nor computed again, and come back as a `ModuleResult` and `StatisticResult`s.
+        Within a call, identical contents share their parse and content-only stats among
+        the last `PackageContext.MAX_SHARED_SOURCES` distinct contents only.
+
+        Yields:
+            (module, stats) for each non-empty source, as soon as its stats are computed:
+            the `ParsedFile`, and the list of `Statistic`s computed on it.
+
+        Example:
+            >>> for module, stats in analyze_sources([('pkg/mod.py', 'def f():\n    pass\n')]):
+            ...     print(module.filename, [stat.function_values for stat in stats])
+        '''
+        requested_stats = PyStatsApp.get_requested_stats(stat_names)
+        if cache is not None and not ResultCache.is_cacheable(requested_stats):
+            cache = None
+
+        shared_stats = {}
+        for module in PackageContext.iter_sources(sources):
+            # Parsing is lazy: a cache hit never scans the module's blocks
+            cached = cache.get(module, requested_stats) if cache is not None else None
+            if cached is not None:
+                yield cached
+                continue
+
+            stats = PyStatsApp.compute_stats(module, requested_stats, shared_stats)
+            while len(shared_stats) > PackageContext.MAX_SHARED_SOURCES * len(requested_stats):
+                # Dicts keep insertion order: drop the oldest stats
+                del shared_stats[next(iter(shared_stats))]
+            if cache is not None:
+                cache.put(module, stats)
+            yield module, stats
+
+    @staticmethod
+    def analyze_chunk(filenames, requested_stats, lines_needed, stream_threshold):
+        '''
+        Parses each of `filenames` and computes each of `requested_stats` on it, in a worker process.
+
+        Returns:
+            The results packed by `pack_results`: for each filename, the module and its stats
+            without source lines, or None if the module is empty.
+        '''
+        parsed_by_hash = {}
+        shared_stats = {}
+        results = []
+        for filename in filenames:
+            modules = PackageContext.iter_modules(
+                [filename],
+                parsed_by_hash=parsed_by_hash,
+                lines_needed=lines_needed,
+                stream_threshold=stream_threshold
+            )
+            module = next(modules, None)
+            results.append(None if module is None else
+                           (module, PyStatsApp.compute_stats(module, requested_stats, shared_stats)))
+
+        return pack_results(results)
+
+    def analyze(self, module_paths, requested_stats, store=None, stream_threshold=None, jobs=1, stream_file=None):
+        '''
+        Parses each of `module_paths` and computes each of `requested_stats` on it.
+
+        Fills `self.modules` and `self.stats`, or `store` (a `SpillStore`) if given,
+        and `self.distributions` and `self.totals`, from a single `ModuleEntry` per module.
+        Modules of at least `stream_threshold` bytes are streamed, keeping only the
+        source lines the requested stats read.
+        If `jobs` is more than 1, the modules are spread over that many worker processes
+        by a `Scheduler`, largest first; the results are the same, in the same order, but
+        modules come back as `ModuleResult`s, without their source lines.
+        If `stream_file` is given, the `NDJSONReport` records of each module are written to it
+        as soon as its stats are computed.
+        '''
+        parsed_by_hash = {}
+        shared_stats = {}
+        self.distributions = Distributions()
+        self.totals = ReportTotals()
+        if self.strings is None:
+            self.strings = StringTable()
+        if store is not None:
+            self.modules = store.modules
+            self.stats = store
+        else:
+            self.modules = []
+            self.stats = defaultdict(list)
+
+        lines_needed = PackageContext.get_lines_needed(requested_stats)
+        self.scheduler = None
+        if jobs > 1:
+            self.scheduler = Scheduler(jobs)
+            results = self.scheduler.run(
+                PyStatsApp.analyze_chunk,
+                module_paths,
+                requested_stats,
+                lines_needed,
+                stream_threshold,
+                decode=partial(unpack_results, strings=self.strings)
+            )
+            results = (result for result in results if result is not None)
+        else:
+            modules = PackageContext.iter_modules(
+                module_paths,
+                verbose=self.verbose,
+                parsed_by_hash=parsed_by_hash,
+                lines_needed=lines_needed,
+                stream_threshold=stream_threshold,
+                strings=self.strings
+            )
+            # 2. COMPUTE STATS
+            # Maps each `ParsedFile` to a list of `Statistic`s.
+            results = ((module, self.compute_stats(module, requested_stats, shared_stats)) for module in modules)
+
+        for module, stats in results:
+            entry = ModuleEntry.build(module, stats)
+            self.distributions.add_entry(entry)
+            self.totals.add_module(entry)
+            if stream_file is not None:
+                NDJSONReport.write_entry(stream_file, entry)
+
+            if store is None:
+                self.modules.append(module)
+                self.stats[module] = stats
+            elif store.add(module, stats):
+                # Spilled: release the modules that identical contents would have shared
+                parsed_by_hash.clear()
+                shared_stats.clear()
+
+        if self.verbose:
+            logger.info(f'Parsed {len(self.modules)} Python module(s)')
+            if self.scheduler is not None:
+                self.scheduler.log_utilization()
+            else:
+                logger.info(f'Block stat cache: {Statistic.BLOCK_CACHE.hits} hit(s), '
+                            f'{Statistic.BLOCK_CACHE.misses} miss(es)')
+
+    def report_memory(self, store):
+        '''Records and logs the peak memory of a run limited by a `SpillStore`.'''
+        self.peak_rss = store.update_peak_rss()
+        if self.verbose:
+            logger.info(f'Peak RSS: {format_size(self.peak_rss)} '
+                        f'(memory limit: {format_size(store.memory_limit)}, '
+                        f'spilled to disk {store.num_spills} time(s))')
+        if self.peak_rss is not None and self.peak_rss > store.memory_limit:
+            logger.warning(f'Peak RSS {format_size(self.peak_rss)} exceeded the memory limit '
+                           f'{format_size(store.memory_limit)}')
+
+    def merge(
+        self,
+        partial_paths,
+        filename_base=OUTPUT_FILENAME_BASE,
+        report_names=[],
+        snapshot=None,
+        result_store=None
+    ):
+        '''
+        Combines the partial result files written by each `run(..., shard=(i, N))`
+        and generates each of the `reports`, as a single run would have.
+        '''
+        requested_reports = self.get_requested_reports(report_names, filename_base)
+        self.modules, self.stats, self.tree_markdown, self.tree_roots, self.distributions = merge_partials(
+            partial_paths
+        )
+        self.totals = None
+
+        if snapshot:
+            self.write_snapshot(snapshot)
+
+        if self.verbose:
+            logger.info(f'Merged {len(self.modules)} Python module(s) from {len(partial_paths)} shard(s)')
+
+        model = self.build_report_model()
+        if result_store:
+            self.store_results(result_store, model)
+        for ComputedReport in requested_reports:
+            self.write_report(
+                ComputedReport,
+                self.stats,
+                self.tree_markdown,
+                filename_base=filename_base,
+                model=model
             )
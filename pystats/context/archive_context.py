@@ -0,0 +1,209 @@
+'''
+archive_context.py
+
+Reads Python modules straight out of wheels, sdists and zip archives, without
+extracting them to disk.
+
+An `Archive` lists its members from the archive's own index (the zip central
+directory, or the tar headers), which gives both the modules to analyze and the
+tree of the report. Each module is an `ArchiveMember`, named after the archive
+path joined with the member name (e.g. `deps/six-1.16.0-py2.py3-none-any.whl/six.py`),
+whose contents are streamed from the archive when it is parsed.
+
+The index is read once, and the archive closed again, so that listing many archives
+keeps none of them open. It is reopened to read its modules, and closed after the last
+one; at most one archive per process is open at a time. Reading the index of a
+compressed tarball decompresses all of it; its modules are then read in a second,
+forward pass, in the archive's order, reading the headers only as far as needed.
+'''
+import io
+import os
+import tarfile
+import zipfile
+
+try:
+    # DEBUG
+    from utils.format_tree import IndexedPath
+except Exception:
+    # COMMANDLINE
+    from pystats.utils.format_tree import IndexedPath
+
+ZIP_SUFFIXES = ('.whl', '.zip')
+TAR_SUFFIXES = ('.tar.gz', '.tgz', '.tar.bz2', '.tar.xz', '.tar')
+ARCHIVE_SUFFIXES = ZIP_SUFFIXES + TAR_SUFFIXES
+
+
+def is_archive(path):
+    '''Returns whether `path` is an archive file that can be analyzed without extracting it.'''
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(str(path))
+
+
+def module_size(filename):
+    '''Returns the size in bytes of the module `filename`: a path, or an `ArchiveMember`.'''
+    if isinstance(filename, ArchiveMember):
+        return filename.size
+    return os.path.getsize(str(filename))
+
+
+def count_unread(modules):
+    '''Counts only `modules` as unread in their archives, e.g. the members assigned to a shard.
+
+    Each archive is then closed after the last of its members in `modules`, not after all of its modules.
+    '''
+    num_unread = {}
+    for module in modules:
+        if isinstance(module, ArchiveMember):
+            num_unread[module.archive] = num_unread.get(module.archive, 0) + 1
+    for archive, count in num_unread.items():
+        archive._num_unread = count
+
+
+class Archive:
+    '''
+    A zip (or wheel) or tar archive, opened for reading its index, then for reading its modules.
+
+    The archive is closed once the members listed by `modules` have all been read,
+    or when a member of another archive is opened.
+    The open archive is not pickled: a worker process opens its own copy, which
+    counts the members sent to the worker instead.
+    '''
+
+    # The archive open for reading members in this process, if any
+    _reading = None
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.is_zip = self.path.lower().endswith(ZIP_SUFFIXES)
+        self._handle = None
+        self._index = None
+        self._tar_members = None
+        self._num_unread = 0
+
+    def __repr__(self):
+        return f'Archive(path={self.path})'
+
+    def __getstate__(self):
+        return {'path': self.path, 'is_zip': self.is_zip, '_handle': None, '_index': None, '_tar_members': None,
+                '_num_unread': 0}
+
+    @property
+    def handle(self):
+        if self._handle is None:
+            self._handle = zipfile.ZipFile(self.path) if self.is_zip else tarfile.open(self.path)
+        return self._handle
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+            self._tar_members = None
+        if Archive._reading is self:
+            Archive._reading = None
+
+    def index(self):
+        '''Returns (name, size, is_dir) for each member, in the archive's order, read once.'''
+        if self._index is None:
+            try:
+                if self.is_zip:
+                    self._index = [(info.filename, info.file_size, info.is_dir()) for info in self.handle.infolist()]
+                else:
+                    self._index = [
+                        (member.name, member.size, member.isdir())
+                        for member in self.handle.getmembers()
+                        if member.isfile() or member.isdir()
+                    ]
+            finally:
+                if Archive._reading is not self:
+                    self.close()
+        return self._index
+
+    def modules(self):
+        '''Returns an `ArchiveMember` for each Python module of the archive; they are counted as unread.'''
+        modules = [
+            ArchiveMember(self, name, size)
+            for name, size, is_dir in self.index()
+            if not is_dir and name.endswith('.py')
+        ]
+        self._num_unread = len(modules)
+        return modules
+
+    def get_markdown_tree(self):
+        '''Returns the Markdown tree lines of the archive, as `DisplayablePath.getMarkdownPath` does for a directory.'''
+        names = [name.rstrip('/') + '/' if is_dir else name for name, _, is_dir in self.index()]
+        return IndexedPath.getMarkdownIndex(os.path.basename(self.path), names)
+
+    def open_member(self, name):
+        '''Returns a binary file reading the member `name`, which closes the archive after the last unread member.'''
+        if Archive._reading is not self:
+            if Archive._reading is not None:
+                Archive._reading.close()
+            Archive._reading = self
+
+        if self.is_zip:
+            return _MemberFile(self.handle.open(name), self)
+        return _MemberFile(self.handle.extractfile(self._tar_member(name)), self)
+
+    def _tar_member(self, name):
+        '''Returns the `TarInfo` of the member `name`, reading the headers forward only as far as it.
+
+        Members are read in the archive's order (`plan_chunks` keeps that order within a chunk).
+        A member before the last one read is still found, but reading it seeks back into the archive.
+        '''
+        if self._tar_members is None:
+            self._tar_members = {}
+        while name not in self._tar_members:
+            member = self.handle.next()
+            if member is None:
+                raise KeyError(f'no member {name} in {self.path}')
+            self._tar_members[member.name] = member
+        return self._tar_members[name]
+
+    def member_closed(self):
+        '''Counts a member as read, and closes the archive after the last unread one.'''
+        self._num_unread -= 1
+        if self._num_unread <= 0:
+            self.close()
+
+
+class _MemberFile(io.RawIOBase):
+    '''Wraps the binary file of a member of `archive`, telling the archive when it is closed.'''
+
+    def __init__(self, raw, archive):
+        self._raw = raw
+        self._archive = archive
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._raw.readinto(buffer)
+
+    def close(self):
+        if not self.closed:
+            self._raw.close()
+            self._archive.member_closed()
+        super().close()
+
+
+class ArchiveMember:
+    '''A Python module `name` of `size` bytes in `archive` (an `Archive`).'''
+
+    def __init__(self, archive, name, size):
+        self.archive = archive
+        self.name = name
+        self.size = size
+
+    def __str__(self):
+        return os.path.join(self.archive.path, self.name)
+
+    def __repr__(self):
+        return f'ArchiveMember(archive={self.archive.path}, name={self.name}, size={self.size})'
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # The archive's copy in a worker process counts the members sent along with it
+        self.archive._num_unread += 1
+
+    def open(self):
+        '''Returns a binary file streaming the module's contents out of the archive.'''
+        return self.archive.open_member(self.name)
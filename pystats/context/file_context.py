@@ -1,4 +1,10 @@
 
+import hashlib
+import re
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
 try:
     # DEBUG
     from logger.logger import Logger
@@ -9,6 +15,33 @@ except Exception:
 logger = Logger(__name__).logger
 
 
+class BlockFingerprint:
+    """Incrementally computes `CodeBlock.fingerprint`, one line at a time.
+
+    Lines are stripped of trailing whitespace and of the first line's indentation.
+    """
+
+    def __init__(self, keyword):
+        self._digest = hashlib.blake2b(digest_size=16)
+        self._digest.update(f'{keyword}\0'.encode())
+        self._indent = None
+
+    def add(self, line):
+        if self._indent is None:
+            self._indent = line[:len(line) - len(line.lstrip())]
+        if line.startswith(self._indent):
+            line = line[len(self._indent):]
+        self._digest.update(line.rstrip().encode())
+        self._digest.update(b'\n')
+
+    def finish(self, num_lines, signature):
+        """Returns the fingerprint of a block of `num_lines` lines (`signature` is used if no line was added)."""
+        if self._indent is None:
+            self._digest.update(signature.encode())
+        self._digest.update(f'\0{num_lines}'.encode())
+        return self._digest.hexdigest()
+
+
 # This class should be a drop-in replacement for `namedtuple`,
 #   with the exception of the optional `lines` attribute.
 class CodeBlock:
@@ -30,6 +63,25 @@ class CodeBlock:
         self.start = start
         self.end = end
         self.lines = lines
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        """
+        A stable hash of the block's keyword and normalized lines.
+
+        Lines are stripped of trailing whitespace and of the block's own indentation,
+        so identical code gets the same fingerprint wherever it is (e.g. in another file).
+        Without `lines` (e.g. a block read back from results), it is None: the signature and
+        length alone would give different blocks the same fingerprint.
+        """
+        if self._fingerprint is None and self.lines:
+            builder = BlockFingerprint(self.keyword)
+            for line in self.lines:
+                builder.add(line)
+            self._fingerprint = builder.finish(len(self), self.signature)
+
+        return self._fingerprint
 
     # Called when run: `len(code_block)`
     # Return the total number of lines, including the signature.
@@ -108,49 +160,7 @@ class FileContext:
         Returns:
             A list of `CodeBlock`s.
         """
-        block_prefix = FileContext.INDENT * indent_level + keyword
-        block_sig = ''
-        block_start = 0
-
-        blocks = []
-        for i, line in enumerate(lines):
-            # Skip lines that are entirely whitespace
-            if line.strip():
-                # Inside a block
-                if block_sig:
-                    if FileContext.num_indents(line) <= indent_level:
-                        block_lines = lines[block_start:i]
-                        blocks.append(
-                            CodeBlock(
-                                keyword,
-                                block_sig,
-                                block_start + offset,
-                                i+offset,
-                                lines=block_lines
-                            )
-                        )
-                        block_sig = ''
-
-                # Start of a new block
-                if line.startswith(block_prefix):
-                    # The signature excludes the prefix and ':'
-                    block_sig = line[len(block_prefix):].strip()[:-1]
-                    block_start = i
-
-        # If still inside a block, add the block
-        if block_sig:
-            block_lines = lines[block_start:i + 1]
-            blocks.append(
-                CodeBlock(
-                    keyword,
-                    block_sig,
-                    block_start + offset,
-                    i + offset + 1,
-                    lines=block_lines
-                )
-            )
-
-        return blocks
+        return LineIndex(lines).get_codeblocks(keyword, indent_level=indent_level, offset=offset)
 
     @staticmethod
     def get_functions(lines, indent_level=0, offset=0):
@@ -171,3 +181,90 @@ class FileContext:
                     indent_level=indent_level,
                     offset=offset
                 )
+
+
+class LineIndex:
+    """The structure of a file's lines, computed once and shared by all block queries.
+
+    Attributes:
+        lines: The lines of Python code.
+        strings: A `StringTable` interning the block signatures, or None.
+        indents: The indentation level of each line (see `FileContext.num_indents`).
+        blank: A bitmap with 1 for each line that is entirely whitespace.
+
+    Lines where a block may start are found per keyword, with one regex scan over
+    the whole file. Queries then only look at these arrays, not at the strings,
+    except for reading the signature of each block found.
+    """
+
+    def __init__(self, lines, strings=None):
+        self.lines = lines
+        self.strings = strings
+        self.indents = array('I', [LineIndex.line_indent(line) for line in lines])
+        self.blank = bytearray(not line or line.isspace() for line in lines)
+        self._candidates = {}
+
+    @staticmethod
+    def line_indent(line):
+        """The same as `FileContext.num_indents(line)` for the default indent, without a Python loop."""
+        return (len(line) - len(line.lstrip(' '))) // len(FileContext.INDENT)
+
+    def candidates(self, keyword):
+        """Returns the sorted indexes of lines made of whole indents followed by `keyword`."""
+        if keyword not in self._candidates:
+            # The joined text is not kept: an index may live as long as its (lazily parsed) module
+            text = '\n'.join(self.lines)
+            line_starts = array('L', accumulate((len(line) + 1 for line in self.lines), initial=0))
+
+            pattern = re.compile(f'^(?:{FileContext.INDENT})*{re.escape(keyword)}', re.MULTILINE)
+            self._candidates[keyword] = array('I', [
+                bisect_left(line_starts, match.start()) for match in pattern.finditer(text)
+            ])
+
+        return self._candidates[keyword]
+
+    def get_codeblocks(self, keyword, indent_level=0, start=0, end=None, offset=0):
+        """Returns the `CodeBlock`s starting with `keyword` at `indent_level` in lines [start, end).
+
+        Gives the same blocks as `FileContext.get_codeblocks(lines[start:end], keyword, indent_level, offset)`,
+        with indexes relative to the whole file plus `offset`.
+        """
+        if end is None:
+            end = len(self.lines)
+
+        block_prefix = FileContext.INDENT * indent_level + keyword
+        indents = self.indents
+        blank = self.blank
+
+        blocks = []
+        candidates = self.candidates(keyword)
+        for k in range(bisect_left(candidates, start), len(candidates)):
+            block_start = candidates[k]
+            if block_start >= end:
+                break
+            if indents[block_start] != indent_level:
+                continue
+
+            # The signature excludes the prefix and ':'
+            block_sig = self.lines[block_start][len(block_prefix):].strip()[:-1]
+            if not block_sig:
+                continue
+            if self.strings is not None:
+                block_sig = self.strings.intern(block_sig)
+
+            # The block ends at the next non-blank line that is not indented further
+            block_end = block_start + 1
+            while block_end < end and (blank[block_end] or indents[block_end] > indent_level):
+                block_end += 1
+
+            blocks.append(
+                CodeBlock(
+                    keyword,
+                    block_sig,
+                    block_start + offset,
+                    block_end + offset,
+                    lines=self.lines[block_start:block_end]
+                )
+            )
+
+        return blocks
@@ -1,32 +1,58 @@
+import hashlib
+import io
 import os
 
 try:
     # DEBUG
     from parsed_file import ParsedFile
-    from report import MarkdownReport
+    from context.archive_context import ArchiveMember, module_size
+    from context.stream_context import StreamedFile, hash_file
+    from report import MarkdownReport, NDJSONReport
     from logger.logger import Logger
-    from utils.args_parser import add_parser_options
+    from utils.args_parser import (
+        add_diff_parser_options,
+        add_merge_parser_options,
+        add_parser_options,
+        add_query_parser_options
+    )
     from statistic import (
+        Statistic,
         NumModuleLines,
         NumFuncLines,
         NumMethodLines,
         NumClassLines,
         WarnNoDocstring,
-        DunderMethodPythonPackage
+        DunderMethodPythonPackage,
+        CyclomaticComplexity,
+        NumTokens,
+        LineKinds,
+        MaxNestingDepth
     )
 except Exception:
     # COMMANDLINE
     from pystats.parsed_file import ParsedFile
-    from pystats.report import MarkdownReport
+    from pystats.context.archive_context import ArchiveMember, module_size
+    from pystats.context.stream_context import StreamedFile, hash_file
+    from pystats.report import MarkdownReport, NDJSONReport
     from pystats.logger.logger import Logger
-    from pystats.utils.args_parser import add_parser_options
+    from pystats.utils.args_parser import (
+        add_diff_parser_options,
+        add_merge_parser_options,
+        add_parser_options,
+        add_query_parser_options
+    )
     from pystats.statistic import (
+        Statistic,
         NumModuleLines,
         NumFuncLines,
         NumMethodLines,
         NumClassLines,
         WarnNoDocstring,
-        DunderMethodPythonPackage
+        DunderMethodPythonPackage,
+        CyclomaticComplexity,
+        NumTokens,
+        LineKinds,
+        MaxNestingDepth
     )
 
 
@@ -42,15 +68,40 @@ class PackageContext:
         NumClassLines,
         WarnNoDocstring,
         DunderMethodPythonPackage,
+        CyclomaticComplexity,
+        NumTokens,
+        LineKinds,
+        MaxNestingDepth,
+    ]
+
+    # Computed when no stat is specified: the token stats tokenize every module, so they are opt-in
+    DEFAULT_STATS = [
+        NumModuleLines,
+        NumFuncLines,
+        NumMethodLines,
+        NumClassLines,
+        WarnNoDocstring,
+        DunderMethodPythonPackage,
     ]
 
     AVAILABLE_REPORTS = [
         MarkdownReport,
+        NDJSONReport,
+    ]
+
+    # Generated when no report is specified
+    DEFAULT_REPORTS = [
+        MarkdownReport,
     ]
 
     PACKAGE_STATS = [
         DunderMethodPythonPackage,
     ]
+    # Modules of at least this many bytes are parsed in a single streaming pass (see `iter_modules`)
+    STREAM_THRESHOLD = 8 * 1024 ** 2
+    # At most this many parses are kept by `iter_sources` for sources with identical contents
+    MAX_SHARED_SOURCES = 256
+
     # PACKAGE_BASE_DIR = os.path.dirname(sys.modules['__main__'].__file__)
     PACKAGE_BASE_DIR = os.getcwd()
 
@@ -66,12 +117,62 @@ class PackageContext:
     def get_abs_path_python_filenames(python_filenames):
         return [os.path.join(PackageContext.PACKAGE_BASE_DIR, python_filename) for python_filename in python_filenames]
 
+    @staticmethod
+    def partition_modules(filenames, shard, num_shards):
+        '''
+        Deterministically selects the modules belonging to shard `shard` (1-based) of `num_shards`.
+
+        Shards are balanced by total file size: modules are assigned largest first
+        to the shard with the least bytes so far. Every shard computes the same
+        partition from the same list, so shards can run as independent processes.
+
+        Returns:
+            A list of (index, filename) pairs, where `index` is the position in `filenames`.
+        '''
+        if not 1 <= shard <= num_shards:
+            raise ValueError(f'shard must be between 1 and {num_shards}: got {shard}')
+
+        sizes = [module_size(filename) for filename in filenames]
+        # Ties are broken by relative path so the order doesn't depend on the checkout location
+        order = sorted(
+            range(len(filenames)),
+            key=lambda i: (-sizes[i], os.path.relpath(str(filenames[i])))
+        )
+
+        totals = [0] * num_shards
+        selected = []
+        for i in order:
+            target = min(range(num_shards), key=lambda s: (totals[s], s))
+            totals[target] += sizes[i]
+            if target == shard - 1:
+                selected.append(i)
+
+        return [(i, filenames[i]) for i in sorted(selected)]
+
     @staticmethod
     def parse_args(arguments):
         '''Given a list of command-line arguments, returns them parsed.'''
         parser = add_parser_options(PackageContext)
         return parser.parse_args(arguments)
 
+    @staticmethod
+    def parse_merge_args(arguments):
+        '''Given the command-line arguments following `merge`, returns them parsed.'''
+        parser = add_merge_parser_options(PackageContext)
+        return parser.parse_args(arguments)
+
+    @staticmethod
+    def parse_diff_args(arguments):
+        '''Given the command-line arguments following `diff`, returns them parsed.'''
+        parser = add_diff_parser_options(PackageContext)
+        return parser.parse_args(arguments)
+
+    @staticmethod
+    def parse_query_args(arguments):
+        '''Given the command-line arguments following `query`, returns them parsed.'''
+        parser = add_query_parser_options(PackageContext)
+        return parser.parse_args(arguments)
+
     @staticmethod
     def get_lines(filename):
         '''Returns the lines in `filename` stripped of terminal.'''
@@ -85,38 +186,195 @@ class PackageContext:
 
         return lines
 
+    @staticmethod
+    def get_lines_and_hash(filename):
+        '''
+        Returns the lines in `filename` stripped of terminal, and a hash of the raw file contents.
+
+        The file is read once; the lines are decoded exactly as `get_lines` would.
+        '''
+        with open(filename, 'rb') as f:
+            data = f.read()
+
+        return PackageContext.get_source_lines_and_hash(data)
+
+    @staticmethod
+    def get_source_lines_and_hash(source):
+        '''
+        Returns the lines of `source` stripped of terminal, and a hash of its contents, like `get_lines_and_hash`.
+
+        `source` is the text of a module, or its raw contents as `bytes` (decoded as a file would be).
+        '''
+        if isinstance(source, bytes):
+            data = source
+            text = io.TextIOWrapper(io.BytesIO(data))
+        else:
+            data = source.encode('utf-8')
+            # Translates '\r\n' and '\r' like reading a file in text mode
+            text = io.StringIO(source, newline=None)
+
+        content_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+        lines = [line.rstrip('\n') for line in text.readlines()]
+
+        return lines, content_hash
+
     @staticmethod
     def parse_modules(filenames, verbose=False):
         '''
         Parses each of `filenames`, which refer to Python modules.
 
+        Files with identical contents are parsed once: later copies share the
+        lines and code blocks of the first `ParsedFile` with the same content hash.
+
         Returns:
             A list of `ParsedFile` objects, each corresponding to a filename.
         '''
-        modules = []
+        return list(PackageContext.iter_modules(filenames, verbose=verbose))
+
+    @staticmethod
+    def iter_sources(sources, parsed_by_hash=None, strings=None, max_shared=None):
+        '''
+        Parses each (name, source) of `sources` like `iter_modules`, but from memory: nothing is read from disk.
+
+        `name` stands for the module's filename, and `source` is its text (or raw `bytes`).
+        Empty sources are skipped; sources with identical contents share their parse.
+        Only the last `max_shared` parses (default: `MAX_SHARED_SOURCES`) are kept in `parsed_by_hash`
+        for sharing, so a long stream of sources holds a bounded number of them
+        (see `ResultCache` to reuse results across calls).
+        '''
+        if parsed_by_hash is None:
+            parsed_by_hash = {}
+        if max_shared is None:
+            max_shared = PackageContext.MAX_SHARED_SOURCES
+
+        for name, source in sources:
+            lines, content_hash = PackageContext.get_source_lines_and_hash(source)
+            if not lines:
+                continue
+            if content_hash in parsed_by_hash:
+                yield ParsedFile.share(name, parsed_by_hash[content_hash])
+                continue
+
+            parsed_file = ParsedFile(name, lines, content_hash=content_hash, strings=strings)
+            parsed_by_hash[content_hash] = parsed_file
+            if len(parsed_by_hash) > max_shared:
+                # Dicts keep insertion order: drop the oldest parse
+                del parsed_by_hash[next(iter(parsed_by_hash))]
+            yield parsed_file
+
+    @staticmethod
+    def get_lines_needed(stats):
+        '''Returns the source lines that `stats` read: 'none', 'head' or 'all' (see `Statistic.LINES_NEEDED`).'''
+        return max(
+            (stat.LINES_NEEDED for stat in stats),
+            key=Statistic.LINE_RETENTION.index,
+            default='none'
+        )
+
+    @staticmethod
+    def stream_module(filename, lines_needed='all', strings=None, opener=None):
+        '''
+        Parses `filename` in a single pass over its lines, retaining only the lines `lines_needed`.
+
+        `opener` returns the binary file to read, if `filename` is not a file on disk (see `StreamedFile`).
+
+        Returns:
+            A `ParsedFile` (with its content hash), or None if the file is empty.
+        '''
+        with StreamedFile(filename, opener=opener) as streamed:
+            parsed_file = ParsedFile.from_stream(
+                filename,
+                streamed,
+                head={'none': 0, 'head': Statistic.LINES_HEAD}.get(lines_needed),
+                keep_lines=lines_needed == 'all',
+                strings=strings
+            )
+        parsed_file.content_hash = streamed.content_hash
+
+        return parsed_file if parsed_file.lines else None
+
+    @staticmethod
+    def iter_modules(filenames, verbose=False, parsed_by_hash=None, lines_needed='all', stream_threshold=None,
+                     strings=None):
+        '''
+        Parses each of `filenames` like `parse_modules`, yielding each `ParsedFile` as soon as it is parsed.
+
+        `parsed_by_hash` maps content hashes to the `ParsedFile`s they can be shared with.
+        Pass your own dict to be able to clear it (and release the modules it refers to).
+
+        Files of at least `stream_threshold` bytes are parsed with `stream_module`, so
+        they are never fully in memory: only the lines `lines_needed` are retained.
+        Modules in archives (`ArchiveMember`s) are always streamed out of their archive.
+        `strings` is the run's `StringTable`, interning filenames and signatures.
+        '''
+        if parsed_by_hash is None:
+            parsed_by_hash = {}
 
         # Parse each module
         for filename in filenames:
+            opener = filename.open if isinstance(filename, ArchiveMember) else None
             filename = str(filename).strip()
-            if filename:
-                lines = []
+            if not filename:
+                continue
+
+            if opener is not None or stream_threshold is not None and os.path.getsize(filename) >= stream_threshold:
+                parsed_file = PackageContext._stream_one(filename, opener, parsed_by_hash, lines_needed, strings,
+                                                         verbose)
+            else:
+                parsed_file = PackageContext._read_one(filename, parsed_by_hash, strings, verbose)
+
+            if parsed_file is not None:
+                yield parsed_file
 
+    @staticmethod
+    def _stream_one(filename, opener, parsed_by_hash, lines_needed, strings, verbose):
+        '''Streams `filename` for `iter_modules`: returns its `ParsedFile` (shared if possible), or None if empty.'''
+        if opener is None:
+            # Hashing is far cheaper than parsing: a large duplicate is shared without being parsed again.
+            # Archive members are parsed first, as reading one twice would rescan the archive.
+            content_hash = hash_file(filename)
+            if content_hash in parsed_by_hash:
                 if verbose:
-                    logger.info(f'Parsing "{filename}"')
-
-                # Read lines from the file
-                try:
-                    lines = PackageContext.get_lines(filename)
-                except Exception as error:
-                    if verbose:
-                        modulename = filename.split('/')[-1]
-                        logger.error(f'ERROR OPENING {modulename}')
-                    raise error
-
-                # Parse the lines. "lines" are the collection of the text lines in "filename"
-                if lines:
-                    modules.append(ParsedFile(filename, lines))
-                    if verbose:
-                        logger.info(f'Finished parsing {filename}')
-
-        return modules
+                    logger.info(f'Reused parse of identical content for {filename}')
+                return ParsedFile.share(filename, parsed_by_hash[content_hash])
+
+        if verbose:
+            logger.info(f'Streaming "{filename}"')
+
+        parsed_file = PackageContext.stream_module(filename, lines_needed, strings=strings, opener=opener)
+        if parsed_file is None:
+            return None
+        if parsed_file.content_hash in parsed_by_hash:
+            return ParsedFile.share(filename, parsed_by_hash[parsed_file.content_hash])
+
+        parsed_by_hash[parsed_file.content_hash] = parsed_file
+        return parsed_file
+
+    @staticmethod
+    def _read_one(filename, parsed_by_hash, strings, verbose):
+        '''Reads `filename` for `iter_modules`: returns its `ParsedFile` (shared if possible), or None if empty.'''
+        if verbose:
+            logger.info(f'Parsing "{filename}"')
+
+        # Read lines from the file
+        try:
+            lines, content_hash = PackageContext.get_lines_and_hash(filename)
+        except Exception as error:
+            if verbose:
+                modulename = filename.split('/')[-1]
+                logger.error(f'ERROR OPENING {modulename}')
+            raise error
+
+        # Parse the lines. "lines" are the collection of the text lines in "filename"
+        if not lines:
+            return None
+        if content_hash in parsed_by_hash:
+            if verbose:
+                logger.info(f'Reused parse of identical content for {filename}')
+            return ParsedFile.share(filename, parsed_by_hash[content_hash])
+
+        parsed_file = ParsedFile(filename, lines, content_hash=content_hash, strings=strings)
+        parsed_by_hash[content_hash] = parsed_file
+        if verbose:
+            logger.info(f'Finished parsing {filename}')
+        return parsed_file
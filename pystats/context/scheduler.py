@@ -0,0 +1,251 @@
+'''
+scheduler.py
+
+Spreads the modules of a run over a pool of worker processes (`--jobs N`).
+
+Work is dispatched in chunks, largest first: each large module is a chunk of
+its own, so no large module is left to stretch the end of the run, and small
+modules are batched together, so they do not each pay an inter-process round
+trip. Within a chunk, modules are read in the order of the list (so the members
+of a tar archive are read forward only). Results are yielded back in the order
+of the modules.
+
+Chunk results of at least `SHARED_MEMORY_THRESHOLD` bytes (when `work` returns
+`bytes`) are handed over in a `multiprocessing.shared_memory` block instead of
+being pickled through the pool's pipe.
+'''
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # Python < 3.8: results go through the pipe
+    shared_memory = None
+
+try:
+    # DEBUG
+    from context.archive_context import module_size
+    from logger.logger import Logger
+except Exception:
+    # COMMANDLINE
+    from pystats.context.archive_context import module_size
+    from pystats.logger.logger import Logger
+
+logger = Logger(__name__).logger
+
+# Small modules are batched into chunks of up to this many bytes...
+CHUNK_BYTES = 256 * 1024
+# ...but there are at least this many chunks per worker, so the last ones are short
+CHUNKS_PER_WORKER = 8
+# Chunk results of at least this many bytes go through shared memory
+SHARED_MEMORY_THRESHOLD = 1024 ** 2
+
+
+class WorkChunk:
+    '''Modules dispatched to a worker together.
+
+    Attributes:
+        indexes: The position of each module in the scheduled list.
+        filenames: The filename of each module.
+        num_bytes: The total size of the modules.
+    '''
+
+    def __init__(self):
+        self.indexes = []
+        self.filenames = []
+        self.num_bytes = 0
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def __repr__(self):
+        return f'WorkChunk(num_modules={len(self)}, num_bytes={self.num_bytes})'
+
+    def add(self, index, filename, size):
+        self.indexes.append(index)
+        self.filenames.append(filename)
+        self.num_bytes += size
+
+    def sort(self):
+        '''Puts the modules back in the order of the scheduled list.'''
+        order = sorted(range(len(self)), key=self.indexes.__getitem__)
+        self.indexes = [self.indexes[i] for i in order]
+        self.filenames = [self.filenames[i] for i in order]
+
+
+class WorkerStats:
+    '''What one worker process did during a run.'''
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.num_chunks = 0
+        self.num_modules = 0
+        self.num_bytes = 0
+        self.busy_time = 0.0
+
+    def __repr__(self):
+        return (f'WorkerStats(pid={self.pid}, num_chunks={self.num_chunks}, '
+                f'num_modules={self.num_modules}, busy_time={self.busy_time:.3f})')
+
+    def utilization(self, wall_time):
+        '''Returns the fraction of `wall_time` the worker was busy.'''
+        return self.busy_time / wall_time if wall_time > 0 else 0.0
+
+
+def plan_chunks(filenames, num_workers, sizes=None, chunk_bytes=CHUNK_BYTES):
+    '''
+    Groups `filenames` into `WorkChunk`s, largest first.
+
+    Modules of at least the chunk size are chunks of their own. Smaller ones are
+    batched, largest first, until a chunk holds the chunk size: `chunk_bytes`, or
+    less if needed to make `CHUNKS_PER_WORKER` chunks per worker. Each chunk lists
+    its modules in the order of `filenames`.
+    `sizes` are the sizes of the modules in bytes (read from the files if None).
+    '''
+    if sizes is None:
+        sizes = [module_size(filename) for filename in filenames]
+
+    target = max(1, min(chunk_bytes, sum(sizes) // (max(1, num_workers) * CHUNKS_PER_WORKER)))
+    # Ties are broken by relative path so the plan doesn't depend on the checkout location
+    order = sorted(
+        range(len(filenames)),
+        key=lambda i: (-sizes[i], os.path.relpath(str(filenames[i])))
+    )
+
+    chunks = []
+    batch = WorkChunk()
+    for i in order:
+        if sizes[i] >= target:
+            chunk = WorkChunk()
+            chunk.add(i, filenames[i], sizes[i])
+            chunks.append(chunk)
+            continue
+
+        batch.add(i, filenames[i], sizes[i])
+        if batch.num_bytes >= target:
+            chunks.append(batch)
+            batch = WorkChunk()
+
+    if batch:
+        chunks.append(batch)
+
+    for chunk in chunks:
+        chunk.sort()
+    return chunks
+
+
+class SharedResult:
+    '''A chunk result of `size` bytes left by a worker in the shared memory block `name`.'''
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def __repr__(self):
+        return f'SharedResult(name={self.name}, size={self.size})'
+
+    @classmethod
+    def share(cls, data):
+        '''Copies `data` to a new shared memory block; the receiver must `take` it.'''
+        try:
+            # Python >= 3.13: the receiver unlinks the block, so the worker's resource tracker must not track it
+            block = shared_memory.SharedMemory(create=True, size=len(data), track=False)
+        except TypeError:
+            block = shared_memory.SharedMemory(create=True, size=len(data))
+            # Before 3.13, the block is always tracked: unregister it under the POSIX name it was
+            # registered as, which `name` returns without its leading '/'
+            resource_tracker.unregister('/' + block.name, 'shared_memory')
+        try:
+            block.buf[:len(data)] = data
+            return cls(block.name, len(data))
+        finally:
+            block.close()
+
+    def take(self):
+        '''Returns the shared bytes, and frees the block.'''
+        block = shared_memory.SharedMemory(name=self.name)
+        try:
+            return bytes(block.buf[:self.size])
+        finally:
+            block.close()
+            block.unlink()
+
+
+def _run_chunk(work, filenames, args):
+    '''Runs `work(filenames, *args)` in a worker; returns its results, the worker's pid and the time taken.'''
+    start = time.perf_counter()
+    results = work(filenames, *args)
+    if shared_memory is not None and isinstance(results, bytes) and len(results) >= SHARED_MEMORY_THRESHOLD:
+        results = SharedResult.share(results)
+    return results, os.getpid(), time.perf_counter() - start
+
+
+class Scheduler:
+    '''
+    Runs `work(filenames, *args)` over chunks of modules in `jobs` worker processes.
+
+    `work` must be a picklable (module-level) function returning one result per filename,
+    or a value that `decode` turns into them in the parent (e.g. a compact `bytes` encoding).
+    '''
+
+    def __init__(self, jobs):
+        if jobs < 1:
+            raise ValueError(f'jobs must be at least 1: got {jobs}')
+        self.jobs = jobs
+        self.workers = {}
+        self.wall_time = 0.0
+
+    def __repr__(self):
+        return f'Scheduler(jobs={self.jobs}, num_workers={len(self.workers)}, wall_time={self.wall_time:.3f})'
+
+    def run(self, work, filenames, *args, sizes=None, decode=None):
+        '''Yields the result of `work` for each of `filenames`, in order, as soon as it and those before it are done.'''
+        chunks = plan_chunks(filenames, self.jobs, sizes=sizes)
+        self.workers = {}
+        start = time.perf_counter()
+
+        results = {}
+        next_index = 0
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            # The pool takes submitted chunks in order, so the largest are started first
+            pending = {executor.submit(_run_chunk, work, chunk.filenames, args): chunk for chunk in chunks}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    chunk_results, pid, busy_time = future.result()
+                    self._record(pid, chunk, busy_time)
+                    if isinstance(chunk_results, SharedResult):
+                        chunk_results = chunk_results.take()
+                    if decode is not None:
+                        chunk_results = decode(chunk_results)
+                    results.update(zip(chunk.indexes, chunk_results))
+
+                while next_index in results:
+                    yield results.pop(next_index)
+                    next_index += 1
+
+        self.wall_time = time.perf_counter() - start
+
+    def _record(self, pid, chunk, busy_time):
+        worker = self.workers.setdefault(pid, WorkerStats(pid))
+        worker.num_chunks += 1
+        worker.num_modules += len(chunk)
+        worker.num_bytes += chunk.num_bytes
+        worker.busy_time += busy_time
+
+    @property
+    def utilization(self):
+        '''The fraction of `jobs` times the wall time that the workers were busy.'''
+        if self.wall_time <= 0:
+            return 0.0
+        return sum(worker.busy_time for worker in self.workers.values()) / (self.jobs * self.wall_time)
+
+    def log_utilization(self):
+        '''Logs the work done by each worker and the overall utilization.'''
+        for worker in sorted(self.workers.values(), key=lambda w: w.pid):
+            logger.info(f'Worker {worker.pid}: {worker.num_chunks} chunk(s), {worker.num_modules} module(s), '
+                        f'busy {worker.busy_time:.2f}s ({worker.utilization(self.wall_time):.0%})')
+        logger.info(f'{self.jobs} worker(s): {self.wall_time:.2f}s wall time, {self.utilization:.0%} utilization')
@@ -0,0 +1,223 @@
+'''
+stream_context.py
+
+Parses a Python module from a stream of lines, in a single pass.
+
+Produces the same code blocks as `FileContext.get_functions`, `get_classes` and
+the per-class method lookup of `ParsedFile.parse`, but each line is seen once
+and dropped unless it is retained: blocks are emitted as soon as they close,
+and only the first `head` lines of each block are kept in `CodeBlock.lines`.
+'''
+import hashlib
+import io
+
+try:
+    # DEBUG
+    from context.file_context import BlockFingerprint, CodeBlock, FileContext, LineIndex
+except Exception:
+    # COMMANDLINE
+    from pystats.context.file_context import BlockFingerprint, CodeBlock, FileContext, LineIndex
+
+
+class DroppedLines:
+    """Stands in for the lines of a streamed module that were not retained.
+
+    Only the number of lines is known.
+    """
+
+    def __init__(self, num_lines):
+        self.num_lines = num_lines
+
+    def __len__(self):
+        return self.num_lines
+
+    def __bool__(self):
+        return self.num_lines > 0
+
+    def __getitem__(self, index):
+        raise IndexError('lines of a streamed module are not retained')
+
+    def __repr__(self):
+        return f'DroppedLines(num_lines={self.num_lines})'
+
+
+class BlockTracker:
+    """Follows the `CodeBlock`s starting with `keyword` at `indent_level`, one line at a time.
+
+    Mirrors the loop of `FileContext.get_codeblocks`, with absolute line indexes.
+    """
+
+    def __init__(self, keyword, indent_level=0, head=None, strings=None):
+        self.keyword = keyword
+        self.indent_level = indent_level
+        self.head = head
+        self.strings = strings
+        self.block_prefix = FileContext.INDENT * indent_level + keyword
+
+        self.block_sig = ''
+        self.block_start = 0
+        self.block_lines = []
+        self.fingerprint = None
+
+    def _close(self, end):
+        signature = self.block_sig if self.strings is None else self.strings.intern(self.block_sig)
+        block = CodeBlock(self.keyword, signature, self.block_start, end, lines=self.block_lines)
+        block._fingerprint = self.fingerprint.finish(end - self.block_start, self.block_sig)
+        self.block_sig = ''
+        self.block_lines = []
+        return block
+
+    def feed(self, i, line, is_blank, indent):
+        """Processes line `i`. Returns the block this line closes, or None."""
+        closed = None
+        if not is_blank:
+            # Inside a block
+            if self.block_sig and indent <= self.indent_level:
+                closed = self._close(i)
+
+            # Start of a new block
+            if line.startswith(self.block_prefix):
+                # The signature excludes the prefix and ':'
+                self.block_sig = line[len(self.block_prefix):].strip()[:-1]
+                self.block_start = i
+                self.fingerprint = BlockFingerprint(self.keyword)
+
+        if self.block_sig:
+            self.fingerprint.add(line)
+            if self.head is None or i - self.block_start < self.head:
+                self.block_lines.append(line)
+
+        return closed
+
+    def finish(self, end):
+        """Closes the block still open at the end of the lines (index `end`), if any."""
+        if self.block_sig:
+            return self._close(end)
+        return None
+
+
+def stream_parse(lines, head=None, keep_lines=True, strings=None):
+    """
+    Parses an iterable of lines in a single pass.
+
+    Args:
+        lines: An iterable of lines of Python code, without line terminators.
+        head: The number of lines to retain in each `CodeBlock.lines` (None retains all).
+        keep_lines: Whether to retain the module's lines.
+        strings: A `StringTable` interning the block signatures.
+
+    Returns:
+        (lines, functions, classes, methods): The retained lines (a list, or `DroppedLines`),
+            and the code blocks as returned by `ParsedFile.parse`.
+    """
+    functions, classes, methods = [], [], {}
+    function_tracker = BlockTracker('def', head=head, strings=strings)
+    class_tracker = BlockTracker('class', head=head, strings=strings)
+    method_tracker = None
+    class_methods = []
+
+    def close_class(class_block, end):
+        if method_tracker is not None:
+            method = method_tracker.finish(end)
+            if method is not None:
+                class_methods.append(method)
+        classes.append(class_block)
+        methods[class_block] = list(class_methods)
+        class_methods.clear()
+
+    retained = []
+    num_lines = 0
+    for i, line in enumerate(lines):
+        num_lines += 1
+        if keep_lines:
+            retained.append(line)
+
+        is_blank = not line or line.isspace()
+        indent = LineIndex.line_indent(line)
+
+        function = function_tracker.feed(i, line, is_blank, indent)
+        if function is not None:
+            functions.append(function)
+
+        class_block = class_tracker.feed(i, line, is_blank, indent)
+        if class_block is not None:
+            close_class(class_block, i)
+            method_tracker = None
+
+        if class_tracker.block_sig:
+            if method_tracker is None:
+                method_tracker = BlockTracker('def', indent_level=1, head=head, strings=strings)
+            method = method_tracker.feed(i, line, is_blank, indent)
+            if method is not None:
+                class_methods.append(method)
+
+    function = function_tracker.finish(num_lines)
+    if function is not None:
+        functions.append(function)
+
+    class_block = class_tracker.finish(num_lines)
+    if class_block is not None:
+        close_class(class_block, num_lines)
+
+    return (retained if keep_lines else DroppedLines(num_lines)), functions, classes, methods
+
+
+class _HashingReader(io.RawIOBase):
+    """Wraps a binary file, hashing every byte read through it."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.digest = hashlib.blake2b(digest_size=16)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._raw.readinto(buffer)
+        if n:
+            self.digest.update(memoryview(buffer)[:n])
+        return n
+
+
+def hash_file(filename, chunk_size=1 << 20):
+    """Returns the `StreamedFile.content_hash` of `filename`, reading it without decoding or parsing it."""
+    buffer = bytearray(chunk_size)
+    with open(filename, 'rb') as raw:
+        reader = _HashingReader(raw)
+        while reader.readinto(buffer):
+            pass
+    return reader.digest.hexdigest()
+
+
+class StreamedFile:
+    """Opens `filename` for streaming its lines, while hashing its raw contents.
+
+    The lines are decoded exactly as `PackageContext.get_lines` would decode them.
+    `opener` returns the binary file to read instead of opening `filename` (e.g. an archive member).
+    `content_hash` is available once the lines have all been read.
+
+    Example:
+        with StreamedFile(filename) as streamed:
+            lines, functions, classes, methods = stream_parse(streamed)
+        content_hash = streamed.content_hash
+    """
+
+    def __init__(self, filename, opener=None):
+        self.filename = filename
+        self.opener = opener
+        self.content_hash = None
+
+    def __enter__(self):
+        self._file = self.opener() if self.opener is not None else open(self.filename, 'rb')
+        self._reader = _HashingReader(self._file)
+        self._text = io.TextIOWrapper(io.BufferedReader(self._reader))
+        return self
+
+    def __iter__(self):
+        for line in self._text:
+            yield line.rstrip('\n')
+
+    def __exit__(self, *exc_info):
+        self.content_hash = self._reader.digest.hexdigest()
+        self._text.close()
+        self._file.close()
@@ -0,0 +1,180 @@
+'''
+token_context.py
+
+The tokens of a module, from one `tokenize` pass shared by every token-based stat.
+
+`TokenIndex` reduces the token stream to columns with one entry per line, so the
+metrics of any `CodeBlock` are read from its line range [start, end), without
+tokenizing it again:
+
+    kinds      the kind of each line: LINE_CODE, LINE_BLANK, LINE_COMMENT or LINE_DOCSTRING
+    depths     the number of indented blocks open at each line of code
+    tokens     the number of code tokens starting on each line
+    decisions  the number of decision points (see `DECISION_KEYWORDS`, and `case` clauses) on each line
+'''
+import io
+import tokenize
+from array import array
+
+LINE_CODE = 0
+LINE_BLANK = 1
+LINE_COMMENT = 2
+LINE_DOCSTRING = 3
+LINE_KINDS = ['code', 'blank', 'comment', 'docstring']
+
+# Each of these adds a path through the code: branches, loops, handlers, and
+# short-circuit operators (in statements, comprehensions and conditional expressions)
+DECISION_KEYWORDS = frozenset(['if', 'elif', 'for', 'while', 'except', 'and', 'or'])
+# Each `case` clause of a `match` statement adds one too. `case` is a soft keyword (also
+# a valid name), so it counts only at the start of a statement where a pattern and then a
+# ':' outside brackets follow it, with no assignment in between
+CASE_KEYWORD = 'case'
+OPENING_BRACKETS = frozenset(['(', '[', '{'])
+CLOSING_BRACKETS = frozenset([')', ']', '}'])
+
+# Tokens after which a new statement starts
+STATEMENT_START_TOKENS = frozenset([None, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT])
+
+# Tokens that only lay out the code
+LAYOUT_TOKENS = frozenset([
+    tokenize.NEWLINE, tokenize.NL, tokenize.INDENT, tokenize.DEDENT,
+    tokenize.COMMENT, tokenize.ENDMARKER, tokenize.ENCODING,
+])
+
+
+class TokenIndex:
+    """The per-line token columns of a module's `lines`, from a single `tokenize` pass.
+
+    If the lines cannot be tokenized to the end (e.g. invalid Python), the lines after
+    the error only know whether they are blank.
+    """
+
+    def __init__(self, lines):
+        num_lines = len(lines)
+        self.kinds = bytearray(LINE_BLANK if not line or line.isspace() else LINE_CODE for line in lines)
+        self.depths = array('H', bytes(2 * num_lines))
+        self.tokens = array('I', bytes(4 * num_lines))
+        self.decisions = array('I', bytes(4 * num_lines))
+        self.complete = True
+
+        has_code, has_comment, docstrings = self._scan_tokens(lines)
+        self._classify_lines(has_code, has_comment, docstrings)
+
+    def _scan_tokens(self, lines):
+        """Fills `depths`, `tokens` and `decisions` in a single `tokenize` pass over `lines`.
+
+        Returns (has_code, has_comment, docstrings): whether each line has code, or a comment,
+        and the [start, end) lines of each docstring.
+        """
+        num_lines = len(lines)
+        has_code = bytearray(num_lines)
+        has_comment = bytearray(num_lines)
+        docstrings = []
+
+        readline = io.StringIO(''.join(line + '\n' for line in lines)).readline
+        depth = 0
+        previous = None
+        pending_string = None
+        # Follows a statement that starts with `case` (see `_scan_clause`)
+        clause = None
+        try:
+            for token in tokenize.generate_tokens(readline):
+                row, end_row = token.start[0] - 1, min(token.end[0], num_lines)
+                if pending_string is not None:
+                    # A string alone as the first statement of the module or of a block
+                    if token.type == tokenize.NEWLINE:
+                        docstrings.append(pending_string)
+                    pending_string = None
+                if token.type == tokenize.NEWLINE:
+                    clause = None
+
+                if token.type == tokenize.INDENT:
+                    depth += 1
+                elif token.type == tokenize.DEDENT:
+                    depth -= 1
+                elif token.type == tokenize.COMMENT:
+                    has_comment[row] = 1
+                elif token.type not in LAYOUT_TOKENS:
+                    self._add_code_token(token, row, end_row, depth, has_code)
+                    if token.type == tokenize.STRING and previous in (None, tokenize.INDENT):
+                        pending_string = (row, end_row)
+                    clause = self._scan_clause(token, row, previous, clause)
+
+                if token.type not in (tokenize.NL, tokenize.COMMENT):
+                    previous = token.type
+        except (tokenize.TokenError, SyntaxError):
+            self.complete = False
+
+        return has_code, has_comment, docstrings
+
+    def _add_code_token(self, token, row, end_row, depth, has_code):
+        """Counts the code `token`, starting on line `row` at `depth`, and marks its lines [row, end_row) as code."""
+        for covered in range(row, end_row):
+            has_code[covered] = 1
+        self.tokens[row] += 1
+        self.depths[row] = max(self.depths[row], depth)
+        if token.type == tokenize.NAME and token.string in DECISION_KEYWORDS:
+            self.decisions[row] += 1
+
+    def _scan_clause(self, token, row, previous, clause):
+        """Follows a statement that starts with `case` through its next code `token`, on line `row`.
+
+        `clause` is None, or (row, nesting, empty): the row of `case`, the current bracket nesting, and
+        whether no token followed `case` yet. The first ':' outside brackets ends the pattern, and
+        counts the `case` clause on its row, even when its body follows on the same line. A ':'
+        right after `case` (`case: int`) or an earlier assignment (`case = lambda: 0`) rule it out.
+        Returns the clause to follow with the next token, or None once counted or ruled out.
+        """
+        if previous in STATEMENT_START_TOKENS:
+            return (row, 0, True) if token.string == CASE_KEYWORD else None
+        if clause is None:
+            return None
+
+        row, nesting, empty = clause
+        if token.type == tokenize.OP:
+            if token.string in OPENING_BRACKETS:
+                nesting += 1
+            elif token.string in CLOSING_BRACKETS:
+                nesting -= 1
+            elif nesting == 0 and token.string == '=':
+                return None
+            elif nesting == 0 and token.string == ':':
+                if not empty:
+                    self.decisions[row] += 1
+                return None
+        return row, nesting, False
+
+    def _classify_lines(self, has_code, has_comment, docstrings):
+        """Sets the kind of each line that is not blank: code, comment or docstring."""
+        for row in range(len(self.kinds)):
+            if has_code[row]:
+                self.kinds[row] = LINE_CODE
+            elif has_comment[row]:
+                self.kinds[row] = LINE_COMMENT
+        for start, end in docstrings:
+            self.kinds[start:end] = bytes([LINE_DOCSTRING]) * (end - start)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __repr__(self):
+        return f'TokenIndex(num_lines={len(self)}, num_tokens={sum(self.tokens)}, complete={self.complete})'
+
+    def num_tokens(self, start, end):
+        """Returns the number of code tokens starting in lines [start, end)."""
+        return sum(self.tokens[start:end])
+
+    def complexity(self, start, end):
+        """Returns the cyclomatic complexity of lines [start, end): 1 plus their decision points."""
+        return 1 + sum(self.decisions[start:end])
+
+    def line_kinds(self, start, end):
+        """Returns the number of lines of each of `LINE_KINDS` in lines [start, end), as a dict."""
+        counts = [0] * len(LINE_KINDS)
+        for kind in self.kinds[start:end]:
+            counts[kind] += 1
+        return dict(zip(LINE_KINDS, counts))
+
+    def max_nesting(self, start, end):
+        """Returns how many blocks deep the body of the block in lines [start, end) nests, at most."""
+        return max(0, max(self.depths[start:end], default=0) - self.depths[start] - 1) if end > start else 0
@@ -18,6 +18,8 @@ class Logger(logging.Formatter):
         'ERROR': logging.ERROR,
         'CRITICAL': logging.CRITICAL,
     }
+    # The stream every logger writes to
+    STREAM = sys.stdout
 
     def __init__(self, filename, level="INFO"):
         self.logger = logging.getLogger(filename)
@@ -28,10 +30,19 @@ class Logger(logging.Formatter):
         self.logger.setLevel(logger_level)
 
     def _add_stream_Handler(self):
-        ch = logging.StreamHandler(sys.stdout)
+        ch = logging.StreamHandler(Logger.STREAM)
         ch.setFormatter(logging.Formatter(DisplayFormat.FORMAT.value))
         self.logger.addHandler(ch)
 
+    @staticmethod
+    def use_stream(stream):
+        '''Makes every logger write to `stream`, e.g. sys.stderr when a report is written to sys.stdout.'''
+        Logger.STREAM = stream
+        for logger in logging.Logger.manager.loggerDict.values():
+            for handler in getattr(logger, 'handlers', []):
+                if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+                    handler.setStream(stream)
+
     def _get_custom_logger(self):
         self._setLevel(self.logger_level)
         if not self.logger.handlers:
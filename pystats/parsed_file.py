@@ -8,13 +8,65 @@ Parses and stores:
 - Top-level function codeblocks
 - Top-level class codeblocks and their respective method codeblocks
 
+Code blocks are parsed on first access, so a `ParsedFile` only used for its
+name or number of lines never scans its blocks.
 """
+from collections.abc import Mapping
+from functools import cached_property
+
 try:
     # DEBUGGING
-    from context.file_context import FileContext
+    from context.file_context import LineIndex
+    from context.stream_context import stream_parse
+    from context.token_context import TokenIndex
 except Exception:
     # COMMANDLINE
-    from pystats.context.file_context import FileContext
+    from pystats.context.file_context import LineIndex
+    from pystats.context.stream_context import stream_parse
+    from pystats.context.token_context import TokenIndex
+
+# Identifies the code blocks the parser finds in a given source:
+# bump it whenever they change, so cached results (see `ResultCache`) are not reused.
+PARSER_VERSION = 1
+
+
+class MethodMap(Mapping):
+    """A dict mapping each class `CodeBlock` of a module to a list of method `CodeBlock`s.
+
+    The methods of a class are parsed (from the class body only) the first time
+    they are looked up.
+    """
+
+    def __init__(self, index, classes):
+        self._index = index
+        self._classes = classes
+        self._class_set = set(classes)
+        self._methods = {}
+
+    def __getitem__(self, class_block):
+        if class_block not in self._methods:
+            if class_block not in self._class_set:
+                raise KeyError(class_block)
+            self._methods[class_block] = self._index.get_codeblocks(
+                'def',
+                indent_level=1,
+                start=class_block.start,
+                end=class_block.end
+            )
+            if len(self._methods) == len(self._classes):
+                # Every class is parsed: release the index
+                self._index = None
+
+        return self._methods[class_block]
+
+    def __iter__(self):
+        return iter(self._classes)
+
+    def __len__(self):
+        return len(self._classes)
+
+    def __repr__(self):
+        return f'MethodMap(num_classes={len(self)}, num_parsed={len(self._methods)})'
 
 
 class ParsedFile:
@@ -29,20 +81,125 @@ class ParsedFile:
         functions: A list of top-level function `ClassBlock`s.
         classes: A list of top-level class `ClassBlock`s.
         methods: A dict mapping each class to a list of method `ClassBlock`s.
+
+    `functions`, `classes` and `methods` are parsed on first access, then cached.
     """
 
-    def __init__(self, filename, lines):
-        """Initializes and parses the list of `lines`.
+    # The `ParsedFile` whose blocks this one shares (see `share`)
+    _shared = None
+    # The run's `StringTable`, if any
+    _strings = None
+
+    def __init__(self, filename, lines, content_hash=None, strings=None):
+        """Initializes a module of `lines`, to be parsed on demand.
 
         Assumes they are a Python module named `name` (typically the name of the file).
+        `content_hash` optionally identifies the file contents, so that byte-identical
+        modules can share one parse (see `ParsedFile.share`).
+        `strings` is a `StringTable` interning the filename and the block signatures.
         """
+        self._strings = strings
         self.filename = filename
         self.lines = lines
+        self.content_hash = content_hash
 
+    @classmethod
+    def share(cls, filename, parsed_file):
+        """Returns a `ParsedFile` for `filename` reusing the lines and blocks of `parsed_file`.
+
+        Used for byte-identical modules: no parsing is done, and the new instance
+        refers to the same `lines`, `functions`, `classes` and `methods` objects
+        (parsed once, by whichever instance needs them first).
+        """
+        shared = cls.__new__(cls)
+        shared._strings = parsed_file._strings
+        shared.filename = filename
+        shared.lines = parsed_file.lines
+        shared.content_hash = parsed_file.content_hash
+        shared._shared = parsed_file._shared or parsed_file
+        return shared
+
+    @property
+    def filename(self):
+        """The module's filename, stored as an interned (directory, basename) pair."""
+        return self._directory + self._basename
+
+    @filename.setter
+    def filename(self, filename):
+        if self._strings is None:
+            self._directory, self._basename = '', filename
+        else:
+            self._directory, self._basename = self._strings.intern_path(filename)
+
+    @property
+    def name(self):
+        """The module name."""
         # Assume the module name is the filename without an extension
-        self.name = filename.strip().rsplit('.', maxsplit=1)[0]
+        return self.filename.strip().rsplit('.', maxsplit=1)[0]
+
+    @cached_property
+    def _index(self):
+        # Computed once, and shared by every block query
+        return LineIndex(self.lines, strings=self._strings)
+
+    @cached_property
+    def functions(self):
+        """A list of top-level function `CodeBlock`s."""
+        if self._shared is not None:
+            return self._shared.functions
+        return self._parsed('functions', self._index.get_codeblocks('def'))
+
+    @cached_property
+    def classes(self):
+        """A list of top-level class `CodeBlock`s."""
+        if self._shared is not None:
+            return self._shared.classes
+        return self._parsed('classes', self._index.get_codeblocks('class'))
+
+    @cached_property
+    def methods(self):
+        """A dict mapping each class to a list of method `CodeBlock`s (a `MethodMap`)."""
+        if self._shared is not None:
+            return self._shared.methods
+        return self._parsed('methods', MethodMap(self._index, self.classes))
+
+    @cached_property
+    def tokens(self):
+        """The module's `TokenIndex`: one `tokenize` pass, shared by every token-based stat."""
+        if self._shared is not None:
+            return self._shared.tokens
+        return TokenIndex(self.lines)
+
+    def _parsed(self, name, blocks):
+        """Returns the `blocks` of attribute `name`, releasing the index once only `methods` needs it."""
+        # `methods` keeps its own reference to the index until every class is parsed
+        if all(other == name or other in self.__dict__ for other in ('functions', 'methods')):
+            self.__dict__.pop('_index', None)
+        return blocks
+
+    @classmethod
+    def from_stream(cls, filename, lines, head=None, keep_lines=True, content_hash=None, strings=None):
+        """Returns a `ParsedFile` parsed in a single pass over the iterable `lines`.
+
+        Only the first `head` lines of each code block are retained (None retains all),
+        and the module's own lines only if `keep_lines`; otherwise `lines` only knows its length.
+        """
+        parsed = cls.__new__(cls)
+        parsed._strings = strings
+        parsed.filename = filename
+        parsed.content_hash = content_hash
+        parsed.lines, parsed.functions, parsed.classes, parsed.methods = stream_parse(
+            lines,
+            head=head,
+            keep_lines=keep_lines,
+            strings=strings
+        )
+        return parsed
 
-        self.functions, self.classes, self.methods = self.parse()
+    @property
+    def num_lines(self):
+        """The number of lines of the module, even if they were not retained."""
+        return len(self.lines)
 
     def __repr__(self):
         return (
@@ -64,18 +221,21 @@ class ParsedFile:
                 classes: A list of top-level class `ClassBlock`s.
                 methods: A dict mapping each class to a list of method `ClassBlock`s.
         '''
+        # Index the lines once; every block query below is answered from it
+        index = LineIndex(self.lines)
+
         # Parse the top-level functions and classes
-        functions = FileContext.get_functions(self.lines)
-        classes = FileContext.get_classes(self.lines)
+        functions = index.get_codeblocks('def')
+        classes = index.get_codeblocks('class')
 
         # Construct a dictionary mapping each class to its methods
         methods = {}
         for class_block in classes:
-            methods[class_block] = FileContext.get_functions(
-                class_block.
-                lines,  # Assumes `lines` is part of ClassBlock(..., lines=<>)
+            methods[class_block] = index.get_codeblocks(
+                'def',
                 indent_level=1,
-                offset=class_block.start
+                start=class_block.start,
+                end=class_block.end
             )
 
         return functions, classes, methods
@@ -17,19 +17,42 @@ A report is structured as follows:
 ...
 <footer>
 """
+import json
+import os
+import sys
+import tempfile
 from abc import ABCMeta, abstractmethod
 
+try:
+    # DEBUG
+    from report_model import ModuleEntry, ReportModel
+except Exception:
+    # COMMANDLINE
+    from pystats.report_model import ModuleEntry, ReportModel
+
+
+# Pass as `filename_base` to write a report to the standard output
+STDOUT = '-'
+
 
 class Report(metaclass=ABCMeta):
-    def __init__(self, parsed_files, statistics, tree):
+    def __init__(self, parsed_files, statistics, tree, num_modules=None, model=None):
         """Initialize a new report.
         Args:
             parsed_files: A list of `ParsedFile` objects
             statistics: A dict of `ParsedFile` keys, with a list of `Statistic`s for each.
+            num_modules: The number of modules in the analyzed packages,
+                if only some of them are in `parsed_files` (default: `len(parsed_files)`).
+            model: The `ReportModel` of `parsed_files` and `statistics`, if already built.
+                Pass the same model to each report of a run to build it only once.
         """
         self.parsed_files = parsed_files
         self.statistics = statistics
         self.tree = tree
+        self.num_modules = len(parsed_files) if num_modules is None else num_modules
+        if model is None:
+            model = ReportModel(parsed_files, statistics, tree, num_modules=self.num_modules)
+        self.model = model
 
     def write(self, filename_base):
         """
@@ -37,12 +60,43 @@ class Report(metaclass=ABCMeta):
            `filename_base` followed by the report's extension.
 
         For example, file_base='out' may write 'out.md' for MarkdownReport.
+
+        Sections are written as they are rendered, to a temporary file in the same
+        directory that replaces the report only once complete. If `filename_base`
+        is `STDOUT`, each section is written and flushed to the standard output instead.
         """
+        if filename_base == STDOUT:
+            self.write_sections(sys.stdout, flush=True)
+            return
+
         out_file = filename_base + self.file_extension()
-        report_output = self.render()
+        directory, basename = os.path.split(os.path.abspath(out_file))
+
+        temp = tempfile.NamedTemporaryFile(
+            'w', dir=directory, prefix=f'.{basename}.', suffix='.tmp', delete=False
+        )
+        try:
+            with temp as file:
+                self.write_sections(file)
+            # Same permissions as a file created by open()
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp.name, 0o666 & ~umask)
+            os.replace(temp.name, out_file)
+        except BaseException:
+            os.unlink(temp.name)
+            raise
 
-        with open(out_file, 'w') as file:
-            file.write(report_output)
+    def write_sections(self, file, flush=False):
+        """Writes each section of the report to `file` as soon as it is rendered."""
+        for section in self.iter_sections():
+            file.write(section)
+            if flush:
+                file.flush()
+
+    def render(self):
+        """Returns the report as a string."""
+        return ''.join(self.iter_sections())
 
     ###################
     # Abstract methods
@@ -62,8 +116,8 @@ class Report(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def render(self):
-        """Returns the report as a string."""
+    def iter_sections(self):
+        """Yields the report as consecutive strings, e.g. one per module."""
         pass
 
 
@@ -79,71 +133,175 @@ class MarkdownReport(Report):
         """Returns the file extension of the report."""
         return '.md'
 
-    def render(self):
-        """Returns the report as a string."""
+    def iter_sections(self):
+        """Yields the header of the report, then one section per module."""
         markdown_lines = ['# `pystats` Report']
 
         markdown_lines += ['```']
-        markdown_lines.extend(self.tree)
+        markdown_lines.extend(self.model.annotated_tree())
         markdown_lines += ['```']
 
-        markdown_lines += [f'**Num Modules:** {len(self.parsed_files)}']
+        markdown_lines += [f'**Num Modules:** {self.model.num_modules}']
+        scope = ''
+        if self.model.changed_only:
+            markdown_lines += [f'**Changed Modules:** {self.model.num_analyzed}']
+            scope = ' (changed modules only)'
+        if self.model.distributions:
+            markdown_lines += self.distribution_lines(self.model.distributions, scope=scope)
+        markdown_lines += self.summary_lines(self.model.summary, scope=scope)
+        yield '\n'.join(markdown_lines)
 
         # For each module ...
-        for module in self.parsed_files:
-            stats = self.statistics[module]
-
-            # Start of module
-            markdown_lines += ['\n---\n']
-
-            # MODULE
-            markdown_lines += [f'## module: {module.name}']
-            # Module-level stats
-            for stat in stats:
-                markdown_lines += [f'- {s}' for s in stat.module_stats]
-
-            # For each class ...
-            markdown_lines += ['### Classes']
-            if not module.classes:
-                markdown_lines += ['- No Class']
-
-            for class_block in module.classes:
-                # CLASS
-                markdown_lines += [f'#### `class {class_block.signature}`']
-                # Class-level stats
-                for stat in stats:
-                    if class_block in stat.class_stats:
-                        markdown_lines += [
-                            f'- {s}' for s in stat.class_stats[class_block]
-                        ]
-
-                # METHODS
-                markdown_lines += ['**Methods.**']
-                for method_block in sorted(module.methods[class_block],
-                                           key=lambda mb: mb.signature):
-                    markdown_lines += [f'- `{method_block.signature}`']
-                    # Method-level stats
-                    for stat in stats:
-                        if method_block in stat.function_stats:
-                            markdown_lines += [
-                                f'    - {s}'
-                                for s in stat.function_stats[method_block]
-                            ]
-
-            # FUNCTIONS
-            markdown_lines += ['### Functions']
-            if not module.functions:
-                markdown_lines += ['- No Function']
-
-            for func_block in sorted(module.functions,
-                                     key=lambda fb: fb.signature):
-                markdown_lines += [f'- `{func_block.signature}`']
-                # Function-level stats
-                for stat in stats:
-                    if func_block in stat.function_stats:
-                        markdown_lines += [
-                            f'    - {s}'
-                            for s in stat.function_stats[func_block]
-                        ]
-
-        return '\n'.join(markdown_lines)
+        for module in self.model.iter_modules():
+            yield '\n' + '\n'.join(self.module_lines(module))
+
+    @staticmethod
+    def table_lines(title, columns, rows):
+        """Returns the lines of a table of `rows` under a bold `title`."""
+        markdown_lines = ['', f'**{title}.**', '']
+        markdown_lines += ['| ' + ' | '.join(columns) + ' |']
+        markdown_lines += ['|' + '---|' * len(columns)]
+        markdown_lines += ['| ' + ' | '.join(str(value) for value in row) + ' |' for row in rows]
+        return markdown_lines
+
+    @classmethod
+    def distribution_lines(cls, distributions, scope=''):
+        """Returns the lines of the table of `distributions` (a `Distributions`), its title followed by `scope`."""
+        return cls.table_lines(f'Distributions{scope}', *distributions.summary())
+
+    @classmethod
+    def summary_lines(cls, summary, scope=''):
+        """Returns the lines of the tables of `summary` (a `PackageSummary`), their titles followed by `scope`."""
+        markdown_lines = cls.table_lines(
+            f'Blocks{scope}', ['block', 'count', 'total lines', 'mean lines', 'max lines'], summary.blocks
+        )
+        markdown_lines += cls.table_lines(
+            f'Length Histogram{scope}', ['lines', 'functions', 'classes'], summary.histogram
+        )
+        markdown_lines += cls.table_lines(
+            f'Module Size by Subpackage{scope}',
+            ['subpackage', 'modules', 'total lines', 'mean lines', 'max lines'],
+            summary.subpackages
+        )
+        return markdown_lines
+
+    @staticmethod
+    def module_lines(module):
+        """Returns the lines of the section of `module` (a `ModuleEntry`)."""
+        # Start of module
+        markdown_lines = ['\n---\n']
+
+        # MODULE
+        markdown_lines += [f'## module: {module.name}']
+        # Module-level stats
+        markdown_lines += [f'- {s}' for s in module.stats]
+
+        # For each class ...
+        markdown_lines += ['### Classes']
+        if not module.classes:
+            markdown_lines += ['- No Class']
+
+        for class_entry in module.classes:
+            # CLASS
+            markdown_lines += [f'#### `class {class_entry.signature}`']
+            # Class-level stats
+            markdown_lines += [f'- {s}' for s in class_entry.stats]
+
+            # METHODS
+            markdown_lines += ['**Methods.**']
+            for method_entry in class_entry.methods:
+                markdown_lines += [f'- `{method_entry.signature}`']
+                # Method-level stats
+                markdown_lines += [f'    - {s}' for s in method_entry.stats]
+
+        # FUNCTIONS
+        markdown_lines += ['### Functions']
+        if not module.functions:
+            markdown_lines += ['- No Function']
+
+        for func_entry in module.functions:
+            markdown_lines += [f'- `{func_entry.signature}`']
+            # Function-level stats
+            markdown_lines += [f'    - {s}' for s in func_entry.stats]
+
+        return markdown_lines
+
+
+class NDJSONReport(Report):
+    """Generates a newline-delimited JSON report: one record per module, class, method and function.
+
+    Each record has a `type` ('module', 'class', 'method' or 'function'), the module
+    `name` and `path`, the block `signature` and line span if any, and the numeric
+    `values` of every stat. They are followed by a 'directory' record per `DirectoryRollup`
+    and a 'distribution' record per package-level distribution. Under `--since`, these cover
+    the changed modules only, and have `changed_only` set.
+
+    If `modules_written` is True, the module records were already written as each module
+    was analyzed (see `write_module`), and only the directory and distribution records are left.
+    """
+    def __init__(self, *args, modules_written=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.modules_written = modules_written
+
+    @staticmethod
+    def name():
+        """Returns the name the report will be registered as."""
+        return 'NDJSONReport'
+
+    @staticmethod
+    def file_extension():
+        """Returns the file extension of the report."""
+        return '.ndjson'
+
+    def iter_sections(self):
+        """Yields each record as a line of JSON."""
+        if not self.modules_written:
+            for module in self.model.iter_modules():
+                for record in self.module_records(module):
+                    yield json.dumps(record) + '\n'
+
+        scope = {'changed_only': True} if self.model.changed_only else {}
+        for rollup in self.model.rollups.values():
+            yield json.dumps({'type': 'directory', **rollup.as_dict(), **scope}) + '\n'
+
+        if self.model.distributions:
+            columns, rows = self.model.distributions.summary()
+            for row in rows:
+                yield json.dumps({'type': 'distribution', **dict(zip(columns, row)), **scope}) + '\n'
+
+    @classmethod
+    def write_module(cls, file, module, stats):
+        """Writes the records of `module` (a `ParsedFile`) and its `stats` to `file`, and flushes it."""
+        cls.write_entry(file, ModuleEntry.build(module, stats))
+
+    @classmethod
+    def write_entry(cls, file, module):
+        """Writes the records of `module` (a `ModuleEntry`) to `file`, and flushes it."""
+        for record in cls.module_records(module):
+            file.write(json.dumps(record) + '\n')
+        file.flush()
+
+    @staticmethod
+    def module_records(module):
+        """Yields the records of `module` (a `ModuleEntry`) and of its blocks."""
+        def block_record(record_type, entry, **fields):
+            return {
+                'type': record_type,
+                'module': module.name,
+                'path': module.filename,
+                **fields,
+                'signature': entry.signature,
+                'start': entry.start,
+                'end': entry.end,
+                'values': entry.values,
+            }
+
+        yield {'type': 'module', 'module': module.name, 'path': module.filename, 'values': module.values}
+
+        for class_entry in module.classes:
+            yield block_record('class', class_entry)
+            for method_entry in class_entry.methods:
+                yield block_record('method', method_entry, **{'class': class_entry.signature})
+
+        for func_entry in module.functions:
+            yield block_record('function', func_entry)
@@ -0,0 +1,317 @@
+"""
+report_model.py
+
+The format-independent content of a report, built once per run.
+
+For each module, the stats of every `Statistic` are merged per block, and the
+methods and functions are sorted by signature. `Report` subclasses only
+serialize this model, so each additional format costs serialization time only.
+
+The model also rolls the module totals up to every directory (`DirectoryRollup`),
+and summarizes the block and module lengths (`summary.py`). Both are gathered by
+`ReportTotals` in a single pass, as each module's entry is built during the run, so
+reports never rebuild the entries for them (even when they are not cached).
+"""
+import os
+from collections import defaultdict
+
+try:
+    # DEBUG
+    from results.summary import MetricColumns, summarize
+    from utils.format_tree import DisplayablePath
+except Exception:
+    # COMMANDLINE
+    from pystats.results.summary import MetricColumns, summarize
+    from pystats.utils.format_tree import DisplayablePath
+
+
+class BlockEntry:
+    """A function, method or class of a report, with its merged stats.
+
+    Attributes:
+        keyword: The type of code block (e.g. 'def', 'class').
+        signature: The block signature.
+        start, end: The block's line indexes into the module.
+        stats: The stat strings of every `Statistic`, in order.
+        values: The metric values of every `Statistic`, merged.
+        methods: For a class, the `BlockEntry` of each method, sorted by signature.
+    """
+
+    def __init__(self, block, stats, values, methods=None):
+        self.keyword = block.keyword
+        self.signature = block.signature
+        self.start = block.start
+        self.end = block.end
+        self.stats = stats
+        self.values = values
+        self.methods = methods if methods is not None else []
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return f'BlockEntry(signature={self.signature}, num_stats={len(self.stats)})'
+
+
+class ModuleEntry:
+    """A module of a report, with its merged stats.
+
+    Attributes:
+        name, filename, num_lines: As in `ParsedFile`.
+        stats: The module-level stat strings of every `Statistic`, in order.
+        values: The module-level metric values of every `Statistic`, merged.
+        stat_names: The name of every `Statistic`, in order.
+        classes: The `BlockEntry` of each class, in module order.
+        functions: The `BlockEntry` of each function, sorted by signature.
+    """
+
+    def __init__(self, name, filename, stats, values, classes, functions, num_lines=0, stat_names=()):
+        self.name = name
+        self.filename = filename
+        self.num_lines = num_lines
+        self.stats = stats
+        self.values = values
+        self.stat_names = stat_names
+        self.classes = classes
+        self.functions = functions
+
+    def __repr__(self):
+        return (f'ModuleEntry(name={self.name}, num_classes={len(self.classes)}, '
+                f'num_functions={len(self.functions)})')
+
+    @classmethod
+    def build(cls, module, stats):
+        """Returns the `ModuleEntry` of `module` (a `ParsedFile`) and its list of `Statistic`s."""
+        module_stats = []
+        module_values = {}
+        function_stats = defaultdict(list)
+        function_values = defaultdict(dict)
+        class_stats = defaultdict(list)
+        class_values = defaultdict(dict)
+
+        # One pass over each stat's entries, instead of probing each stat for each block
+        for stat in stats:
+            module_stats.extend(stat.module_stats)
+            module_values.update(stat.module_values)
+            for block, block_stats in stat.function_stats.items():
+                function_stats[block].extend(block_stats)
+            for block, values in stat.function_values.items():
+                function_values[block].update(values)
+            for block, block_stats in stat.class_stats.items():
+                class_stats[block].extend(block_stats)
+            for block, values in stat.class_values.items():
+                class_values[block].update(values)
+
+        def entry(block, block_stats, block_values, methods=None):
+            return BlockEntry(block, block_stats.get(block, []), block_values.get(block, {}), methods)
+
+        classes = [
+            entry(class_block, class_stats, class_values, methods=[
+                entry(method_block, function_stats, function_values)
+                for method_block in sorted(module.methods[class_block], key=lambda mb: mb.signature)
+            ])
+            for class_block in module.classes
+        ]
+        functions = [
+            entry(func_block, function_stats, function_values)
+            for func_block in sorted(module.functions, key=lambda fb: fb.signature)
+        ]
+
+        return cls(module.name, str(module.filename), module_stats, module_values, classes, functions,
+                   num_lines=module.num_lines, stat_names=[stat.name() for stat in stats])
+
+
+class DirectoryRollup:
+    """The totals of the modules in a directory and its subdirectories."""
+
+    FIELDS = ['num_modules', 'num_lines', 'num_classes', 'num_methods', 'num_functions', 'missing_docstrings']
+
+    def __init__(self, path):
+        self.path = path
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+        # Only known if `WarnNoDocstring` was computed
+        self.missing_docstrings = None
+
+    def __repr__(self):
+        return f'DirectoryRollup(path={self.path}, num_modules={self.num_modules})'
+
+    def __str__(self):
+        totals = (f'modules: {self.num_modules}, lines: {self.num_lines}, classes: {self.num_classes}, '
+                  f'methods: {self.num_methods}, functions: {self.num_functions}')
+        if self.missing_docstrings is not None:
+            totals += f', missing docstrings: {self.missing_docstrings}'
+        return totals
+
+    def add_module(self, module):
+        """Adds the totals of `module` (a `ModuleEntry`), counted from its blocks rather than from its stats."""
+        methods = [method for class_entry in module.classes for method in class_entry.methods]
+        self.num_modules += 1
+        self.num_lines += module.num_lines
+        self.num_classes += len(module.classes)
+        self.num_methods += len(methods)
+        self.num_functions += len(module.functions)
+        if 'WarnNoDocstring' in module.stat_names:
+            self.missing_docstrings = (self.missing_docstrings or 0) + sum(
+                bool(entry.values.get('missing_docstring')) for entry in methods + module.functions
+            )
+
+    def add(self, other):
+        """Adds the totals of `other` (a `DirectoryRollup` of a subdirectory)."""
+        for field in self.FIELDS:
+            value = getattr(other, field)
+            if value is not None:
+                setattr(self, field, (getattr(self, field) or 0) + value)
+
+    def as_dict(self):
+        return {'path': self.path, **{field: getattr(self, field) for field in self.FIELDS}}
+
+
+class ReportTotals:
+    """The totals of the modules of a run, gathered in a single pass over their `ModuleEntry`s.
+
+    Each module is added once, to the totals of its own directory and to the `MetricColumns`
+    of the summary. Rolling the directories up to their ancestors then reads the directories only.
+    """
+
+    def __init__(self):
+        # The `DirectoryRollup` of the modules directly in each directory
+        self.directories = {}
+        self.columns = MetricColumns()
+
+    def __repr__(self):
+        return f'ReportTotals(num_directories={len(self.directories)})'
+
+    def add_module(self, module):
+        """Adds the totals of `module` (a `ModuleEntry`)."""
+        directory = os.path.dirname(os.path.relpath(module.filename)) or os.curdir
+        if directory not in self.directories:
+            self.directories[directory] = DirectoryRollup(directory)
+        self.directories[directory].add_module(module)
+        self.columns.add_module(module)
+
+    def rollups(self):
+        """
+        Returns a dict mapping each directory containing modules, directly or not, to its `DirectoryRollup`.
+
+        Directories are relative to the working directory, so they match the directories of the tree.
+        Each directory, deepest first, is added to its parent.
+        """
+        rollups = {}
+        for directory, direct in self.directories.items():
+            rollups[directory] = DirectoryRollup(directory)
+            rollups[directory].add(direct)
+
+        # Create the ancestors, up to the root of each path
+        for directory in list(rollups):
+            parent = os.path.dirname(directory)
+            while parent and parent not in rollups and parent != directory:
+                rollups[parent] = DirectoryRollup(parent)
+                directory, parent = parent, os.path.dirname(parent)
+
+        for directory in sorted(rollups, key=lambda d: d.count(os.sep), reverse=True):
+            parent = os.path.dirname(directory)
+            if parent in rollups and parent != directory:
+                rollups[parent].add(rollups[directory])
+
+        return {directory: rollups[directory] for directory in sorted(rollups)}
+
+
+class ReportModel:
+    """The content of a report: the tree, the module count, a `ModuleEntry` per module
+    and, if given, the package-level `Distributions`.
+
+    If `cache` is False, module entries are rebuilt each time `modules` is iterated
+    instead of being kept, e.g. when the results were spilled to disk to save memory.
+    `roots` is the path of each tree's root, relative to the working directory (see `rollups`).
+    `totals` are the `ReportTotals` gathered while the modules were analyzed; if None, they are
+    gathered in one pass over the modules when first needed.
+    If `changed_only` is True, only the modules changed since a commit were analyzed (`--since`), while
+    `tree` and `num_modules` cover every module: the rollups, summary and distributions cover the changed
+    modules only, so they are not added to the tree.
+    """
+
+    def __init__(self, parsed_files, statistics, tree, num_modules=None, cache=True, distributions=None,
+                 roots=None, totals=None, changed_only=False):
+        self.parsed_files = parsed_files
+        self.statistics = statistics
+        self.tree = tree
+        self.roots = roots
+        self.num_modules = len(parsed_files) if num_modules is None else num_modules
+        self.cache = cache
+        self.distributions = distributions
+        self.changed_only = changed_only
+        self._modules = None
+        self._totals = totals
+        self._rollups = None
+        self._summary = None
+
+    def iter_modules(self):
+        """Yields the `ModuleEntry` of each module, in order."""
+        if self._modules is not None:
+            yield from self._modules
+            return
+
+        modules = [] if self.cache else None
+        for parsed_file in self.parsed_files:
+            module = ModuleEntry.build(parsed_file, self.statistics[parsed_file])
+            if modules is not None:
+                modules.append(module)
+            yield module
+
+        self._modules = modules
+
+    @property
+    def modules(self):
+        """The `ModuleEntry`s of the report (a list if cached, otherwise a generator)."""
+        if self.cache:
+            if self._modules is None:
+                for _ in self.iter_modules():
+                    pass
+            return self._modules
+        return self.iter_modules()
+
+    @property
+    def num_analyzed(self):
+        """The number of modules analyzed (fewer than `num_modules` if `changed_only`)."""
+        return len(self.parsed_files)
+
+    @property
+    def totals(self):
+        """The `ReportTotals` of the modules."""
+        if self._totals is None:
+            totals = ReportTotals()
+            for module in self.iter_modules():
+                totals.add_module(module)
+            self._totals = totals
+        return self._totals
+
+    @property
+    def rollups(self):
+        """A dict mapping each directory containing modules, directly or not, to its `DirectoryRollup`."""
+        if self._rollups is None:
+            self._rollups = self.totals.rollups()
+        return self._rollups
+
+    @property
+    def summary(self):
+        """The `PackageSummary` of the modules: block totals, length histograms and module sizes per subpackage."""
+        if self._summary is None:
+            self._summary = summarize(self.totals.columns)
+        return self._summary
+
+    def annotated_tree(self):
+        """Returns the lines of `tree`, with the rollup of each directory that contains modules.
+
+        If `changed_only`, the rollups would not count the unchanged modules of the tree: it is left as is.
+        """
+        if self.changed_only:
+            return list(self.tree)
+
+        rollups = self.rollups
+        lines = []
+        for line, path, is_dir in DisplayablePath.parseMarkdownPath(self.tree, roots=self.roots):
+            if is_dir and path in rollups:
+                line = f'{line}  ({rollups[path]})'
+            lines.append(line)
+        return lines
@@ -0,0 +1,282 @@
+"""
+binary_snapshot.py
+
+A versioned binary snapshot, for loading results of large runs without parsing them.
+
+It holds the same records as a JSON Lines snapshot (see `snapshot.py`), packed
+into little-endian `array` columns, each aligned to 8 bytes:
+
+    header          magic, version, and the number of strings, modules, blocks and metric columns
+    sections        (offset, size) of each of `SECTIONS`
+    metric columns  (scope, name, typecode, offset, size) of each metric column
+    data            the strings (UTF-8, with an offset table) and the columns
+
+Paths and block names are stored once in the string table and referred to by
+index. Modules are sorted by path in `module_by_path`, and their blocks are
+contiguous, so a module is found by binary search and read on its own.
+`BinarySnapshot` maps the file with `mmap` and reads the columns in place.
+"""
+import array
+import mmap
+import struct
+import sys
+
+BINARY_SNAPSHOT_MAGIC = b'PYSTSNAP'
+BINARY_SNAPSHOT_VERSION = 1
+BINARY_SNAPSHOT_EXTENSION = '.pysnap'
+
+HEADER = struct.Struct('<8sIIQQQI')
+SECTION = struct.Struct('<QQ')
+METRIC_COLUMN = struct.Struct('<BIcQQ')
+
+# name: typecode of the column
+SECTIONS = {
+    'string_offsets': 'Q',
+    'string_data': 'B',
+    'module_path': 'I',
+    'module_first_block': 'Q',
+    'module_by_path': 'I',
+    'block_kind': 'B',
+    'block_name': 'I',
+}
+
+BLOCK_KINDS = ['class', 'method', 'function']
+MODULE_SCOPE, BLOCK_SCOPE = 0, 1
+
+# Stands for a metric without value in integer columns; float columns use NaN
+MISSING = -2 ** 63
+
+
+def _column(values, typecode):
+    column = array.array(typecode, values)
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column
+
+
+def _metric_column(values, num_rows):
+    """Returns the column of a metric, given a dict mapping rows to values."""
+    if all(isinstance(value, (bool, int)) for value in values.values()):
+        return _column((int(values.get(i, MISSING)) for i in range(num_rows)), 'q')
+    return _column((float(values.get(i, 'nan')) for i in range(num_rows)), 'd')
+
+
+def write_binary_snapshot(path, records):
+    """Writes the snapshot records (see `snapshot.module_record`) to `path` in binary."""
+    strings = {}
+
+    def string_id(text):
+        if text not in strings:
+            strings[text] = len(strings)
+        return strings[text]
+
+    module_path = array.array('I')
+    module_first_block = array.array('Q', [0])
+    block_kind = array.array('B')
+    block_name = array.array('I')
+    # (scope, metric name): {row: value}
+    metrics = {}
+
+    for record in records:
+        module_index = len(module_path)
+        module_path.append(string_id(record['path']))
+        for key, value in record['values'].items():
+            metrics.setdefault((MODULE_SCOPE, key), {})[module_index] = value
+
+        for kind, name, values in record['blocks']:
+            block_index = len(block_kind)
+            block_kind.append(BLOCK_KINDS.index(kind))
+            block_name.append(string_id(name))
+            for key, value in values.items():
+                metrics.setdefault((BLOCK_SCOPE, key), {})[block_index] = value
+        module_first_block.append(len(block_kind))
+
+    num_modules, num_blocks = len(module_path), len(block_kind)
+    metric_columns = [
+        (scope, string_id(key), _metric_column(values, num_modules if scope == MODULE_SCOPE else num_blocks))
+        for (scope, key), values in sorted(metrics.items())
+    ]
+
+    string_list = list(strings)
+    encoded = [text.encode('utf-8') for text in string_list]
+    string_offsets = array.array('Q', [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+
+    columns = {
+        'string_offsets': _column(string_offsets, 'Q'),
+        'string_data': b''.join(encoded),
+        'module_path': _column(module_path, 'I'),
+        'module_first_block': _column(module_first_block, 'Q'),
+        'module_by_path': _column(sorted(range(num_modules), key=lambda i: string_list[module_path[i]]), 'I'),
+        'block_kind': block_kind,
+        'block_name': _column(block_name, 'I'),
+    }
+    data_columns = list(columns.values()) + [column for _, _, column in metric_columns]
+
+    # Lay out the data after the header and the directories, aligned to 8 bytes
+    offset = HEADER.size + SECTION.size * len(SECTIONS) + METRIC_COLUMN.size * len(metric_columns)
+    layout = []
+    for data in data_columns:
+        offset += -offset % 8
+        size = len(data) * getattr(data, 'itemsize', 1)
+        layout.append((offset, size))
+        offset += size
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(BINARY_SNAPSHOT_MAGIC, BINARY_SNAPSHOT_VERSION, 0,
+                            len(string_list), num_modules, num_blocks, len(metric_columns)))
+        for section_offset, size in layout[:len(SECTIONS)]:
+            f.write(SECTION.pack(section_offset, size))
+        for (scope, name_id, column), (section_offset, size) in zip(metric_columns, layout[len(SECTIONS):]):
+            f.write(METRIC_COLUMN.pack(scope, name_id, column.typecode.encode(), section_offset, size))
+
+        for data, (section_offset, size) in zip(data_columns, layout):
+            f.write(b'\0' * (section_offset - f.tell()))
+            f.write(data)
+
+
+class BinarySnapshot:
+    """
+    A binary snapshot, mapped in memory.
+
+    Records are decoded only when looked up:
+
+        with BinarySnapshot(path) as snapshot:
+            record = snapshot.get('pkg/mod.py')
+    """
+
+    def __init__(self, path):
+        self.filename = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped
+            self._file.close()
+            raise ValueError(f'Not a pystats binary snapshot (version {BINARY_SNAPSHOT_VERSION}): {path}')
+        self._buffer = memoryview(self._mmap)
+        self._views = [self._buffer]
+
+        try:
+            magic, version, _, num_strings, num_modules, num_blocks, num_metrics = HEADER.unpack_from(self._buffer)
+        except struct.error:
+            magic, version = None, None
+        if magic != BINARY_SNAPSHOT_MAGIC or version != BINARY_SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f'Not a pystats binary snapshot (version {BINARY_SNAPSHOT_VERSION}): {path}')
+
+        self.num_strings = num_strings
+        self.num_modules = num_modules
+        self.num_blocks = num_blocks
+
+        position = HEADER.size
+        for name, typecode in SECTIONS.items():
+            offset, size = SECTION.unpack_from(self._buffer, position)
+            position += SECTION.size
+            setattr(self, f'_{name}', self._view(offset, size, typecode))
+
+        self._module_metrics = []
+        self._block_metrics = []
+        for _ in range(num_metrics):
+            scope, name_id, typecode, offset, size = METRIC_COLUMN.unpack_from(self._buffer, position)
+            position += METRIC_COLUMN.size
+            column = (self.string(name_id), self._view(offset, size, typecode.decode()))
+            (self._module_metrics if scope == MODULE_SCOPE else self._block_metrics).append(column)
+
+    def _view(self, offset, size, typecode):
+        """Returns the column at `offset` as a typed, read-only view (or a copy on big-endian hosts)."""
+        view = self._buffer[offset:offset + size]
+        if typecode == 'B':
+            self._views.append(view)
+            return view
+        if sys.byteorder != 'little':
+            column = array.array(typecode, view)
+            column.byteswap()
+            view.release()
+            return column
+
+        view = view.cast(typecode)
+        self._views.append(view)
+        return view
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.num_modules
+
+    def __iter__(self):
+        """Yields the record of each module, in order."""
+        for index in range(self.num_modules):
+            yield self.module_record(index)
+
+    def string(self, index):
+        """Returns the string at `index` in the string table."""
+        start, end = self._string_offsets[index], self._string_offsets[index + 1]
+        return bytes(self._string_data[start:end]).decode('utf-8')
+
+    def path(self, index):
+        """Returns the path of the module at `index`."""
+        return self.string(self._module_path[index])
+
+    def find_module(self, path):
+        """Returns the index of the module at `path`, or None if there is none."""
+        by_path = self._module_by_path
+        low, high = 0, len(by_path)
+        while low < high:
+            middle = (low + high) // 2
+            if self.path(by_path[middle]) < path:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < len(by_path) and self.path(by_path[low]) == path:
+            return by_path[low]
+        return None
+
+    def get(self, path):
+        """Returns the record of the module at `path`, or None if there is none."""
+        index = self.find_module(path)
+        return None if index is None else self.module_record(index)
+
+    @staticmethod
+    def _values(columns, row):
+        values = {}
+        for key, column in columns:
+            value = column[row]
+            if value != value or value == MISSING:
+                # NaN or missing
+                continue
+            values[key] = value
+        return values
+
+    def module_record(self, index):
+        """Returns the record of the module at `index`, as in a JSON Lines snapshot."""
+        start, end = self._module_first_block[index], self._module_first_block[index + 1]
+        return {
+            'path': self.path(index),
+            'values': self._values(self._module_metrics, index),
+            'blocks': [
+                [BLOCK_KINDS[self._block_kind[i]], self.string(self._block_name[i]),
+                 self._values(self._block_metrics, i)]
+                for i in range(start, end)
+            ],
+        }
+
+    def close(self):
+        """Releases the mapping and closes the file."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+        self._file.close()
+
+
+def is_binary_snapshot(path):
+    """Returns whether the file at `path` starts like a binary snapshot."""
+    with open(path, 'rb') as f:
+        return f.read(len(BINARY_SNAPSHOT_MAGIC)) == BINARY_SNAPSHOT_MAGIC
@@ -0,0 +1,173 @@
+"""
+diff.py
+
+Compares two snapshots (see `snapshot.py`) and reports only what changed.
+
+Modules are matched by path and blocks by kind and qualified signature, using
+dicts, so the comparison is linear in the size of the snapshots. The old
+snapshot is indexed once, or looked up in place if it is binary; the new one is streamed.
+"""
+
+try:
+    # DEBUG
+    from results.binary_snapshot import BinarySnapshot, is_binary_snapshot
+    from results.snapshot import iter_snapshot
+except Exception:
+    # COMMANDLINE
+    from pystats.results.binary_snapshot import BinarySnapshot, is_binary_snapshot
+    from pystats.results.snapshot import iter_snapshot
+
+
+class BlockChange:
+    """A class, method or function that was added, removed or whose values changed."""
+
+    def __init__(self, status, kind, name, old_values, new_values):
+        self.status = status
+        self.kind = kind
+        self.name = name
+        self.old_values = old_values
+        self.new_values = new_values
+
+    def __repr__(self):
+        return f'BlockChange(status={self.status}, kind={self.kind}, name={self.name})'
+
+
+class ModuleDiff:
+    """The changes of one module between two snapshots.
+
+    Attributes:
+        path: The module path.
+        status: 'added', 'removed' or 'changed'.
+        value_changes: A dict mapping each changed module metric to its (old, new) values.
+        block_changes: A list of `BlockChange`s.
+    """
+
+    def __init__(self, path, status, value_changes=None, block_changes=None, num_blocks=0):
+        self.path = path
+        self.status = status
+        self.value_changes = value_changes or {}
+        self.block_changes = block_changes or []
+        self.num_blocks = num_blocks
+
+    def __repr__(self):
+        return (f'ModuleDiff(path={self.path}, status={self.status}, '
+                f'num_value_changes={len(self.value_changes)}, '
+                f'num_block_changes={len(self.block_changes)})')
+
+
+def diff_values(old_values, new_values):
+    """Returns a dict mapping each metric whose value differs to its (old, new) values."""
+    return {
+        key: (old_values.get(key), new_values.get(key))
+        for key in old_values.keys() | new_values.keys()
+        if old_values.get(key) != new_values.get(key)
+    }
+
+
+def diff_module(old, new):
+    """Returns the `ModuleDiff` between two records of the same module, or None if they are equal."""
+    old_blocks = {(kind, name): values for kind, name, values in old['blocks']}
+
+    block_changes = []
+    for kind, name, values in new['blocks']:
+        old_values = old_blocks.pop((kind, name), None)
+        if old_values is None:
+            block_changes.append(BlockChange('added', kind, name, {}, values))
+        elif old_values != values:
+            block_changes.append(BlockChange('changed', kind, name, old_values, values))
+
+    for (kind, name), values in old_blocks.items():
+        block_changes.append(BlockChange('removed', kind, name, values, {}))
+
+    value_changes = diff_values(old['values'], new['values'])
+    if not value_changes and not block_changes:
+        return None
+
+    return ModuleDiff(new['path'], 'changed', value_changes, block_changes, num_blocks=len(new['blocks']))
+
+
+def diff_snapshots(old_path, new_path):
+    """Yields a `ModuleDiff` for each module that differs between two snapshot files."""
+    if is_binary_snapshot(old_path):
+        with BinarySnapshot(old_path) as old_snapshot:
+            yield from _diff_indexed(old_snapshot, new_path)
+        return
+
+    old_index = {record['path']: record for record in iter_snapshot(old_path)}
+
+    for new in iter_snapshot(new_path):
+        old = old_index.pop(new['path'], None)
+        if old is None:
+            yield ModuleDiff(new['path'], 'added', num_blocks=len(new['blocks']))
+            continue
+
+        module_diff = diff_module(old, new)
+        if module_diff is not None:
+            yield module_diff
+
+    for path, old in old_index.items():
+        yield ModuleDiff(path, 'removed', num_blocks=len(old['blocks']))
+
+
+def _diff_indexed(old_snapshot, new_path):
+    """Like `diff_snapshots`, looking up each module in `old_snapshot` (a `BinarySnapshot`) instead of indexing it."""
+    seen = set()
+    for new in iter_snapshot(new_path):
+        index = old_snapshot.find_module(new['path'])
+        if index is None:
+            yield ModuleDiff(new['path'], 'added', num_blocks=len(new['blocks']))
+            continue
+
+        seen.add(index)
+        module_diff = diff_module(old_snapshot.module_record(index), new)
+        if module_diff is not None:
+            yield module_diff
+
+    for index in range(len(old_snapshot)):
+        if index not in seen:
+            old = old_snapshot.module_record(index)
+            yield ModuleDiff(old['path'], 'removed', num_blocks=len(old['blocks']))
+
+
+def _format_values(values):
+    return ', '.join(f'{key}: {value}' for key, value in sorted(values.items()))
+
+
+def _format_changes(value_changes):
+    parts = []
+    for key, (old, new) in sorted(value_changes.items()):
+        text = f'**{key}:** {old} → {new}'
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+            text += f' ({new - old:+})'
+        parts.append(text)
+    return '; '.join(parts)
+
+
+def render_diff(module_diffs):
+    """Yields the Markdown lines describing `module_diffs`, followed by a summary."""
+    counts = {'added': 0, 'removed': 0, 'changed': 0}
+
+    yield '# `pystats` Diff'
+    for module_diff in module_diffs:
+        counts[module_diff.status] += 1
+
+        if module_diff.status != 'changed':
+            yield f'## module: {module_diff.path} ({module_diff.status}, {module_diff.num_blocks} blocks)'
+            continue
+
+        yield f'## module: {module_diff.path}'
+        if module_diff.value_changes:
+            yield f'- {_format_changes(module_diff.value_changes)}'
+
+        for change in module_diff.block_changes:
+            if change.status == 'added':
+                yield f'- added {change.kind} `{change.name}` ({_format_values(change.new_values)})'
+            elif change.status == 'removed':
+                yield f'- removed {change.kind} `{change.name}`'
+            else:
+                value_changes = diff_values(change.old_values, change.new_values)
+                yield f'- {change.kind} `{change.name}`: {_format_changes(value_changes)}'
+
+    yield '\n---\n'
+    yield (f'**Modules:** {counts["added"]} added, '
+           f'{counts["removed"]} removed, {counts["changed"]} changed')
@@ -0,0 +1,88 @@
+"""
+distributions.py
+
+Package-level distributions of module, class and function metrics.
+
+Each distribution is a `QuantileSketch`, updated one module at a time, so
+memory stays bounded whatever the number of modules. Sketches of separate
+shards (see `partial.py`) are merged into the distributions of the whole run.
+"""
+
+try:
+    # DEBUG
+    from report_model import ModuleEntry
+    from utils.sketch import QuantileSketch
+except Exception:
+    # COMMANDLINE
+    from pystats.report_model import ModuleEntry
+    from pystats.utils.sketch import QuantileSketch
+
+# name: description
+DISTRIBUTIONS = {
+    'module_lines': 'Module lines',
+    'class_methods': 'Methods per class',
+    'method_lines': 'Method lines',
+    'function_lines': 'Function lines',
+    'complexity': 'Complexity per function/method',
+}
+
+QUANTILES = [0.5, 0.9, 0.99]
+
+
+class Distributions:
+    """A `QuantileSketch` for each of `DISTRIBUTIONS`."""
+
+    def __init__(self, sketches=None):
+        self.sketches = sketches or {name: QuantileSketch() for name in DISTRIBUTIONS}
+
+    def __repr__(self):
+        return f'Distributions({", ".join(f"{n}={len(s)}" for n, s in self.sketches.items())})'
+
+    def __bool__(self):
+        return any(len(sketch) for sketch in self.sketches.values())
+
+    def add_module(self, module, stats):
+        """Adds the metric values of `module` (a `ParsedFile`) and its list of `Statistic`s."""
+        self.add_entry(ModuleEntry.build(module, stats))
+
+    def add_entry(self, module):
+        """Adds the metric values of `module` (a `ModuleEntry`)."""
+        def add(name, values, key):
+            if key in values:
+                self.sketches[name].update(values[key])
+
+        add('module_lines', module.values, 'num_lines')
+        for class_entry in module.classes:
+            add('class_methods', class_entry.values, 'num_methods')
+            for method_entry in class_entry.methods:
+                add('method_lines', method_entry.values, 'num_lines')
+                add('complexity', method_entry.values, 'complexity')
+        for func_entry in module.functions:
+            add('function_lines', func_entry.values, 'num_lines')
+            add('complexity', func_entry.values, 'complexity')
+
+    def merge(self, other):
+        """Adds the values summarized by `other` (e.g. the `Distributions` of another shard)."""
+        for name, sketch in other.sketches.items():
+            if name in self.sketches:
+                self.sketches[name].merge(sketch)
+            else:
+                self.sketches[name] = sketch
+        return self
+
+    def summary(self):
+        """Returns (columns, rows): the count, p50, p90, p99 and maximum of each non-empty distribution."""
+        columns = ['distribution', 'count'] + [f'p{round(q * 100)}' for q in QUANTILES] + ['max']
+        rows = [
+            [DISTRIBUTIONS.get(name, name), len(sketch)] + sketch.quantiles(QUANTILES) + [sketch.max]
+            for name, sketch in self.sketches.items()
+            if len(sketch)
+        ]
+        return columns, rows
+
+    def to_json(self):
+        return {name: sketch.to_json() for name, sketch in self.sketches.items()}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls({name: QuantileSketch.from_json(sketch) for name, sketch in data.items()})
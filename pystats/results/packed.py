@@ -0,0 +1,309 @@
+"""
+packed.py
+
+A compact encoding of the results a worker process sends back (`--jobs N`).
+
+Pickling `ParsedFile`s and `Statistic`s would copy every source line to the
+parent, twice (in `lines` and in each `CodeBlock.lines`). Instead, the results
+of a chunk of modules are packed into `array` columns and a table of unique
+strings (filenames, signatures, stat strings and metric names), serialized as
+a single `bytes` payload:
+
+    string_offsets, string_data  the strings (UTF-8), referred to by index
+    module   (position in the chunk, filename, name, content hash, num lines, layout, first stat ref, num stats)
+    layout   (first block, num blocks): the blocks of one parse, shared by identical modules
+    block    (keyword, signature, start, end, class): `class` is the block row of a method's class
+    stat_ref the stats of each module, as indexes into `stat`; identical modules share them
+    stat     (name, first item, num items)
+    item     (field, block, key, text): one stat string or metric value
+             (or, without key and text, the empty entry of a block)
+    value    the value of each item: an integer, or the bits of a float if its field has `FLOAT_FIELD` set
+
+The parent rebuilds `ModuleResult`s and `StatisticResult`s (see `partial.py`),
+which have no source lines: no report reads them once the stats are computed.
+"""
+import struct
+from array import array
+
+try:
+    # DEBUG
+    from context.file_context import CodeBlock
+    from results.partial import ModuleResult, StatisticResult
+except Exception:
+    # COMMANDLINE
+    from pystats.context.file_context import CodeBlock
+    from pystats.results.partial import ModuleResult, StatisticResult
+
+# name: typecode
+COLUMNS = {
+    'string_offsets': 'Q',
+    'string_data': 'B',
+    'module': 'q',
+    'layout': 'q',
+    'block': 'i',
+    'stat_ref': 'i',
+    'stat': 'i',
+    'item': 'i',
+    'value': 'q',
+}
+
+MODULE_FIELDS = 8
+LAYOUT_FIELDS = 2
+BLOCK_FIELDS = 5
+STAT_FIELDS = 3
+ITEM_FIELDS = 4
+
+# The `Statistic` attribute of each item field, and whether it maps blocks / holds metric values
+ITEM_ATTRIBUTES = [
+    ('module_stats', False, False),
+    ('package_stats', False, False),
+    ('module_values', False, True),
+    ('function_stats', True, False),
+    ('class_stats', True, False),
+    ('function_values', True, True),
+    ('class_values', True, True),
+]
+
+NONE = -1
+# Set in the field of items whose value is a float
+FLOAT_FIELD = 0x80
+FLOAT_BITS = struct.Struct('<d')
+INT_BITS = struct.Struct('<q')
+
+
+class _Packer:
+    """Appends modules and stats to the columns, sharing what identical modules share."""
+
+    def __init__(self):
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        self.strings = {}
+        # id of a module's `functions` list: (layout row, {block: block row})
+        self.layouts = {}
+        # (id of a `Statistic`, layout row): stat row
+        self.stats = {}
+        # Keeps the packed objects alive, so their ids are not reused
+        self._packed = []
+
+    def string(self, text):
+        if text is None:
+            return NONE
+        if text not in self.strings:
+            self.strings[text] = len(self.strings)
+        return self.strings[text]
+
+    def add_block(self, block, class_row=NONE):
+        block_row = len(self.columns['block']) // BLOCK_FIELDS
+        self.columns['block'].extend([
+            self.string(block.keyword), self.string(block.signature), block.start, block.end, class_row
+        ])
+        return block_row
+
+    def add_layout(self, module):
+        key = id(module.functions)
+        if key not in self.layouts:
+            self._packed.append(module.functions)
+            first_block = len(self.columns['block']) // BLOCK_FIELDS
+            rows = {}
+            for func_block in module.functions:
+                rows[func_block] = self.add_block(func_block)
+            for class_block in module.classes:
+                class_row = rows[class_block] = self.add_block(class_block)
+                for method_block in module.methods[class_block]:
+                    rows[method_block] = self.add_block(method_block, class_row=class_row)
+
+            layout_row = len(self.columns['layout']) // LAYOUT_FIELDS
+            self.columns['layout'].extend([first_block, len(self.columns['block']) // BLOCK_FIELDS - first_block])
+            self.layouts[key] = (layout_row, rows)
+
+        return self.layouts[key]
+
+    def add_item(self, field, block_row, key, text, value):
+        if isinstance(value, float):
+            field |= FLOAT_FIELD
+            value = INT_BITS.unpack(FLOAT_BITS.pack(value))[0]
+        self.columns['item'].extend([field, block_row, self.string(key), self.string(text)])
+        self.columns['value'].append(int(value))
+
+    def add_stat(self, stat, layout):
+        layout_row, rows = layout
+        key = (id(stat), layout_row)
+        if key not in self.stats:
+            self._packed.append(stat)
+            first_item = len(self.columns['value'])
+            for field, (attribute, by_block, has_values) in enumerate(ITEM_ATTRIBUTES):
+                entries = getattr(stat, attribute)
+                if not by_block:
+                    entries = {None: entries}
+                for block, content in entries.items():
+                    block_row = NONE if block is None else rows.get(block)
+                    if block_row is None:
+                        # Not a block of the module's parse: keep it on its own
+                        block_row = rows[block] = self.add_block(block, class_row=NONE - 1)
+                    if not content and by_block:
+                        # Keeps the block's empty entry
+                        self.add_item(field, block_row, None, None, 0)
+                    elif has_values:
+                        for name, value in content.items():
+                            self.add_item(field, block_row, name, None, value)
+                    else:
+                        for text in content:
+                            self.add_item(field, block_row, None, text, 0)
+
+            self.stats[key] = len(self.columns['stat']) // STAT_FIELDS
+            self.columns['stat'].extend([
+                self.string(stat.name()), first_item, len(self.columns['value']) - first_item
+            ])
+
+        return self.stats[key]
+
+    def add_module(self, position, module, stats):
+        layout = self.add_layout(module)
+        first_ref = len(self.columns['stat_ref'])
+        self.columns['stat_ref'].extend(self.add_stat(stat, layout) for stat in stats)
+        self.columns['module'].extend([
+            position,
+            self.string(str(module.filename)),
+            self.string(module.name),
+            self.string(module.content_hash),
+            module.num_lines,
+            layout[0],
+            first_ref,
+            len(stats),
+        ])
+
+    def to_bytes(self):
+        encoded = [text.encode('utf-8') for text in self.strings]
+        offsets = self.columns['string_offsets']
+        offsets.append(0)
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        self.columns['string_data'] = array('B', b''.join(encoded))
+
+        sizes = array('Q', [len(column) for column in self.columns.values()])
+        return sizes.tobytes() + b''.join(column.tobytes() for column in self.columns.values())
+
+
+def pack_results(results):
+    """
+    Packs `results`, a list of (`ParsedFile`, list of `Statistic`s) or None (for empty modules),
+    into a `bytes` payload.
+    """
+    packer = _Packer()
+    for position, result in enumerate(results):
+        if result is not None:
+            packer.add_module(position, *result)
+    return len(results).to_bytes(8, 'little') + packer.to_bytes()
+
+
+def _read_columns(data):
+    sizes = array('Q')
+    sizes.frombytes(data[:sizes.itemsize * len(COLUMNS)])
+    offset = sizes.itemsize * len(COLUMNS)
+
+    columns = {}
+    for (name, typecode), size in zip(COLUMNS.items(), sizes):
+        column = array(typecode)
+        end = offset + size * column.itemsize
+        column.frombytes(data[offset:end])
+        columns[name] = column
+        offset = end
+    return columns
+
+
+def _unpack_blocks(columns, string):
+    """Returns the `CodeBlock` of each row of the block column."""
+    block_column = columns['block']
+    blocks = []
+    for row in range(len(block_column) // BLOCK_FIELDS):
+        keyword, signature, start, end, _ = block_column[row * BLOCK_FIELDS:(row + 1) * BLOCK_FIELDS]
+        blocks.append(CodeBlock(string(keyword), string(signature), start, end))
+    return blocks
+
+
+def _unpack_layouts(columns, blocks):
+    """Returns the (functions, classes, methods) of each row of the layout column."""
+    block_column, layout_column = columns['block'], columns['layout']
+    layouts = []
+    for row in range(len(layout_column) // LAYOUT_FIELDS):
+        first_block, num_blocks = layout_column[row * LAYOUT_FIELDS:(row + 1) * LAYOUT_FIELDS]
+        functions, classes, methods = [], [], {}
+        for block_row in range(first_block, first_block + num_blocks):
+            block, class_row = blocks[block_row], block_column[block_row * BLOCK_FIELDS + 4]
+            if class_row >= 0:
+                methods[blocks[class_row]].append(block)
+            elif block.keyword == 'class':
+                classes.append(block)
+                methods[block] = []
+            else:
+                functions.append(block)
+        layouts.append((functions, classes, methods))
+    return layouts
+
+
+def _unpack_stats(columns, blocks, string):
+    """Returns the `StatisticResult` of each row of the stat column."""
+    item_column, value_column = columns['item'], columns['value']
+    stat_column = columns['stat']
+    stats = []
+    for row in range(len(stat_column) // STAT_FIELDS):
+        name, first_item, num_items = stat_column[row * STAT_FIELDS:(row + 1) * STAT_FIELDS]
+        content = {
+            attribute: ({} if by_block or has_values else [])
+            for attribute, by_block, has_values in ITEM_ATTRIBUTES
+        }
+        for item in range(first_item, first_item + num_items):
+            field, block_row, key, text = item_column[item * ITEM_FIELDS:(item + 1) * ITEM_FIELDS]
+            value = value_column[item]
+            if field & FLOAT_FIELD:
+                field &= ~FLOAT_FIELD
+                value = FLOAT_BITS.unpack(INT_BITS.pack(value))[0]
+            attribute, by_block, has_values = ITEM_ATTRIBUTES[field]
+            target = content[attribute]
+            if by_block:
+                target = target.setdefault(blocks[block_row], {} if has_values else [])
+            if key == NONE and text == NONE:
+                continue
+            if has_values:
+                target[string(key)] = value
+            else:
+                target.append(string(text))
+        stats.append(StatisticResult(string(name), **content))
+    return stats
+
+
+def unpack_results(data, strings=None):
+    """
+    Rebuilds the results packed by `pack_results`.
+
+    `strings` is the run's `StringTable`, to share the strings of every chunk.
+
+    Returns:
+        A list of (`ModuleResult`, list of `StatisticResult`s) or None, in the packed order.
+        Modules that shared a parse share their blocks and stats again.
+    """
+    num_results = int.from_bytes(data[:8], 'little')
+    columns = _read_columns(memoryview(data)[8:])
+
+    string_data = bytes(columns['string_data'])
+    offsets = columns['string_offsets']
+    texts = [string_data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+    if strings is not None:
+        texts = [strings.intern(text) for text in texts]
+
+    def string(index):
+        return None if index == NONE else texts[index]
+
+    blocks = _unpack_blocks(columns, string)
+    layouts = _unpack_layouts(columns, blocks)
+    stats = _unpack_stats(columns, blocks, string)
+
+    results = [None] * num_results
+    module_column, stat_refs = columns['module'], columns['stat_ref']
+    for row in range(len(module_column) // MODULE_FIELDS):
+        position, filename, name, content_hash, num_lines, layout, first_ref, num_stats = \
+            module_column[row * MODULE_FIELDS:(row + 1) * MODULE_FIELDS]
+        module = ModuleResult(string(filename), string(name), num_lines, *layouts[layout],
+                              content_hash=string(content_hash))
+        results[position] = (module, [stats[i] for i in stat_refs[first_ref:first_ref + num_stats]])
+
+    return results
@@ -0,0 +1,234 @@
+"""
+partial.py
+
+Reads and writes partial results produced by a sharded run (`--shard i/N`).
+
+A partial result file is JSON holding, for each module of the shard, its
+position in the full discovery order, its code blocks and the rendered
+output of every `Statistic`, plus the shard's distribution sketches. Merging the partial files of all shards
+rebuilds the modules and stats a single-node run would have produced,
+so any `Report` can be generated from them.
+"""
+import json
+
+try:
+    # DEBUG
+    from context.file_context import CodeBlock
+    from results.distributions import Distributions
+except Exception:
+    # COMMANDLINE
+    from pystats.context.file_context import CodeBlock
+    from pystats.results.distributions import Distributions
+
+
+PARTIAL_FORMAT_VERSION = 2
+
+
+class ModuleResult:
+    """A parsed module rebuilt from a result file, without its source lines.
+
+    Offers the attributes of `ParsedFile` that reports rely on.
+    """
+
+    def __init__(self, filename, name, num_lines, functions, classes, methods, content_hash=None):
+        self.filename = filename
+        self.name = name
+        self.num_lines = num_lines
+        self.functions = functions
+        self.classes = classes
+        self.methods = methods
+        self.content_hash = content_hash
+
+    def __repr__(self):
+        return (
+            f'ModuleResult(filename={self.filename}, '
+            f'name={self.name}, '
+            f'num_lines={self.num_lines}, '
+            f'num_functions={len(self.functions)}, '
+            f'num_classes={len(self.classes)})'
+        )
+
+
+class StatisticResult:
+    """The rendered output of a `Statistic`, rebuilt from a result file."""
+
+    def __init__(self, name, module_stats, function_stats, class_stats, package_stats,
+                 module_values=None, function_values=None, class_values=None):
+        self._name = name
+        self.module_stats = module_stats
+        self.function_stats = function_stats
+        self.class_stats = class_stats
+        self.package_stats = package_stats
+        self.module_values = module_values or {}
+        self.function_values = function_values or {}
+        self.class_values = class_values or {}
+
+    def name(self):
+        return self._name
+
+
+def _block_to_json(block):
+    return [block.keyword, block.signature, block.start, block.end]
+
+
+def _block_from_json(data):
+    return CodeBlock(*data)
+
+
+def module_to_json(module, index):
+    """Returns a JSON-serializable dict describing `module` (a `ParsedFile` or `ModuleResult`)."""
+    num_lines = getattr(module, 'num_lines', None)
+    if num_lines is None:
+        num_lines = len(module.lines)
+
+    return {
+        'index': index,
+        'filename': str(module.filename),
+        'name': module.name,
+        'num_lines': num_lines,
+        'content_hash': module.content_hash,
+        'functions': [_block_to_json(b) for b in module.functions],
+        'classes': [_block_to_json(b) for b in module.classes],
+        'methods': [[_block_to_json(m) for m in module.methods[c]] for c in module.classes],
+    }
+
+
+def module_from_json(data):
+    """Rebuilds a `ModuleResult` from the output of `module_to_json`."""
+    classes = [_block_from_json(b) for b in data['classes']]
+    methods = {
+        class_block: [_block_from_json(m) for m in method_blocks]
+        for class_block, method_blocks in zip(classes, data['methods'])
+    }
+    return ModuleResult(
+        data['filename'],
+        data['name'],
+        data['num_lines'],
+        [_block_from_json(b) for b in data['functions']],
+        classes,
+        methods,
+        content_hash=data.get('content_hash'),
+    )
+
+
+def stat_to_json(stat):
+    """Returns a JSON-serializable dict with the rendered output of `stat`."""
+    return {
+        'name': stat.name(),
+        'module_stats': list(stat.module_stats),
+        'function_stats': [[_block_to_json(b), list(s)] for b, s in stat.function_stats.items()],
+        'class_stats': [[_block_to_json(b), list(s)] for b, s in stat.class_stats.items()],
+        'package_stats': list(stat.package_stats),
+        'module_values': dict(stat.module_values),
+        'function_values': [[_block_to_json(b), v] for b, v in stat.function_values.items()],
+        'class_values': [[_block_to_json(b), v] for b, v in stat.class_values.items()],
+    }
+
+
+def stat_from_json(data):
+    """Rebuilds a `StatisticResult` from the output of `stat_to_json`."""
+    return StatisticResult(
+        data['name'],
+        data['module_stats'],
+        {_block_from_json(b): s for b, s in data['function_stats']},
+        {_block_from_json(b): s for b, s in data['class_stats']},
+        data['package_stats'],
+        module_values=data['module_values'],
+        function_values={_block_from_json(b): v for b, v in data['function_values']},
+        class_values={_block_from_json(b): v for b, v in data['class_values']},
+    )
+
+
+def write_partial(path, modules, statistics, indexes, tree, shard, num_shards, num_assigned, num_discovered,
+                  distributions=None, roots=None):
+    """
+    Writes the results of one shard to `path`.
+
+    Args:
+        modules: The `ParsedFile`s analyzed by this shard.
+        statistics: A dict mapping each module to its list of `Statistic`s.
+        indexes: The position of each module in the full discovery order.
+        tree: The Markdown tree lines of the analyzed packages.
+        shard, num_shards: This shard's 1-based number and the total number of shards.
+        num_assigned: The number of module files assigned to this shard (including empty ones).
+        num_discovered: The number of module files discovered across all shards.
+        distributions: The `Distributions` of this shard's modules.
+        roots: The path of the root of each tree, relative to the working directory.
+    """
+    partial = {
+        'version': PARTIAL_FORMAT_VERSION,
+        'shard': shard,
+        'num_shards': num_shards,
+        'num_assigned': num_assigned,
+        'num_discovered': num_discovered,
+        'tree': list(tree),
+        'roots': list(roots) if roots is not None else None,
+        'distributions': (distributions or Distributions()).to_json(),
+        'modules': [
+            {
+                'module': module_to_json(module, index),
+                'stats': [stat_to_json(stat) for stat in statistics[module]],
+            }
+            for module, index in zip(modules, indexes)
+        ],
+    }
+
+    with open(path, 'w') as f:
+        json.dump(partial, f)
+
+
+def read_partial(path):
+    """Reads a partial result file written by `write_partial`."""
+    with open(path, 'r') as f:
+        partial = json.load(f)
+
+    if partial.get('version') != PARTIAL_FORMAT_VERSION:
+        raise ValueError(f'Unsupported partial result version in {path}: {partial.get("version")}')
+
+    return partial
+
+
+def merge_partials(paths):
+    """
+    Merges the partial result files of every shard of a run.
+
+    Returns:
+        (modules, statistics, tree, roots, distributions):
+            modules: A list of `ModuleResult`s in the original discovery order.
+            statistics: A dict mapping each module to a list of `StatisticResult`s.
+            tree: The Markdown tree lines of the analyzed packages.
+            roots: The path of the root of each tree, or None if not recorded.
+            distributions: The `Distributions` of every shard, merged in shard order.
+    """
+    partials = [read_partial(path) for path in paths]
+    if not partials:
+        raise ValueError('No partial result files to merge')
+
+    num_shards = partials[0]['num_shards']
+    shards = sorted(p['shard'] for p in partials)
+    if shards != list(range(1, num_shards + 1)) or any(p['num_shards'] != num_shards for p in partials):
+        raise ValueError(f'Expected one partial result for each of {num_shards} shards, got shards {shards}')
+
+    num_assigned = sum(p['num_assigned'] for p in partials)
+    if num_assigned != partials[0]['num_discovered']:
+        raise ValueError(
+            f'Partial results cover {num_assigned} of {partials[0]["num_discovered"]} discovered modules'
+        )
+
+    entries = sorted(
+        (entry for partial in partials for entry in partial['modules']),
+        key=lambda entry: entry['module']['index']
+    )
+
+    modules = []
+    statistics = {}
+    for entry in entries:
+        module = module_from_json(entry['module'])
+        modules.append(module)
+        statistics[module] = [stat_from_json(s) for s in entry['stats']]
+
+    distributions = Distributions()
+    for partial in sorted(partials, key=lambda p: p['shard']):
+        distributions.merge(Distributions.from_json(partial['distributions']))
+
+    return modules, statistics, partials[0]['tree'], partials[0].get('roots'), distributions
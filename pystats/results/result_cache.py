@@ -0,0 +1,112 @@
+"""
+result_cache.py
+
+A bounded in-process cache of finished per-module results, for long-lived
+processes that embed pystats (see `PyStatsApp.analyze_sources`).
+
+Results are keyed by (content hash, names of the stats, `PARSER_VERSION`), so the
+same module contents, e.g. across revisions of a pull request, are only parsed
+and computed once. Entries are kept packed (see `packed.py`): their size in
+bytes is exact, and they hold no source lines nor objects handed to callers.
+The least recently used entries are evicted beyond `max_entries` entries or
+`max_bytes` bytes.
+
+Only content-only stats (`Statistic.CONTENT_ONLY`) are cached. The other stats
+look at the module's filename, so they are computed again on each hit, on the
+cached module: they can read its filename, blocks and number of lines, but not
+its source lines.
+"""
+from collections import OrderedDict
+
+try:
+    # DEBUG
+    from parsed_file import PARSER_VERSION
+    from results.packed import pack_results, unpack_results
+except Exception:
+    # COMMANDLINE
+    from pystats.parsed_file import PARSER_VERSION
+    from pystats.results.packed import pack_results, unpack_results
+
+
+class ResultCache:
+    """A bounded LRU cache of (module, stats) results, with hit, miss and eviction counters."""
+
+    DEFAULT_MAX_ENTRIES = 4096
+    DEFAULT_MAX_BYTES = 64 * 1024 ** 2
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    def __repr__(self):
+        return (f'ResultCache(max_entries={self.max_entries}, max_bytes={self.max_bytes}, size={len(self)}, '
+                f'num_bytes={self.num_bytes}, hits={self.hits}, misses={self.misses}, evictions={self.evictions})')
+
+    @staticmethod
+    def is_cacheable(requested_stats):
+        """Returns whether the results of `requested_stats` (`Statistic` classes) can be cached."""
+        return all(stat.CONTENT_ONLY or stat.LINES_NEEDED == 'none' for stat in requested_stats)
+
+    @staticmethod
+    def key(content_hash, requested_stats):
+        """Returns the key of the results of `requested_stats` on contents hashed as `content_hash`."""
+        names = tuple(stat.name() for stat in requested_stats if stat.CONTENT_ONLY)
+        return content_hash, names, PARSER_VERSION
+
+    def get(self, module, requested_stats):
+        """
+        Returns the cached results of `requested_stats` on the contents of `module` (a `ParsedFile`), or None.
+
+        Returns:
+            (module, stats): A `ModuleResult` named like `module`, and the list of its stats
+                (`StatisticResult`s, and the stats that are not content-only computed on it).
+        """
+        key = self.key(module.content_hash, requested_stats)
+        if module.content_hash is None or key not in self._results:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._results.move_to_end(key)
+        (result,) = unpack_results(self._results[key])
+        cached_module, cached_stats = result
+        cached_module.filename, cached_module.name = module.filename, module.name
+
+        cached_stats = iter(cached_stats)
+        stats = [next(cached_stats) if stat.CONTENT_ONLY else stat(cached_module) for stat in requested_stats]
+        return cached_module, stats
+
+    def put(self, module, stats):
+        """Caches the content-only `stats` (`Statistic`s) computed on `module`."""
+        if module.content_hash is None:
+            return
+
+        key = self.key(module.content_hash, [type(stat) for stat in stats])
+        data = pack_results([(module, [stat for stat in stats if stat.CONTENT_ONLY])])
+        if key in self._results:
+            self.num_bytes -= len(self._results.pop(key))
+        if len(data) > self.max_bytes:
+            return
+
+        self._results[key] = data
+        self.num_bytes += len(data)
+        while len(self._results) > self.max_entries or self.num_bytes > self.max_bytes:
+            _, evicted = self._results.popitem(last=False)
+            self.num_bytes -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        """Empties the cache and resets the counters."""
+        self._results.clear()
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
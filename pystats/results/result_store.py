@@ -0,0 +1,236 @@
+"""
+result_store.py
+
+A SQLite database of the results of many runs (`--store results.db`), for
+historical queries (`pystats query`).
+
+Each run adds one row to `runs`, and rows to:
+- modules: One per module, with its path relative to the working directory.
+- blocks: One per class, method and function, named as in snapshots
+    (methods are prefixed with their class signature).
+- metrics: One per numeric stat value of a module (`block_id` is NULL) or of a block.
+
+Rows are inserted with `executemany` in batches, in a single transaction per run.
+"""
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+try:
+    # DEBUG
+    from results.snapshot import qualify
+except Exception:
+    # COMMANDLINE
+    from pystats.results.snapshot import qualify
+
+RESULT_STORE_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    label TEXT,
+    num_modules INTEGER
+);
+CREATE TABLE IF NOT EXISTS modules (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    module_id INTEGER NOT NULL REFERENCES modules (id),
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    start_line INTEGER,
+    end_line INTEGER
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    module_id INTEGER NOT NULL REFERENCES modules (id),
+    block_id INTEGER REFERENCES blocks (id),
+    name TEXT NOT NULL,
+    value NUMERIC
+);
+CREATE INDEX IF NOT EXISTS modules_by_run_path ON modules (run_id, path);
+CREATE INDEX IF NOT EXISTS metrics_by_run_name_value ON metrics (run_id, name, value);
+'''
+
+# The number of rows passed to each `executemany`
+BATCH_SIZE = 50000
+
+
+class ResultStore:
+    """The results of every stored run, in the SQLite database at `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, RESULT_STORE_VERSION):
+            self.db.close()
+            raise ValueError(f'Not a pystats result store (version {RESULT_STORE_VERSION}): {path}')
+
+        with self.db:
+            self.db.executescript(SCHEMA)
+            self.db.execute(f'PRAGMA user_version = {RESULT_STORE_VERSION}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _next_id(self, table):
+        return self.db.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {table}').fetchone()[0]
+
+    def add_run(self, model, label=None, created_at=None):
+        """
+        Inserts the results of a run, as a `ReportModel`.
+
+        Returns:
+            The id of the new run.
+        """
+        if created_at is None:
+            created_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+        with self.db:
+            cursor = self.db.execute(
+                'INSERT INTO runs (created_at, label, num_modules) VALUES (?, ?, ?)',
+                (created_at, label, model.num_modules)
+            )
+            run_id = cursor.lastrowid
+            module_id = self._next_id('modules')
+            block_id = self._next_id('blocks')
+
+            modules, blocks, metrics = [], [], []
+
+            def flush():
+                self.db.executemany('INSERT INTO modules VALUES (?, ?, ?)', modules)
+                self.db.executemany('INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?)', blocks)
+                self.db.executemany('INSERT INTO metrics VALUES (?, ?, ?, ?, ?)', metrics)
+                modules.clear()
+                blocks.clear()
+                metrics.clear()
+
+            def add_block(kind, name, entry):
+                nonlocal block_id
+                blocks.append((block_id, run_id, module_id, kind, name, entry.start, entry.end))
+                metrics.extend((run_id, module_id, block_id, key, value) for key, value in entry.values.items())
+                block_id += 1
+
+            for module in model.iter_modules():
+                modules.append((module_id, run_id, os.path.relpath(module.filename)))
+                metrics.extend((run_id, module_id, None, key, value) for key, value in module.values.items())
+
+                seen = {}
+                for class_entry in module.classes:
+                    class_name = qualify(class_entry.signature, seen)
+                    add_block('class', class_name, class_entry)
+                    for method_entry in class_entry.methods:
+                        add_block('method', qualify(f'{class_name}.{method_entry.signature}', seen), method_entry)
+
+                for func_entry in module.functions:
+                    add_block('function', qualify(func_entry.signature, seen), func_entry)
+
+                module_id += 1
+                if len(metrics) >= BATCH_SIZE:
+                    flush()
+
+            flush()
+
+        return run_id
+
+    def latest_run(self):
+        """Returns the id of the latest run, or None if there is none."""
+        return self.db.execute('SELECT MAX(id) FROM runs').fetchone()[0]
+
+    def runs(self):
+        """Returns (columns, rows) describing each run."""
+        cursor = self.db.execute('''
+            SELECT runs.id, created_at, label, num_modules,
+                   (SELECT COUNT(*) FROM blocks WHERE blocks.run_id = runs.id)
+            FROM runs ORDER BY runs.id
+        ''')
+        return ['run', 'created at', 'label', 'modules', 'blocks'], cursor.fetchall()
+
+    def blocks(self, metric='num_lines', minimum=None, kind=None, path=None, run_id=None, limit=50):
+        """
+        Returns (columns, rows) of the blocks of a run (default: the latest) with the highest
+        value of `metric`, at least `minimum` if given.
+
+        `kind` ('class', 'method' or 'function') and `path` (a module path prefix) filter the blocks.
+        """
+        if run_id is None:
+            run_id = self.latest_run()
+
+        where, params = self._block_filters(metric, minimum, kind, path)
+        cursor = self.db.execute(f'''
+            SELECT modules.path, blocks.kind, blocks.name, metrics.value
+            FROM metrics
+            JOIN blocks ON blocks.id = metrics.block_id
+            JOIN modules ON modules.id = blocks.module_id
+            WHERE metrics.run_id = ? AND {where}
+            ORDER BY metrics.value DESC, modules.path, blocks.name
+            LIMIT ?
+        ''', [run_id, *params, limit])
+        return ['path', 'kind', 'name', metric], cursor.fetchall()
+
+    def trend(self, metric='num_lines', minimum=None, kind=None, path=None):
+        """
+        Returns (columns, rows) with, for each run, the number of blocks with `metric`
+        (at least `minimum` if given) and its maximum and average. Filters as in `blocks`.
+        """
+        where, params = self._block_filters(metric, minimum, kind, path)
+        cursor = self.db.execute(f'''
+            SELECT runs.id, runs.created_at, COUNT(matched.value), MAX(matched.value), AVG(matched.value)
+            FROM runs
+            LEFT JOIN (
+                SELECT metrics.run_id, metrics.value
+                FROM metrics
+                JOIN blocks ON blocks.id = metrics.block_id
+                JOIN modules ON modules.id = blocks.module_id
+                WHERE {where}
+            ) AS matched ON matched.run_id = runs.id
+            GROUP BY runs.id
+            ORDER BY runs.id
+        ''', params)
+        rows = [(run, created_at, count, top, round(avg, 2) if avg is not None else None)
+                for run, created_at, count, top, avg in cursor.fetchall()]
+        return ['run', 'created at', 'blocks', f'max {metric}', f'avg {metric}'], rows
+
+    @staticmethod
+    def _block_filters(metric, minimum, kind, path):
+        """Returns the SQL condition on `metrics`, `blocks` and `modules`, and its parameters."""
+        where = ['metrics.name = ?']
+        params = [metric]
+        if minimum is not None:
+            where.append('metrics.value >= ?')
+            params.append(minimum)
+        if kind is not None:
+            where.append('blocks.kind = ?')
+            params.append(kind)
+        if path is not None:
+            where.append("(modules.path = ? OR modules.path LIKE ? ESCAPE '\\')")
+            path = os.path.normpath(path)
+            prefix = path.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.extend([path, prefix + '/%'])
+        return ' AND '.join(where), params
+
+    def close(self):
+        self.db.close()
+
+
+QUERIES = ['runs', 'blocks', 'trend']
+
+
+def render_table(columns, rows):
+    """Yields the lines of a Markdown table."""
+    yield '| ' + ' | '.join(columns) + ' |'
+    yield '|' + '---|' * len(columns)
+    for row in rows:
+        yield '| ' + ' | '.join('' if value is None else str(value) for value in row) + ' |'
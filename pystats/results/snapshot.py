@@ -0,0 +1,120 @@
+"""
+snapshot.py
+
+A compact, streamable snapshot of the numeric results of a run.
+
+A snapshot is a gzip-compressed JSON Lines file. The first line is a header;
+each following line describes one module:
+
+    {"path": "pkg/mod.py", "values": {"num_lines": 120},
+     "blocks": [["class", "Foo", {"num_lines": 40, "num_methods": 3}],
+                ["method", "Foo.bar(self)", {"num_lines": 8, "missing_docstring": 1}],
+                ["function", "helper(x)", {"num_lines": 5, "missing_docstring": 0}]]}
+
+Blocks are identified by their kind and qualified signature (methods are
+prefixed with their class signature). If the same signature appears more than
+once in a module, later occurrences get a `#2`, `#3`, ... suffix.
+
+A snapshot can also be written in a binary format, for large runs (see `binary_snapshot.py`).
+"""
+import gzip
+import json
+import os
+
+try:
+    # DEBUG
+    from results.binary_snapshot import (
+        BINARY_SNAPSHOT_EXTENSION,
+        BinarySnapshot,
+        is_binary_snapshot,
+        write_binary_snapshot,
+    )
+except Exception:
+    # COMMANDLINE
+    from pystats.results.binary_snapshot import (
+        BINARY_SNAPSHOT_EXTENSION,
+        BinarySnapshot,
+        is_binary_snapshot,
+        write_binary_snapshot,
+    )
+
+SNAPSHOT_FORMAT = 'pystats-snapshot'
+SNAPSHOT_VERSION = 1
+
+
+def qualify(name, seen):
+    """Returns `name`, suffixed with its occurrence number if it was already seen."""
+    count = seen.get(name, 0) + 1
+    seen[name] = count
+    return name if count == 1 else f'{name}#{count}'
+
+
+def module_record(module, stats):
+    """
+    Returns the snapshot record of `module`.
+
+    Args:
+        module: A `ParsedFile` (or `ModuleResult`).
+        stats: The list of `Statistic`s computed on `module`.
+    """
+    values = {}
+    function_values = {}
+    class_values = {}
+    for stat in stats:
+        values.update(stat.module_values)
+        for block, block_values in stat.function_values.items():
+            function_values.setdefault(block, {}).update(block_values)
+        for block, block_values in stat.class_values.items():
+            class_values.setdefault(block, {}).update(block_values)
+
+    seen = {}
+    blocks = []
+    for class_block in module.classes:
+        class_name = qualify(class_block.signature, seen)
+        blocks.append(['class', class_name, class_values.get(class_block, {})])
+        for method_block in module.methods[class_block]:
+            method_name = qualify(f'{class_name}.{method_block.signature}', seen)
+            blocks.append(['method', method_name, function_values.get(method_block, {})])
+
+    for func_block in module.functions:
+        func_name = qualify(func_block.signature, seen)
+        blocks.append(['function', func_name, function_values.get(func_block, {})])
+
+    return {
+        'path': os.path.relpath(str(module.filename)),
+        'values': values,
+        'blocks': blocks,
+    }
+
+
+def write_snapshot(path, modules, statistics):
+    """
+    Writes the snapshot of `modules` and their `statistics` to `path`.
+
+    The snapshot is binary (see `binary_snapshot.py`) if `path` ends with `BINARY_SNAPSHOT_EXTENSION`.
+    """
+    if path.endswith(BINARY_SNAPSHOT_EXTENSION):
+        write_binary_snapshot(path, (module_record(module, statistics[module]) for module in modules))
+        return
+
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps({'format': SNAPSHOT_FORMAT, 'version': SNAPSHOT_VERSION}) + '\n')
+        for module in modules:
+            record = module_record(module, statistics[module])
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+def iter_snapshot(path):
+    """Yields the module records of the snapshot at `path` (JSON Lines or binary), one at a time."""
+    if is_binary_snapshot(path):
+        with BinarySnapshot(path) as snapshot:
+            yield from snapshot
+        return
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline() or '{}')
+        if header.get('format') != SNAPSHOT_FORMAT or header.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f'Not a pystats snapshot (version {SNAPSHOT_VERSION}): {path}')
+
+        for line in f:
+            yield json.loads(line)
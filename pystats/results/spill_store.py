@@ -0,0 +1,157 @@
+"""
+spill_store.py
+
+Keeps per-module results within a memory budget (`--memory-limit`).
+
+Results are held in memory until the process' resident set size reaches the
+limit. Then every in-memory module and its stats are written to a temporary
+SQLite database and released, keeping only the code blocks' positions (no
+source lines). At report time the modules are read back in their original order.
+
+The resident set size does not drop after a spill (the freed memory is kept for
+reuse), so the next spill waits until it has grown by `spill_growth` bytes: the
+modules analyzed meanwhile are spilled together, in one transaction.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+
+try:
+    # DEBUG
+    from results.partial import module_from_json, module_to_json, stat_from_json, stat_to_json
+    from utils.memory import current_rss, peak_rss
+except Exception:
+    # COMMANDLINE
+    from pystats.results.partial import module_from_json, module_to_json, stat_from_json, stat_to_json
+    from pystats.utils.memory import current_rss, peak_rss
+
+# After a spill, the RSS must grow by this fraction of the limit (and at least
+# `MIN_SPILL_GROWTH` bytes) before the next one
+SPILL_GROWTH = 1 / 16
+MIN_SPILL_GROWTH = 1024 ** 2
+
+
+class SpillStore:
+    """An ordered store of (module, stats) that spills to disk above `memory_limit` bytes.
+
+    Use `modules` as the list of modules and the store itself as the dict mapping
+    each module to its stats, e.g. when constructing a `Report`.
+    """
+
+    def __init__(self, memory_limit, directory=None, spill_growth=None):
+        self.memory_limit = memory_limit
+        if spill_growth is None:
+            spill_growth = max(int(memory_limit * SPILL_GROWTH), MIN_SPILL_GROWTH)
+        self.spill_growth = spill_growth
+        self.num_spills = 0
+        self.peak_rss = peak_rss()
+        # The RSS right after the last spill
+        self._spilled_rss = None
+
+        # One entry per module, in order: the module itself, or its row id on disk
+        self._entries = []
+        self._in_memory = {}
+        self._pending = []
+
+        self._tmpdir = tempfile.TemporaryDirectory(prefix='pystats-spill-', dir=directory)
+        self._db = sqlite3.connect(os.path.join(self._tmpdir.name, 'spill.db'))
+        # The database is temporary: no need to survive a crash
+        self._db.execute('PRAGMA journal_mode = OFF')
+        self._db.execute('PRAGMA synchronous = OFF')
+        self._db.execute('CREATE TABLE results (id INTEGER PRIMARY KEY, module TEXT, stats TEXT)')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, module):
+        if id(module) in self._in_memory:
+            return self._in_memory[id(module)][1]
+
+        row = self._db.execute('SELECT stats FROM results WHERE id = ?', (module.spill_id,)).fetchone()
+        return [stat_from_json(s) for s in json.loads(row[0])]
+
+    def __contains__(self, module):
+        return id(module) in self._in_memory or hasattr(module, 'spill_id')
+
+    @property
+    def modules(self):
+        """The stored modules in insertion order (a sized iterable)."""
+        return _StoredModules(self)
+
+    def add(self, module, stats):
+        """
+        Stores `module` and its `stats`, spilling to disk if the memory limit is reached
+        (and, after a spill, once the RSS has grown by `spill_growth` since).
+
+        Returns:
+            True if the in-memory results were spilled.
+        """
+        self._pending.append(len(self._entries))
+        self._entries.append(module)
+        self._in_memory[id(module)] = (module, stats)
+
+        rss = current_rss()
+        if rss is None or rss < self.memory_limit:
+            return False
+        if self._spilled_rss is None or rss >= self._spilled_rss + self.spill_growth:
+            self.spill()
+            return True
+
+        return False
+
+    def spill(self):
+        """Writes every in-memory module and its stats to disk, and releases them."""
+        if not self._in_memory:
+            return
+
+        self.update_peak_rss()
+        with self._db:
+            for position in self._pending:
+                module, stats = self._in_memory.pop(id(self._entries[position]))
+                cursor = self._db.execute(
+                    'INSERT INTO results (module, stats) VALUES (?, ?)',
+                    (json.dumps(module_to_json(module, position)), json.dumps([stat_to_json(s) for s in stats]))
+                )
+                self._entries[position] = cursor.lastrowid
+
+        self._pending = []
+        self.num_spills += 1
+        self._spilled_rss = current_rss()
+
+    def iter_modules(self):
+        """Yields every module, reading spilled ones back from disk without their source lines."""
+        for entry in self._entries:
+            if not isinstance(entry, int):
+                yield entry
+                continue
+
+            row = self._db.execute('SELECT module FROM results WHERE id = ?', (entry,)).fetchone()
+            module = module_from_json(json.loads(row[0]))
+            module.spill_id = entry
+            yield module
+
+    def update_peak_rss(self):
+        """Records the current peak resident set size, and returns it."""
+        rss = peak_rss()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+        return self.peak_rss
+
+    def close(self):
+        """Deletes the on-disk store."""
+        self._db.close()
+        self._tmpdir.cleanup()
+
+
+class _StoredModules:
+    """The modules of a `SpillStore`, usable where a list of modules is expected."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store)
+
+    def __iter__(self):
+        return self._store.iter_modules()
@@ -0,0 +1,182 @@
+"""
+summary.py
+
+Exact package summaries over the block and module lengths of a run.
+
+The lengths are first gathered into contiguous `array` columns (`MetricColumns`),
+in one pass over the modules. `summarize` then computes every summary with
+grouped operations over the columns: vectorized with NumPy if it is installed,
+or with plain loops otherwise. Both give the same results.
+"""
+import os
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    # Optional: the summaries are computed in pure Python
+    np = None
+
+BLOCK_KINDS = ['class', 'method', 'function']
+# The lower bound of each histogram bin, in lines
+HISTOGRAM_EDGES = [0, 5, 10, 20, 50, 100, 200, 500]
+HISTOGRAM_KINDS = ['function', 'class']
+
+
+class MetricColumns:
+    """The length of every block and module of a run, in contiguous columns.
+
+    Attributes:
+        block_kind: The index in `BLOCK_KINDS` of each block.
+        block_length: The number of lines of each block (`CodeBlock.end - start`).
+        module_length: The number of lines of each module.
+        module_group: The index in `groups` of each module's subpackage.
+        groups: The subpackage (directory) names.
+    """
+
+    def __init__(self):
+        self.block_kind = array('B')
+        self.block_length = array('q')
+        self.module_length = array('q')
+        self.module_group = array('I')
+        self.groups = []
+        self._group_ids = {}
+
+    def __repr__(self):
+        return f'MetricColumns(num_modules={len(self.module_length)}, num_blocks={len(self.block_length)})'
+
+    @classmethod
+    def from_modules(cls, modules):
+        """Returns the columns of `modules` (`ModuleEntry`s)."""
+        columns = cls()
+        for module in modules:
+            columns.add_module(module)
+        return columns
+
+    def add_module(self, module):
+        """Appends the lengths of `module` (a `ModuleEntry`) and of its blocks."""
+        group = os.path.dirname(os.path.relpath(module.filename)) or os.curdir
+        if group not in self._group_ids:
+            self._group_ids[group] = len(self.groups)
+            self.groups.append(group)
+        self.module_group.append(self._group_ids[group])
+        self.module_length.append(module.num_lines)
+
+        for class_entry in module.classes:
+            self.block_kind.append(0)
+            self.block_length.append(len(class_entry))
+            self.block_kind.extend([1] * len(class_entry.methods))
+            self.block_length.extend(len(method_entry) for method_entry in class_entry.methods)
+
+        self.block_kind.extend([2] * len(module.functions))
+        self.block_length.extend(len(func_entry) for func_entry in module.functions)
+
+
+class PackageSummary:
+    """The summaries of a run.
+
+    Attributes:
+        blocks: (kind, count, total lines, mean lines, max lines) for each of `BLOCK_KINDS`.
+        histogram: (bin label, count per each of `HISTOGRAM_KINDS`) for each histogram bin.
+        subpackages: (subpackage, modules, total lines, mean lines, max lines) for each subpackage, sorted.
+    """
+
+    def __init__(self, blocks, histogram, subpackages):
+        self.blocks = blocks
+        self.histogram = histogram
+        self.subpackages = subpackages
+
+    def __repr__(self):
+        return f'PackageSummary(num_subpackages={len(self.subpackages)})'
+
+
+def _mean(total, count):
+    return round(total / count, 1) if count else 0
+
+
+def _histogram_labels():
+    bounds = HISTOGRAM_EDGES[1:]
+    labels = [f'{low}-{high - 1}' for low, high in zip(HISTOGRAM_EDGES, bounds)]
+    return labels + [f'{HISTOGRAM_EDGES[-1]}+']
+
+
+def _summary(block_stats, histogram_counts, group_stats, groups):
+    """Builds the `PackageSummary` from the grouped (count, total, max) and histogram counts."""
+    blocks = [
+        (kind, count, total, _mean(total, count), top)
+        for kind, (count, total, top) in zip(BLOCK_KINDS, block_stats)
+    ]
+    histogram = [
+        (label, *(histogram_counts[BLOCK_KINDS.index(kind)][b] for kind in HISTOGRAM_KINDS))
+        for b, label in enumerate(_histogram_labels())
+    ]
+    subpackages = sorted(
+        (group, count, total, _mean(total, count), top)
+        for group, (count, total, top) in zip(groups, group_stats)
+    )
+    return PackageSummary(blocks, histogram, subpackages)
+
+
+def _summarize_python(columns):
+    num_bins = len(HISTOGRAM_EDGES)
+    block_stats = [[0, 0, 0] for _ in BLOCK_KINDS]
+    histogram_counts = [[0] * num_bins for _ in BLOCK_KINDS]
+    for kind, length in zip(columns.block_kind, columns.block_length):
+        stats = block_stats[kind]
+        stats[0] += 1
+        stats[1] += length
+        stats[2] = max(stats[2], length)
+        b = 0
+        while b + 1 < num_bins and length >= HISTOGRAM_EDGES[b + 1]:
+            b += 1
+        histogram_counts[kind][b] += 1
+
+    group_stats = [[0, 0, 0] for _ in columns.groups]
+    for group, length in zip(columns.module_group, columns.module_length):
+        stats = group_stats[group]
+        stats[0] += 1
+        stats[1] += length
+        stats[2] = max(stats[2], length)
+
+    return _summary(block_stats, histogram_counts, group_stats, columns.groups)
+
+
+def _grouped(groups, values, num_groups):
+    """Returns [count, total, max] of `values` for each group id in `groups` (NumPy arrays)."""
+    counts = np.bincount(groups, minlength=num_groups)
+    totals = np.bincount(groups, weights=values, minlength=num_groups)
+    tops = np.zeros(num_groups, dtype=np.int64)
+    np.maximum.at(tops, groups, values)
+    return [[int(c), int(t), int(m)] for c, t, m in zip(counts, totals, tops)]
+
+
+def _summarize_numpy(columns):
+    num_bins = len(HISTOGRAM_EDGES)
+    kinds = np.frombuffer(columns.block_kind, dtype=np.uint8).astype(np.intp)
+    lengths = np.frombuffer(columns.block_length, dtype=np.int64)
+    block_stats = _grouped(kinds, lengths, len(BLOCK_KINDS))
+
+    bins = np.searchsorted(np.array(HISTOGRAM_EDGES), lengths, side='right') - 1
+    bins = np.clip(bins, 0, num_bins - 1)
+    histogram_counts = np.bincount(kinds * num_bins + bins, minlength=len(BLOCK_KINDS) * num_bins)
+    histogram_counts = histogram_counts.reshape(len(BLOCK_KINDS), num_bins).tolist()
+
+    groups = np.frombuffer(columns.module_group, dtype=np.uint32).astype(np.intp)
+    module_lengths = np.frombuffer(columns.module_length, dtype=np.int64)
+    group_stats = _grouped(groups, module_lengths, len(columns.groups))
+
+    return _summary(block_stats, histogram_counts, group_stats, columns.groups)
+
+
+def summarize(columns, use_numpy=None):
+    """
+    Returns the `PackageSummary` of `columns` (a `MetricColumns`).
+
+    Uses NumPy if it is installed, unless `use_numpy` is False.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    # np.frombuffer cannot read an empty buffer
+    if use_numpy and len(columns.block_length) and len(columns.module_length):
+        return _summarize_numpy(columns)
+    return _summarize_python(columns)
@@ -12,7 +12,7 @@ To add a new stat:
 '''
 
 from abc import ABCMeta, abstractmethod
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
 try:
     # DEBUGGING
@@ -24,8 +24,72 @@ except Exception:
 logger = Logger(__name__).logger
 
 
+class BlockStatCache:
+    """A bounded LRU cache of per-block stat results.
+
+    Results are keyed by the stat name and the block's `fingerprint`, so unchanged
+    blocks, and identical blocks in different modules, are only computed once.
+    Blocks without a fingerprint (no source lines) are computed each time, and not cached.
+    """
+
+    DEFAULT_MAXSIZE = 65536
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    def __repr__(self):
+        return (f'BlockStatCache(maxsize={self.maxsize}, size={len(self)}, '
+                f'hits={self.hits}, misses={self.misses})')
+
+    def get(self, stat_name, block, compute):
+        """Returns the cached `compute(block)` for `stat_name`, computing and caching it on a miss."""
+        if block.fingerprint is None:
+            return compute(block)
+
+        key = (stat_name, block.fingerprint)
+        if key in self._results:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return self._results[key]
+
+        self.misses += 1
+        result = compute(block)
+        self._results[key] = result
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+        return result
+
+    def clear(self):
+        """Empties the cache and resets the counters."""
+        self._results.clear()
+        self.hits = 0
+        self.misses = 0
+
+
 class Statistic(metaclass=ABCMeta):
     """An abstract base class representing a statistic computed on a `ParsedFile`."""
+
+    # True if the stat depends only on the module contents (not on its filename),
+    #  so one computed instance can be shared by byte-identical modules.
+    CONTENT_ONLY = True
+
+    # Per-block results shared by every stat (see `add_function_stats`).
+    BLOCK_CACHE = BlockStatCache()
+
+    # Which source lines the stat reads, so large modules can be streamed without keeping them:
+    # 'none' (only block positions and the number of lines), 'head' (the first
+    # `LINES_HEAD` lines of each block) or 'all'.
+    LINES_NEEDED = 'all'
+    LINES_HEAD = 2
+    LINE_RETENTION = ('none', 'head', 'all')
+
     def __init__(self, parsed_file):
         """Initializes a `Statistic` and computes the stat immediately."""
         self.parsed_file = parsed_file
@@ -45,6 +109,15 @@ class Statistic(metaclass=ABCMeta):
         # - Example: ['**dunder method in the package:** {dunderMethod}']
         self.package_stats = []
 
+        # Numeric values behind the Markdown text, for snapshots and machine-readable reports.
+        # `module_values`: A dict mapping a metric name to a number
+        # - Example: {'num_lines': 8}
+        self.module_values = {}
+        # `function_values` / `class_values`: A dict mapping a `CodeBlock` to a dict of metric values
+        # - Example: {func_block: {'num_lines': 12}}
+        self.function_values = defaultdict(dict)
+        self.class_values = defaultdict(dict)
+
         # Compute the stat immediately
         self.compute()
 
@@ -57,6 +130,22 @@ class Statistic(metaclass=ABCMeta):
             f'          class_stats={ {c.signature: stat for c,stat in self.class_stats.items()} })\n'
         )
 
+    def add_function_stats(self, func_block, compute):
+        """
+        Adds the stats of a function or method block, memoized by block fingerprint.
+
+        `compute(block)` must depend only on the block and return (stat strings, metric values).
+        """
+        stats, values = Statistic.BLOCK_CACHE.get(self.name(), func_block, compute)
+        self.function_stats[func_block] += stats
+        self.function_values[func_block].update(values)
+
+    def add_class_stats(self, class_block, compute):
+        """Adds the stats of a class block, memoized like `add_function_stats`."""
+        stats, values = Statistic.BLOCK_CACHE.get(self.name(), class_block, compute)
+        self.class_stats[class_block] += stats
+        self.class_values[class_block].update(values)
+
     ###################
     # Abstract methods
     # - Methods written without implementation, that
@@ -77,6 +166,8 @@ class Statistic(metaclass=ABCMeta):
 # Example 1: Module stat
 class NumModuleLines(Statistic):
     """Computes the number of lines per module."""
+    LINES_NEEDED = 'none'
+
     @staticmethod
     def name():
         """The name the stat will be registered as."""
@@ -87,11 +178,14 @@ class NumModuleLines(Statistic):
         # Add a stat to the overall module
         num_module_lines = len(self.parsed_file.lines)
         self.module_stats += [f'**Num Module Lines:** {num_module_lines}']
+        self.module_values['num_lines'] = num_module_lines
 
 
 # Example 2: Function stats
 class NumFuncLines(Statistic):
     """Computes the number of lines per function."""
+    LINES_NEEDED = 'none'
+
     @staticmethod
     def name():
         """The name the stat will be registered as."""
@@ -101,15 +195,21 @@ class NumFuncLines(Statistic):
         """Computes the stat. Modifies `module_stats`, `function_stats`, etc."""
         # Add stats to each individual function
         for func_block in self.parsed_file.functions:
-            self.function_stats[func_block] += [
-                f'**Num Function Lines:** {len(func_block)}'
-            ]
+            # Logged for every function, whether its stats are cached or not
             logger.info(f'Length of the function blocks is {len(func_block)}')
+            self.add_function_stats(func_block, self.compute_function)
+
+    @staticmethod
+    def compute_function(func_block):
+        """Returns the stats of one function block."""
+        return [f'**Num Function Lines:** {len(func_block)}'], {'num_lines': len(func_block)}
 
 
 # Example 3: Method stats
 class NumMethodLines(Statistic):
     """Computes the number of lines per method."""
+    LINES_NEEDED = 'none'
+
     @staticmethod
     def name():
         """The name the stat will be registered as."""
@@ -122,13 +222,19 @@ class NumMethodLines(Statistic):
         for class_block in self.parsed_file.classes:
             # For each method in the class ...
             for method_block in self.parsed_file.methods[class_block]:
-                self.function_stats[method_block] += [
-                    f'**Num Method Lines:** {len(method_block)}'
-                ]
+                self.add_function_stats(method_block, self.compute_method)
+
+    @staticmethod
+    def compute_method(method_block):
+        """Returns the stats of one method block."""
+        return [f'**Num Method Lines:** {len(method_block)}'], {'num_lines': len(method_block)}
 
 
 class NumClassLines(Statistic):
     """Adds the statistics "Num Class Lines" and "Num Methods" to each class."""
+    LINES_NEEDED = 'none'
+
+    @staticmethod
     def name():
         return 'NumClassLines'
 
@@ -136,17 +242,24 @@ class NumClassLines(Statistic):
         # Adds stats to each individual class
         #  (nearly identical to NumFuncLines)
         for class_block in self.parsed_file.classes:
-            self.class_stats[class_block] += [
-                f'**Num Class Lines:** {len(class_block)}']
+            self.add_class_stats(class_block, self.compute_class)
 
-            self.class_stats[class_block] += [
-                f'**Num Methods:** {len(self.parsed_file.methods[class_block])}']
+    def compute_class(self, class_block):
+        """Returns the stats of one class block (its methods are part of its fingerprint)."""
+        num_methods = len(self.parsed_file.methods[class_block])
+        stats = [
+            f'**Num Class Lines:** {len(class_block)}',
+            f'**Num Methods:** {num_methods}',
+        ]
+        return stats, {'num_lines': len(class_block), 'num_methods': num_methods}
 
 
 class WarnNoDocstring(Statistic):
 
     VALID_DOCSTRINGS = ['"""', '"', "'", "'''"]
     NO_DOCSTRING_WARNING = '**WARNING:** Missing docstring.'
+    # Reads the line following each signature
+    LINES_NEEDED = 'head'
 
     @staticmethod
     def name():
@@ -160,12 +273,16 @@ class WarnNoDocstring(Statistic):
 
         return any(line.startswith(s) for s in WarnNoDocstring.VALID_DOCSTRINGS)
 
+    @staticmethod
+    def compute_docstring_warning(func_block):
+        """Returns the 'no docstring' warning if no docstring exists."""
+        missing = not WarnNoDocstring.has_docstring(func_block.lines)
+        stats = [WarnNoDocstring.NO_DOCSTRING_WARNING] if missing else []
+        return stats, {'missing_docstring': int(missing)}
+
     def add_docstring_warning(self, func_block):
         """Add 'no docstring' warning if no docstring exists."""
-        if not self.has_docstring(func_block.lines):
-            self.function_stats[func_block] += [
-                WarnNoDocstring.NO_DOCSTRING_WARNING
-            ]
+        self.add_function_stats(func_block, self.compute_docstring_warning)
 
     def compute(self):
         """Add 'no docstring' warning for each function and method."""
@@ -182,6 +299,11 @@ class WarnNoDocstring(Statistic):
 
 class DunderMethodPythonPackage(Statistic):
     """Compute number of non python files in a package"""
+
+    # Looks at the filename, so it cannot be shared between identical modules.
+    CONTENT_ONLY = False
+    LINES_NEEDED = 'none'
+
     @staticmethod
     def name():
         """The name the stat will be registered as."""
@@ -194,3 +316,92 @@ class DunderMethodPythonPackage(Statistic):
         if self.parsed_file.filename.startswith('__'):
             dunderMethod += 1
         self.package_stats += [f'**dunder method in the package:** {dunderMethod}']
+        self.module_values['dunder_method'] = dunderMethod
+
+
+class TokenStatistic(Statistic):
+    """A base class for the stats of each function and method read from the module's tokens.
+
+    Every token stat reads the same `ParsedFile.tokens`, so enabling all of them
+    still tokenizes each module once. Subclasses implement `compute_block`.
+    """
+
+    def compute(self):
+        """Adds the stats of each function and method."""
+        for func_block in self.parsed_file.functions:
+            self.add_function_stats(func_block, self.compute_block)
+
+        for class_block in self.parsed_file.classes:
+            for method_block in self.parsed_file.methods[class_block]:
+                self.add_function_stats(method_block, self.compute_block)
+
+    @abstractmethod
+    def compute_block(self, func_block):
+        """Returns the stats of one function or method block, as (stat strings, metric values)."""
+        pass
+
+
+class CyclomaticComplexity(TokenStatistic):
+    """Computes the cyclomatic complexity of each function and method: 1 plus its decision points."""
+
+    @staticmethod
+    def name():
+        return 'CyclomaticComplexity'
+
+    def compute_block(self, func_block):
+        complexity = self.parsed_file.tokens.complexity(func_block.start, func_block.end)
+        return [f'**Cyclomatic Complexity:** {complexity}'], {'complexity': complexity}
+
+
+class NumTokens(TokenStatistic):
+    """Computes the number of code tokens per module, function and method."""
+
+    @staticmethod
+    def name():
+        return 'NumTokens'
+
+    def compute(self):
+        num_tokens = self.parsed_file.tokens.num_tokens(0, len(self.parsed_file.lines))
+        self.module_stats += [f'**Num Module Tokens:** {num_tokens}']
+        self.module_values['num_tokens'] = num_tokens
+        super().compute()
+
+    def compute_block(self, func_block):
+        num_tokens = self.parsed_file.tokens.num_tokens(func_block.start, func_block.end)
+        return [f'**Num Tokens:** {num_tokens}'], {'num_tokens': num_tokens}
+
+
+class LineKinds(TokenStatistic):
+    """Splits the lines of each module, function and method into code, comment, blank and docstring lines."""
+
+    @staticmethod
+    def name():
+        return 'LineKinds'
+
+    @staticmethod
+    def format_line_kinds(counts):
+        """Returns the stat string and metric values of `counts` (see `TokenIndex.line_kinds`)."""
+        text = ', '.join(f'{count} {kind}' for kind, count in counts.items())
+        return f'**Line Kinds:** {text}', {f'{kind}_lines': count for kind, count in counts.items()}
+
+    def compute(self):
+        text, values = self.format_line_kinds(self.parsed_file.tokens.line_kinds(0, len(self.parsed_file.lines)))
+        self.module_stats += [text]
+        self.module_values.update(values)
+        super().compute()
+
+    def compute_block(self, func_block):
+        text, values = self.format_line_kinds(self.parsed_file.tokens.line_kinds(func_block.start, func_block.end))
+        return [text], values
+
+
+class MaxNestingDepth(TokenStatistic):
+    """Computes how many blocks deep the body of each function and method nests, at most."""
+
+    @staticmethod
+    def name():
+        return 'MaxNestingDepth'
+
+    def compute_block(self, func_block):
+        depth = self.parsed_file.tokens.max_nesting(func_block.start, func_block.end)
+        return [f'**Max Nesting Depth:** {depth}'], {'max_nesting': depth}
@@ -1,4 +1,48 @@
 import argparse
+import os
+
+try:
+    # DEBUG
+    from results.result_store import QUERIES
+    from utils.memory import parse_size
+except Exception:
+    # COMMANDLINE
+    from pystats.results.result_store import QUERIES
+    from pystats.utils.memory import parse_size
+
+
+def parse_shard(value):
+    '''Parses a shard specification "i/N" into the tuple (i, N), with 1 <= i <= N.'''
+    try:
+        shard, num_shards = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'shard must look like i/N: got {value}')
+
+    if not 1 <= shard <= num_shards:
+        raise argparse.ArgumentTypeError(f'shard must satisfy 1 <= i <= N: got {value}')
+
+    return shard, num_shards
+
+
+def parse_memory_limit(value):
+    '''Parses a size such as "2G" into a number of bytes.'''
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_jobs(value):
+    '''Parses a number of worker processes; 0 means one per CPU.'''
+    try:
+        jobs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'jobs must be a number: got {value}')
+
+    if jobs < 0:
+        raise argparse.ArgumentTypeError(f'jobs must be at least 0: got {value}')
+
+    return jobs or os.cpu_count() or 1
 
 
 def add_parser_options(app):
@@ -10,10 +54,10 @@ def add_parser_options(app):
         action='store',
         nargs='+',
         metavar='FILENAME',
-        help='the input Python file(s)'
+        help='the input Python file(s) or package(s); @FILE or - (standard input) read a list of modules'
     )
 
-    # Specifying one or more stats is optional. By default, will run all stats.
+    # Specifying one or more stats is optional. By default, will run the default stats (all but the token stats).
     parser.add_argument(
         '-s',
         '--stats',
@@ -21,7 +65,7 @@ def add_parser_options(app):
         default=[],
         nargs='*',
         choices=[s.name() for s in app.AVAILABLE_STATS],
-        help='include only the specified one or more stats (default: all stats)'
+        help='include only the specified one or more stats (default: all but the token stats)'
     )
 
     # Specifying one or more reports is optional. By default, will generate a Markdown report.
@@ -42,7 +86,87 @@ def add_parser_options(app):
         action='store',
         default=['out'],
         nargs='*',
-        help='enter the output filename'
+        help='enter the output filename ("-" writes the report to the standard output)'
+    )
+
+    # Analyze only one part of the modules, and write a partial result file.
+    parser.add_argument(
+        '--shard',
+        action='store',
+        default=None,
+        type=parse_shard,
+        metavar='i/N',
+        help='analyze only the i-th of N size-balanced parts of the modules and write a partial result file'
+    )
+
+    # Analyze only the modules changed since a git revision.
+    parser.add_argument(
+        '--since',
+        action='store',
+        default=None,
+        metavar='REV',
+        help='analyze only the modules changed between the git revision REV and the working tree'
+    )
+
+    parser.add_argument(
+        '--cache-dir',
+        action='store',
+        default='.pystats_cache',
+        dest='cache_dir',
+        help='directory of the cached package snapshots used by --since (default: .pystats_cache)'
+    )
+
+    # Save the numeric results for a later `pystats diff`.
+    parser.add_argument(
+        '--snapshot',
+        action='store',
+        default=None,
+        metavar='FILE',
+        help='also save a compact snapshot of the results to FILE, for `pystats diff` '
+             '(binary if FILE ends with .pysnap)'
+    )
+
+    # Keep the history of runs for `pystats query`.
+    parser.add_argument(
+        '--store',
+        action='store',
+        default=None,
+        metavar='DB',
+        dest='result_store',
+        help='also add the results as a run to the SQLite store DB, for `pystats query`'
+    )
+
+    # Keep results within a memory budget by spilling them to disk.
+    parser.add_argument(
+        '--memory-limit',
+        action='store',
+        default=None,
+        dest='memory_limit',
+        type=parse_memory_limit,
+        metavar='SIZE',
+        help='spill results to a temporary on-disk store when the process reaches SIZE (e.g. 2G, 512M)'
+    )
+
+    # Stream large modules instead of reading them into memory.
+    parser.add_argument(
+        '--stream-threshold',
+        action='store',
+        default=app.STREAM_THRESHOLD,
+        dest='stream_threshold',
+        type=parse_memory_limit,
+        metavar='SIZE',
+        help='parse modules of at least SIZE in a single streaming pass (default: 8M)'
+    )
+
+    # Parse modules and compute their stats in parallel.
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        action='store',
+        default=1,
+        type=parse_jobs,
+        metavar='N',
+        help='parse modules in N worker processes, largest first (0: one per CPU; default: 1)'
     )
 
     # For testing/debugging, can generate additional output based on this flag.
@@ -55,3 +179,171 @@ def add_parser_options(app):
     )
 
     return parser
+
+
+def add_merge_parser_options(app):
+    parser = argparse.ArgumentParser(prog='pystats merge')
+
+    # The partial result files written by each `--shard i/N` run.
+    parser.add_argument(
+        'input',
+        action='store',
+        nargs='+',
+        metavar='PARTIAL',
+        help='the partial result files of every shard'
+    )
+
+    parser.add_argument(
+        '-r',
+        '--reports',
+        action='store',
+        default=[],
+        nargs='*',
+        choices=[r.name() for r in app.AVAILABLE_REPORTS],
+        help='generate only the specified one or more reports'
+    )
+
+    parser.add_argument(
+        '-o',
+        '--output_filename',
+        action='store',
+        default=['out'],
+        nargs='*',
+        help='enter the output filename ("-" writes the report to the standard output)'
+    )
+
+    parser.add_argument(
+        '--snapshot',
+        action='store',
+        default=None,
+        metavar='FILE',
+        help='also save a compact snapshot of the results to FILE, for `pystats diff` '
+             '(binary if FILE ends with .pysnap)'
+    )
+
+    parser.add_argument(
+        '--store',
+        action='store',
+        default=None,
+        metavar='DB',
+        dest='result_store',
+        help='also add the results as a run to the SQLite store DB, for `pystats query`'
+    )
+
+    parser.add_argument(
+        "--silent",
+        action="store_false",
+        dest="verbose",
+        default=True,
+        help='silence output'
+    )
+
+    return parser
+
+
+def add_diff_parser_options(app):
+    parser = argparse.ArgumentParser(prog='pystats diff')
+
+    parser.add_argument('old', action='store', metavar='OLD', help='the snapshot of the earlier run')
+    parser.add_argument('new', action='store', metavar='NEW', help='the snapshot of the later run')
+
+    parser.add_argument(
+        '-o',
+        '--output_filename',
+        action='store',
+        default=None,
+        help='write the diff to this file (default: print it)'
+    )
+
+    parser.add_argument(
+        "--silent",
+        action="store_false",
+        dest="verbose",
+        default=True,
+        help='silence output'
+    )
+
+    return parser
+
+
+def add_query_parser_options(app):
+    parser = argparse.ArgumentParser(prog='pystats query')
+
+    parser.add_argument('store', action='store', metavar='DB', help='the SQLite store written with --store')
+    parser.add_argument(
+        'query',
+        action='store',
+        choices=QUERIES,
+        help='runs: list the stored runs; blocks: the blocks of a run with the highest metric; '
+             'trend: the number, maximum and average of the matching blocks in each run'
+    )
+
+    parser.add_argument(
+        '-m',
+        '--metric',
+        action='store',
+        default='num_lines',
+        help='the metric to rank or aggregate the blocks by (default: num_lines)'
+    )
+
+    parser.add_argument(
+        '--min',
+        action='store',
+        type=float,
+        default=None,
+        dest='minimum',
+        help='only the blocks whose metric is at least MIN'
+    )
+
+    parser.add_argument(
+        '-k',
+        '--kind',
+        action='store',
+        default=None,
+        choices=['class', 'method', 'function'],
+        help='only the blocks of this kind'
+    )
+
+    parser.add_argument(
+        '-p',
+        '--path',
+        action='store',
+        default=None,
+        help='only the blocks of the modules under this path (a package or a module)'
+    )
+
+    parser.add_argument(
+        '--run',
+        action='store',
+        type=int,
+        default=None,
+        dest='run_id',
+        help='the run to list the blocks of (default: the latest)'
+    )
+
+    parser.add_argument(
+        '-n',
+        '--limit',
+        action='store',
+        type=int,
+        default=50,
+        help='the maximum number of blocks to list (default: 50)'
+    )
+
+    parser.add_argument(
+        '-o',
+        '--output_filename',
+        action='store',
+        default=None,
+        help='write the results to this file (default: print them)'
+    )
+
+    parser.add_argument(
+        "--silent",
+        action="store_false",
+        dest="verbose",
+        default=True,
+        help='silence output'
+    )
+
+    return parser
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 
@@ -102,6 +103,43 @@ class DisplayablePath(object):
         )
         return [path._displayable() for path in paths]
 
+    @classmethod
+    def parseMarkdownPath(cls, lines, roots=None):
+        '''
+        Yields (line, path, is_dir) for each line of trees from `getMarkdownPath`,
+        where `path` is rebuilt from the root line and the line's ancestors.
+
+        The root line only shows the root's name: if `roots` is given, the path of
+        the i-th root line is `roots[i]` (e.g. the path passed to `getMarkdownPath`) instead.
+        '''
+        child_prefixes = (cls.display_filename_prefix_middle + ' ', cls.display_filename_prefix_last + ' ')
+        roots = iter(roots) if roots is not None else None
+        ancestors = []
+        for line in lines:
+            # Each level of depth is indented by 4 characters
+            depth = 0
+            position = 0
+            while line[position:position + 4] in (cls.display_parent_prefix_middle,
+                                                  cls.display_parent_prefix_last):
+                position += 4
+                depth += 1
+            if line[position:position + 4] in child_prefixes:
+                name = line[position + 4:]
+                depth += 1
+            else:
+                # A root line
+                name = line
+                depth = 0
+
+            is_dir = name.endswith('/')
+            del ancestors[depth:]
+            if ancestors:
+                path = os.path.join(ancestors[-1], name.rstrip('/'))
+            else:
+                path = next(roots, name.rstrip('/')) if roots is not None else name.rstrip('/')
+            ancestors.append(path)
+            yield line, os.path.normpath(path), is_dir
+
     @classmethod
     def printTree(cls, filename):
 
@@ -110,3 +148,65 @@ class DisplayablePath(object):
         )
         for path in paths:
             print(path._displayable())
+
+
+class IndexedPath(DisplayablePath):
+    '''
+    A `DisplayablePath` known from a list of names (e.g. the index of an archive) rather than from the disk.
+    '''
+
+    def __init__(self, path, parent_path, is_last, is_dir):
+        super().__init__(path, parent_path, is_last)
+        self.is_dir = is_dir
+
+    @property
+    def _displayname(self):
+        if self.is_dir:
+            return self.path.name + '/'
+        return self.path.name
+
+    @classmethod
+    def _make_index_tree(cls, name, children, parent=None, is_last=False):
+        displayable_root = cls(name, parent, is_last, is_dir=True)
+
+        yield displayable_root
+
+        names = sorted(children, key=lambda s: s.lower())
+        count = 1
+        for child in names:
+            is_last = count == len(names)
+            if children[child] is not None:
+                if child != '__pycache__':
+                    yield from cls._make_index_tree(
+                        child,
+                        children[child],
+                        parent=displayable_root,
+                        is_last=is_last
+                    )
+            else:
+                yield cls(child, displayable_root, is_last, is_dir=False)
+
+            count += 1
+
+    @classmethod
+    def getMarkdownIndex(cls, root, names):
+        '''
+        Returns the tree lines of `root`, holding the '/'-separated `names`, like `getMarkdownPath`.
+
+        Names ending with '/' are directories, as are the parents of every name.
+        '''
+        tree = {}
+        for name in names:
+            parts = [part for part in name.split('/') if part]
+            node = tree
+            for part in parts[:-1]:
+                if node.get(part) is None:
+                    node[part] = {}
+                node = node[part]
+            if parts and name.endswith('/'):
+                if node.get(parts[-1]) is None:
+                    node[parts[-1]] = {}
+            elif parts:
+                node.setdefault(parts[-1], None)
+
+        return [path._displayable() for path in cls._make_index_tree(root, tree)]
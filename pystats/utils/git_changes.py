@@ -0,0 +1,68 @@
+'''
+git_changes.py
+
+Asks the local git repository which files changed, so that only those are analyzed.
+'''
+import os
+import subprocess
+
+
+def _git(args, cwd):
+    '''Runs `git <args>` in `cwd` and returns its standard output.'''
+    try:
+        result = subprocess.run(
+            ['git', *args],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    except FileNotFoundError:
+        raise FileNotFoundError('git executable not found: --since requires git')
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f'git {" ".join(args)} failed: {e.stderr.strip()}')
+
+    return result.stdout
+
+
+def get_repo_root(path):
+    '''Returns the absolute path of the repository containing `path`.'''
+    cwd = path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+    return _git(['rev-parse', '--show-toplevel'], cwd).strip()
+
+
+def get_head(path):
+    '''Returns the commit id checked out in the repository containing `path`.'''
+    return _git(['rev-parse', 'HEAD'], get_repo_root(path)).strip()
+
+
+def get_changed_files(rev, path):
+    '''
+    Returns the absolute paths of files that differ between `rev` and the working tree,
+    including untracked (but not ignored) files, in the repository containing `path`.
+    '''
+    root = get_repo_root(path)
+    names = _git(['diff', '--name-only', '--no-renames', rev, '--'], root).splitlines()
+    names += _git(['ls-files', '--others', '--exclude-standard'], root).splitlines()
+
+    return sorted({os.path.join(root, name) for name in names if name})
+
+
+def get_added_and_deleted_files(rev, path):
+    '''
+    Returns (added, deleted): the sets of absolute paths of files added (including untracked)
+    or deleted between `rev` and the working tree, in the repository containing `path`.
+    '''
+    root = get_repo_root(path)
+    added, deleted = set(), set()
+    for line in _git(['diff', '--name-status', '--no-renames', rev, '--'], root).splitlines():
+        status, name = line.split('\t', maxsplit=1)
+        if status == 'A':
+            added.add(os.path.join(root, name))
+        elif status == 'D':
+            deleted.add(os.path.join(root, name))
+
+    for name in _git(['ls-files', '--others', '--exclude-standard'], root).splitlines():
+        added.add(os.path.join(root, name))
+
+    return added, deleted
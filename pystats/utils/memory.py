@@ -0,0 +1,64 @@
+'''
+memory.py
+
+Measures the memory used by the current process.
+'''
+import os
+import sys
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+SIZE_UNITS = {
+    '': 1,
+    'K': 1024,
+    'M': 1024 ** 2,
+    'G': 1024 ** 3,
+}
+
+
+def parse_size(value):
+    '''Parses a size such as "512M", "2G" or "1048576" into a number of bytes.'''
+    text = str(value).strip().upper().rstrip('B')
+    unit = text[-1:] if text[-1:] in SIZE_UNITS else ''
+    number = text[:-1] if unit else text
+
+    try:
+        size = int(float(number) * SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f'invalid size: {value}')
+
+    if size <= 0:
+        raise ValueError(f'size must be positive: {value}')
+
+    return size
+
+
+def current_rss():
+    '''Returns the resident set size of this process in bytes, or None if it cannot be measured.'''
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+def peak_rss():
+    '''Returns the peak resident set size of this process in bytes, or None if it cannot be measured.'''
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, in kilobytes elsewhere
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def format_size(num_bytes):
+    '''Formats a number of bytes for the log, e.g. "12.3 MB".'''
+    if num_bytes is None:
+        return 'unknown'
+
+    return f'{num_bytes / 1024 ** 2:.1f} MB'
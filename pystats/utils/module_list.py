@@ -0,0 +1,57 @@
+'''
+module_list.py
+
+Reads lists of modules given as inputs instead of packages to walk:
+`@FILE` reads the list in FILE, and `-` reads it from the standard input.
+
+Paths are separated by newlines, or by NUL characters (as written by
+`find -print0` or `git ls-files -z`) if a NUL comes before any newline.
+Lists are read in chunks and yielded path by path, so modules can be parsed
+while the rest of the list is still being written.
+'''
+import sys
+
+STDIN = '-'
+ARGFILE_PREFIX = '@'
+CHUNK_SIZE = 64 * 1024
+
+
+def is_module_list(argument):
+    '''Returns whether the input `argument` names a list of modules rather than a module or package.'''
+    return argument == STDIN or str(argument).startswith(ARGFILE_PREFIX)
+
+
+def iter_paths(stream, chunk_size=CHUNK_SIZE):
+    '''Yields the non-empty paths listed in the text `stream`, separated by newlines or NUL characters.'''
+    separator = None
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+
+        pending += chunk
+        if separator is None:
+            separators = [s for s in ('\0', '\n') if s in pending]
+            if not separators:
+                continue
+            separator = min(separators, key=pending.index)
+
+        *paths, pending = pending.split(separator)
+        for path in paths:
+            path = path.rstrip('\r') if separator == '\n' else path
+            if path:
+                yield path
+
+    if pending.rstrip('\r\n'):
+        yield pending.rstrip('\r\n')
+
+
+def iter_module_list(argument):
+    '''Yields the paths listed in the standard input (`-`) or in the file FILE (`@FILE`).'''
+    if argument == STDIN:
+        yield from iter_paths(sys.stdin)
+        return
+
+    with open(argument[len(ARGFILE_PREFIX):], 'r') as f:
+        yield from iter_paths(f)
@@ -0,0 +1,156 @@
+'''
+sketch.py
+
+A mergeable streaming quantile sketch (KLL), in pure Python.
+
+The sketch keeps a stack of compactors: level h holds items of weight 2**h.
+When the sketch is full, the lowest full level is sorted and every other item
+(starting at a random offset) is promoted to the level above, halving its
+weight. Lower levels get smaller capacities, so the sketch holds O(k) items
+whatever the number of values.
+
+Error bound: with high probability, the rank of the value returned by
+`quantile(q)` is within about 1.7 / k * count of q * count (about ±1% of the
+values for the default k = 200), for a single sketch or any merge of sketches.
+'''
+import math
+import random
+
+DEFAULT_K = 200
+# Each level holds 2/3 of the capacity of the level above
+CAPACITY_RATIO = 2 / 3
+
+
+class QuantileSketch:
+    '''Estimates the quantiles of a stream of numbers in bounded memory.
+
+    Sketches built on separate parts of a stream (e.g. by each worker or shard)
+    can be combined with `merge`.
+    '''
+
+    def __init__(self, k=DEFAULT_K, seed=0):
+        self.k = k
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.compactors = [[]]
+        # Seeded, so that the same values give the same estimates
+        self._random = random.Random(seed)
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return f'QuantileSketch(k={self.k}, count={self.count}, num_items={self.num_items})'
+
+    @property
+    def num_items(self):
+        '''The number of values retained.'''
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * CAPACITY_RATIO ** depth)))
+
+    def _max_items(self):
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def update(self, value):
+        '''Adds `value` to the sketch.'''
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        self.compactors[0].append(value)
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def _compress(self):
+        '''Compacts the lowest full level, until the sketch is within its capacity.'''
+        while self.num_items >= self._max_items():
+            for level, compactor in enumerate(self.compactors):
+                if len(compactor) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    compactor.sort()
+                    # Keep the last item if there is an odd number of them
+                    kept = [compactor.pop()] if len(compactor) % 2 else []
+                    offset = self._random.randint(0, 1)
+                    self.compactors[level + 1].extend(compactor[offset::2])
+                    compactor[:] = kept
+                    break
+            else:
+                return
+
+    def merge(self, other):
+        '''Adds the values summarized by `other` (another `QuantileSketch`) to this sketch.'''
+        if other.count == 0:
+            return self
+
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted_items(self):
+        return sorted(
+            (value, 2 ** level)
+            for level, compactor in enumerate(self.compactors)
+            for value in compactor
+        )
+
+    def quantile(self, q):
+        '''Returns an estimate of the `q`-quantile (0 <= q <= 1), or None if the sketch is empty.'''
+        if self.count == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        items = self._weighted_items()
+        total = sum(weight for _, weight in items)
+        target = q * total
+        cumulative = 0
+        for value, weight in items:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return self.max
+
+    def quantiles(self, qs):
+        '''Returns the estimates of each of the quantiles `qs`.'''
+        return [self.quantile(q) for q in qs]
+
+    def rank(self, value):
+        '''Returns an estimate of the number of values less than or equal to `value`.'''
+        items = self._weighted_items()
+        total = sum(weight for _, weight in items)
+        below = sum(weight for item, weight in items if item <= value)
+        return round(below * self.count / total) if total else 0
+
+    def to_json(self):
+        return {
+            'k': self.k,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'compactors': self.compactors,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        sketch = cls(k=data['k'])
+        sketch.count = data['count']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch.compactors = [list(compactor) for compactor in data['compactors']] or [[]]
+        return sketch
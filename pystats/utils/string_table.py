@@ -0,0 +1,96 @@
+'''
+string_table.py
+
+Per-run interning of the strings that repeat across a large package.
+
+The same signatures (`__init__(self)`, `__repr__(self)`...), basenames
+(`__init__.py`) and directory prefixes occur in a great many modules. A
+`StringTable` keeps one copy of each: the parser interns block signatures
+with it, `ParsedFile` keeps its filename as an interned (directory, basename)
+pair, and the walker lists module paths in a `PathList`, as (directory id,
+basename) pairs.
+
+A table lives as long as the run that created it (unlike `sys.intern`), so
+the strings of a run are released with its results.
+'''
+import os
+from array import array
+from collections.abc import Sequence
+
+
+class StringTable:
+    '''A table of unique strings, and of the ids of directories.'''
+
+    def __init__(self):
+        self._strings = {}
+        self.directories = []
+        self._directory_ids = {}
+
+    def __len__(self):
+        return len(self._strings)
+
+    def __repr__(self):
+        return f'StringTable(num_strings={len(self)}, num_directories={len(self.directories)})'
+
+    def intern(self, text):
+        '''Returns the table's copy of `text`, adding it if it has none.'''
+        return self._strings.setdefault(text, text)
+
+    @staticmethod
+    def split(path):
+        '''Splits `path` into (directory, basename), where the directory keeps its trailing separator.'''
+        position = path.rfind(os.sep) + 1
+        if os.altsep:
+            position = max(position, path.rfind(os.altsep) + 1)
+        return path[:position], path[position:]
+
+    def intern_path(self, path):
+        '''Returns (directory, basename) of `path` as interned strings: their concatenation is `path`.'''
+        directory, basename = self.split(path)
+        return self.intern(directory), self.intern(basename)
+
+    def directory_id(self, directory):
+        '''Returns the id of `directory` (as returned by `split`), adding it if it has none.'''
+        if directory not in self._directory_ids:
+            self._directory_ids[directory] = len(self.directories)
+            self.directories.append(self.intern(directory))
+        return self._directory_ids[directory]
+
+
+class PathList(Sequence):
+    '''
+    A list of paths, stored as (directory id, basename) pairs in `strings` (a `StringTable`).
+
+    Items are returned as strings, equal to the paths appended.
+    '''
+
+    def __init__(self, paths=(), strings=None):
+        self.strings = strings if strings is not None else StringTable()
+        self._directory_ids = array('I')
+        self._basenames = []
+        self.extend(paths)
+
+    def __len__(self):
+        return len(self._basenames)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.strings.directories[self._directory_ids[index]] + self._basenames[index]
+
+    def __repr__(self):
+        return f'PathList(num_paths={len(self)})'
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, PathList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def append(self, path):
+        directory, basename = self.strings.split(str(path))
+        self._directory_ids.append(self.strings.directory_id(directory))
+        self._basenames.append(self.strings.intern(basename))
+
+    def extend(self, paths):
+        for path in paths:
+            self.append(path)
@@ -0,0 +1,69 @@
+'''
+tree_cache.py
+
+Stores a snapshot of a full package walk on disk, so that runs restricted to
+changed files (`--since`) can still report the whole tree and module count.
+
+A snapshot records:
+- tree: The Markdown tree lines of the package.
+- modules: The module paths, relative to the package, in discovery order.
+- nonempty: The subset of `modules` that have at least one line.
+- files: Every file of the tree (modules or not), relative to the package, to tell
+  whether a file added or deleted since `commit` is already in the snapshot.
+- commit: The commit checked out when the package was walked.
+'''
+import hashlib
+import json
+import os
+
+DEFAULT_CACHE_DIR = '.pystats_cache'
+TREE_CACHE_VERSION = 2
+
+
+def _snapshot_filename(cache_dir, package_path):
+    key = hashlib.blake2b(os.path.realpath(package_path).encode(), digest_size=8).hexdigest()
+    return os.path.join(cache_dir, f'tree-{key}.json')
+
+
+def walk_files(package_path):
+    '''Returns every file in the tree of `package_path`, relative to it, skipping `__pycache__` as the tree does.'''
+    files = []
+    for directory, subdirectories, filenames in os.walk(package_path):
+        subdirectories[:] = [d for d in subdirectories if not d.endswith('__pycache__')]
+        files.extend(os.path.relpath(os.path.join(directory, f), package_path) for f in filenames)
+    return files
+
+
+def load_tree_snapshot(cache_dir, package_path):
+    '''Returns the cached snapshot of `package_path`, or None if there isn't a usable one.'''
+    try:
+        with open(_snapshot_filename(cache_dir, package_path), 'r') as f:
+            snapshot = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if snapshot.get('version') != TREE_CACHE_VERSION:
+        return None
+
+    return snapshot
+
+
+def save_tree_snapshot(cache_dir, package_path, tree, modules, nonempty, commit, files):
+    '''Writes the snapshot of `package_path` to `cache_dir`, and returns it.'''
+    snapshot = {
+        'version': TREE_CACHE_VERSION,
+        'package': os.path.realpath(package_path),
+        'commit': commit,
+        'tree': list(tree),
+        'modules': list(modules),
+        'nonempty': list(nonempty),
+        'files': list(files),
+    }
+
+    os.makedirs(cache_dir, exist_ok=True)
+    filename = _snapshot_filename(cache_dir, package_path)
+    with open(filename + '.tmp', 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(filename + '.tmp', filename)
+
+    return snapshot
@@ -11,6 +11,10 @@ setup(
     license='MIT',
     classifiers=[],
     packages=find_packages(exclude=('tests', 'tests.*')),
+    extras_require={
+        # Vectorized package summaries (see pystats/results/summary.py)
+        'numpy': ['numpy'],
+    },
     entry_points={
         'console_scripts': [
             'pystats = pystats.__main__:main',
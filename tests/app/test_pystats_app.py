@@ -1,7 +1,13 @@
+import io
+import json
 import os
+import sys
+import tempfile
 import unittest
+from contextlib import redirect_stdout
 
 from pystats.app.pystats_app import PyStatsApp
+from pystats.report import STDOUT
 
 
 class TestPyStatsApp(unittest.TestCase):
@@ -44,3 +50,24 @@ class TestPyStatsApp(unittest.TestCase):
         package_paths = '/Users/yutahayashi/VisualStudioProjects/ModuleAnalyzer/pystats/wrongPaths'
         with self.assertRaises(FileNotFoundError):
             self.app.getMarkdownPath(package_paths)
+
+    def test_ndjson_records_written_as_analyzed(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        for name in ['a.py', 'b.py']:
+            with open(os.path.join(tmpdir.name, name), 'w') as f:
+                f.write('def f():\n    pass\n')
+
+        # What is on the standard output once every module is analyzed, before the report is written
+        written = []
+        save_results = self.app.save_results
+        self.app.save_results = lambda *args, **kwargs: (written.append(sys.stdout.getvalue()),
+                                                         save_results(*args, **kwargs))
+        with redirect_stdout(io.StringIO()) as stdout:
+            self.app.run(tmpdir.name, filename_base=STDOUT, report_names=['NDJSONReport'])
+
+        analyzed = [json.loads(line)['type'] for line in written[0].splitlines()]
+        self.assertEqual(analyzed, ['module', 'function', 'module', 'function'])
+        self.assertTrue(stdout.getvalue().startswith(written[0]))
+        totals = stdout.getvalue()[len(written[0]):].splitlines()
+        self.assertEqual({json.loads(line)['type'] for line in totals}, {'directory', 'distribution'})
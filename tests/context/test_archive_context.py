@@ -0,0 +1,139 @@
+import io
+import os
+import pickle
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from pystats.app.pystats_app import PyStatsApp
+from pystats.context.archive_context import Archive, ArchiveMember, count_unread, is_archive, module_size
+from pystats.context.package_context import PackageContext
+
+MODULES = {
+    'pkg/__init__.py': '',
+    'pkg/core.py': 'class Core:\n    def run(self):\n        return 1\n\n\ndef main():\n    pass\n',
+    'pkg/sub/util.py': 'def helper(a):\n    return a\n',
+    'pkg/__pycache__/core.cpython-39.pyc': '',
+    'pkg-1.0.dist-info/METADATA': 'Name: pkg\n',
+}
+
+
+class TestArchiveContext(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_wheel(self, name='pkg-1.0-py3-none-any.whl'):
+        path = os.path.join(self.tmpdir.name, name)
+        with zipfile.ZipFile(path, 'w') as archive:
+            for name, text in MODULES.items():
+                archive.writestr(name, text)
+        return path
+
+    def write_sdist(self, name='pkg-1.0.tar.gz'):
+        path = os.path.join(self.tmpdir.name, name)
+        with tarfile.open(path, 'w:gz') as archive:
+            for name, text in MODULES.items():
+                data = text.encode()
+                info = tarfile.TarInfo(f'pkg-1.0/{name}')
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        return path
+
+    def test_is_archive(self):
+        self.assertTrue(is_archive(self.write_wheel()))
+        self.assertTrue(is_archive(self.write_sdist()))
+        self.assertFalse(is_archive(self.tmpdir.name))
+        self.assertFalse(is_archive(os.path.join(self.tmpdir.name, 'missing.zip')))
+
+    def test_modules_from_the_index(self):
+        archive = Archive(self.write_wheel())
+
+        modules = archive.modules()
+
+        self.assertEqual([module.name for module in modules], ['pkg/__init__.py', 'pkg/core.py', 'pkg/sub/util.py'])
+        self.assertEqual(str(modules[1]), os.path.join(archive.path, 'pkg/core.py'))
+        self.assertEqual(module_size(modules[1]), len(MODULES['pkg/core.py']))
+
+    def test_markdown_tree(self):
+        archive = Archive(self.write_sdist())
+
+        self.assertEqual(archive.get_markdown_tree(), [
+            'pkg-1.0.tar.gz/',
+            '└── pkg-1.0/',
+            '    ├── pkg/',
+            '    │   ├── __init__.py',
+            '    │   ├── core.py',
+            '    │   └── sub/',
+            '    │       └── util.py',
+            '    └── pkg-1.0.dist-info/',
+            '        └── METADATA',
+        ])
+
+    def test_members_are_streamed_like_files(self):
+        for path in [self.write_wheel(), self.write_sdist()]:
+            modules = list(PackageContext.iter_modules(Archive(path).modules()))
+
+            # The empty __init__.py is skipped, as on disk
+            self.assertEqual([os.path.basename(module.filename) for module in modules], ['core.py', 'util.py'])
+            self.assertEqual([block.signature for block in modules[0].functions], ['main()'])
+            self.assertEqual(modules[0].lines, MODULES['pkg/core.py'].splitlines())
+            self.assertIsNotNone(modules[0].content_hash)
+
+    def test_one_archive_open_at_a_time(self):
+        archives = [Archive(self.write_wheel(f'pkg{i}-1.0-py3-none-any.whl')) for i in range(2)]
+        archives += [Archive(self.write_sdist(f'pkg{i}-1.0.tar.gz')) for i in range(2)]
+        module_paths = []
+        for archive in archives:
+            archive.get_markdown_tree()
+            module_paths.extend(archive.modules())
+
+        # Each archive is closed once its index is read...
+        self.assertEqual([archive._handle for archive in archives], [None] * 4)
+
+        num_open = [sum(archive._handle is not None for archive in archives)
+                    for _ in PackageContext.iter_modules(module_paths)]
+
+        # ...then reopened for its modules only, and closed after the last one
+        self.assertEqual(len(num_open), 8)
+        self.assertEqual(max(num_open), 1)
+        self.assertEqual([archive._handle for archive in archives], [None] * 4)
+
+    def test_closed_after_the_members_of_a_shard(self):
+        archive = Archive(self.write_sdist())
+        modules = archive.modules()
+        assigned = [path for _, path in PackageContext.partition_modules(modules, 1, 2)]
+        self.assertLess(len(assigned), len(modules))
+
+        count_unread(assigned)
+        list(PackageContext.iter_modules(assigned))
+
+        self.assertIsNone(archive._handle)
+        self.assertIsNone(Archive._reading)
+
+    def test_members_are_picklable(self):
+        member = Archive(self.write_sdist()).modules()[1]
+        member.open().close()
+
+        copy = pickle.loads(pickle.dumps(member))
+
+        self.assertIsInstance(copy, ArchiveMember)
+        with copy.open() as f:
+            self.assertEqual(f.read().decode(), MODULES['pkg/core.py'])
+
+    def test_discover_archive(self):
+        path = self.write_wheel()
+        app = PyStatsApp()
+
+        module_paths, tree = app.discover([path])
+        app.analyze(module_paths, PackageContext.AVAILABLE_STATS)
+
+        self.assertEqual(tree[0], 'pkg-1.0-py3-none-any.whl/')
+        self.assertEqual([m.filename for m in app.modules],
+                         [os.path.join(path, 'pkg/core.py'), os.path.join(path, 'pkg/sub/util.py')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from pystats.context.file_context import CodeBlock, FileContext
+from pystats.context.file_context import CodeBlock, FileContext, LineIndex
 
 
 class TestFileContext(unittest.TestCase):
@@ -61,3 +61,37 @@ class TestFileContext(unittest.TestCase):
 
         assert len(cb) == 5
         assert cb.lines == []
+
+    def test_codeblock_fingerprint(self):
+        func = CodeBlock('def', 'f(x)', 0, 2, lines=['def f(x):', '    return x'])
+        method = CodeBlock('def', 'f(x)', 5, 7, lines=['    def f(x):  ', '        return x'])
+        other = CodeBlock('def', 'f(x)', 0, 2, lines=['def f(x):', '    return -x'])
+
+        assert func.fingerprint == method.fingerprint
+        assert func.fingerprint != other.fingerprint
+        assert CodeBlock('class', 'f(x)', 0, 2, lines=func.lines).fingerprint != func.fingerprint
+        assert CodeBlock('def', 'f(x)', 0, 2).fingerprint is None
+
+    def test_line_index_arrays(self):
+        index = LineIndex(['class A:', '', '    def f(self):', '     ', '        return 1', 'default = 2'])
+
+        assert list(index.indents) == [0, 0, 1, 1, 2, 0]
+        assert list(index.blank) == [0, 1, 0, 1, 0, 0]
+        assert list(index.candidates('def')) == [2, 5]
+        assert list(index.candidates('class')) == [0]
+
+    def test_line_index_range_query(self):
+        lines = [
+            'class A:',
+            '    def f(self):',
+            '        return 1',
+            '',
+            'class B:',
+            '    def g(self):',
+            '        pass',
+        ]
+        index = LineIndex(lines)
+
+        assert index.get_codeblocks('def', indent_level=1, start=4, end=7) == \
+            FileContext.get_codeblocks(lines[4:7], 'def', indent_level=1, offset=4)
+        assert index.get_codeblocks('def', indent_level=1, start=0, end=4) == [CodeBlock('def', 'f(self)', 1, 4)]
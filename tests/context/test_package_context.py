@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from pystats.app.pystats_app import PyStatsApp
+from pystats.context.package_context import PackageContext
+
+
+class TestPackageContext(unittest.TestCase):
+    SOURCE = [
+        'class One:',
+        '    def __init__(self, x):',
+        '        self.one = x',
+        '',
+        'def func(a):',
+        '    return a',
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_module(self, relpath, lines):
+        path = os.path.join(self.tmpdir.name, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+    def test_get_lines_and_hash_matches_get_lines(self):
+        path = self.write_module('a.py', self.SOURCE)
+        lines, content_hash = PackageContext.get_lines_and_hash(path)
+
+        self.assertEqual(lines, PackageContext.get_lines(path))
+        self.assertTrue(content_hash)
+
+    def test_identical_modules_share_blocks(self):
+        first = self.write_module('vendor_a/mod.py', self.SOURCE)
+        second = self.write_module('vendor_b/mod.py', self.SOURCE)
+        other = self.write_module('other.py', self.SOURCE + ['x = 1'])
+
+        modules = PackageContext.parse_modules([first, second, other])
+
+        self.assertEqual([m.filename for m in modules], [first, second, other])
+        self.assertEqual(modules[1].name, second.rsplit('.', maxsplit=1)[0])
+        self.assertEqual(modules[0].content_hash, modules[1].content_hash)
+        self.assertIs(modules[0].functions, modules[1].functions)
+        self.assertIs(modules[0].methods, modules[1].methods)
+        self.assertNotEqual(modules[0].content_hash, modules[2].content_hash)
+        self.assertIsNot(modules[0].functions, modules[2].functions)
+
+    def test_sources_parse_like_files(self):
+        path = self.write_module('a.py', self.SOURCE)
+        source = '\r\n'.join(self.SOURCE) + '\r\n'
+
+        lines, content_hash = PackageContext.get_source_lines_and_hash(source)
+        (module,) = PackageContext.iter_sources([('a.py', source)])
+        (on_disk,) = PackageContext.parse_modules([path])
+
+        self.assertEqual(lines, self.SOURCE)
+        self.assertEqual(PackageContext.get_source_lines_and_hash(source.encode()), (lines, content_hash))
+        self.assertEqual(module.filename, 'a.py')
+        self.assertEqual(module.functions, on_disk.functions)
+        self.assertEqual(module.classes, on_disk.classes)
+
+    def test_analyze_sources(self):
+        sources = iter([('a.py', '\n'.join(self.SOURCE)), ('empty.py', ''), ('b.py', '\n'.join(self.SOURCE))])
+        results = PyStatsApp.analyze_sources(sources, stat_names=['NumFuncLines'])
+
+        (a, a_stats), (b, b_stats) = results
+        self.assertEqual([a.filename, b.filename], ['a.py', 'b.py'])
+        self.assertEqual([stat.name() for stat in a_stats], ['NumFuncLines'])
+        # Identical contents share their stats
+        self.assertIs(a_stats[0], b_stats[0])
+
+    def test_shared_sources_are_bounded(self):
+        sources = [(f'{i}.py', f'def f():\n    return {i}\n') for i in range(5)]
+        sources.append(('again.py', sources[4][1]))
+        parsed_by_hash = {}
+        modules = list(PackageContext.iter_sources(sources, parsed_by_hash=parsed_by_hash, max_shared=2))
+
+        self.assertEqual(len(parsed_by_hash), 2)
+        self.assertEqual([module.content_hash for module in parsed_by_hash.values()],
+                         [modules[3].content_hash, modules[4].content_hash])
+        # The last parses are still shared
+        self.assertIs(modules[5].lines, modules[4].lines)
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+
+from pystats.app.pystats_app import PyStatsApp
+from pystats.context import scheduler as scheduler_module
+from pystats.context.package_context import PackageContext
+from pystats.context.scheduler import Scheduler, plan_chunks
+
+
+def count_lines(filenames):
+    results = []
+    for filename in filenames:
+        with open(filename) as f:
+            results.append(len(f.readlines()))
+    return results
+
+
+def encode_names(filenames):
+    return '\n'.join(os.path.basename(filename) for filename in filenames).encode() * 1000
+
+
+def decode_names(data):
+    return data.decode()[:len(data) // 1000].split('\n')
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_module(self, name, num_functions):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            for i in range(num_functions):
+                f.write(f'def func_{i}(a):\n    return a + {i}\n\n')
+        return path
+
+    def test_plan_chunks_largest_first(self):
+        filenames = ['big.py', 'medium.py', 'a.py', 'b.py', 'c.py', 'd.py']
+        sizes = [1000, 600, 50, 40, 30, 20]
+
+        chunks = plan_chunks(filenames, 1, sizes=sizes, chunk_bytes=100)
+
+        self.assertEqual([chunk.filenames for chunk in chunks],
+                         [['big.py'], ['medium.py'], ['a.py', 'b.py', 'c.py'], ['d.py']])
+        self.assertEqual(chunks[2].indexes, [2, 3, 4])
+        self.assertEqual(chunks[2].num_bytes, 120)
+
+    def test_plan_chunks_keeps_the_order_within_a_chunk(self):
+        filenames = [f'{i}.py' for i in range(64)]
+
+        chunks = plan_chunks(filenames, 1, sizes=[(7 * i) % 64 + 1 for i in range(64)])
+
+        # Archive members are then read in the archive's order
+        self.assertGreater(max(len(chunk) for chunk in chunks), 1)
+        for chunk in chunks:
+            self.assertEqual(chunk.indexes, sorted(chunk.indexes))
+            self.assertEqual(chunk.filenames, [filenames[i] for i in chunk.indexes])
+
+    def test_plan_chunks_splits_small_runs_between_workers(self):
+        filenames = [f'{i}.py' for i in range(64)]
+
+        chunks = plan_chunks(filenames, 4, sizes=[10] * 64)
+
+        # At least CHUNKS_PER_WORKER chunks per worker, covering every module once
+        self.assertGreaterEqual(len(chunks), 32)
+        self.assertEqual(sorted(i for chunk in chunks for i in chunk.indexes), list(range(64)))
+
+    def test_run_keeps_order_and_records_workers(self):
+        filenames = [self.write_module(f'mod_{i}.py', n) for i, n in enumerate([1, 30, 2, 10, 0])]
+
+        scheduler = Scheduler(2)
+        results = list(scheduler.run(count_lines, filenames))
+
+        self.assertEqual(results, [3, 90, 6, 30, 0])
+        self.assertEqual(sum(worker.num_modules for worker in scheduler.workers.values()), 5)
+        self.assertLessEqual(len(scheduler.workers), 2)
+        self.assertGreater(scheduler.wall_time, 0)
+        self.assertLessEqual(scheduler.utilization, 1)
+
+    def test_large_results_go_through_shared_memory(self):
+        filenames = [self.write_module(f'mod_{i}.py', 1) for i in range(3)]
+        threshold = scheduler_module.SHARED_MEMORY_THRESHOLD
+        scheduler_module.SHARED_MEMORY_THRESHOLD = 1
+        self.addCleanup(setattr, scheduler_module, 'SHARED_MEMORY_THRESHOLD', threshold)
+
+        results = list(Scheduler(2).run(encode_names, filenames, decode=decode_names))
+
+        self.assertEqual(results, ['mod_0.py', 'mod_1.py', 'mod_2.py'])
+
+    def test_jobs_give_the_same_results(self):
+        filenames = [self.write_module(f'mod_{i}.py', n) for i, n in enumerate([3, 0, 12, 1, 3])]
+        stats = PackageContext.AVAILABLE_STATS
+
+        serial = PyStatsApp()
+        serial.analyze(filenames, stats)
+        parallel = PyStatsApp()
+        parallel.analyze(filenames, stats, jobs=3)
+
+        self.assertEqual([m.filename for m in parallel.modules], [m.filename for m in serial.modules])
+        for expected, module in zip(serial.modules, parallel.modules):
+            self.assertEqual(module.functions, expected.functions)
+            self.assertEqual(
+                [s.function_values for s in parallel.stats[module]],
+                [s.function_values for s in serial.stats[expected]]
+            )
+        self.assertIsNotNone(parallel.scheduler)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from pystats.context.package_context import PackageContext
+from pystats.context.stream_context import StreamedFile, stream_parse
+from pystats.parsed_file import ParsedFile
+
+
+class TestStreamContext(unittest.TestCase):
+    CODE = [
+        'import os',
+        '',
+        'class First:',
+        '    """Doc."""',
+        '    def __init__(self, x):',
+        '        self.x = x',
+        '',
+        '    def method(self):',
+        '        def inner():',
+        '            return 1',
+        '        return inner',
+        '',
+        'def function(a, b):',
+        '    return a + b',
+        'class Second:',
+        '    def last(self):',
+        '        pass',
+        '',
+    ]
+
+    def test_same_blocks_as_parsed_file(self):
+        parsed_file = ParsedFile('module.py', self.CODE)
+        lines, functions, classes, methods = stream_parse(iter(self.CODE))
+
+        self.assertEqual(lines, self.CODE)
+        self.assertEqual(functions, parsed_file.functions)
+        self.assertEqual(classes, parsed_file.classes)
+        self.assertEqual(methods, parsed_file.methods)
+        for block in functions + classes:
+            match = (parsed_file.functions + parsed_file.classes)[(functions + classes).index(block)]
+            self.assertEqual(block.lines, match.lines)
+            self.assertEqual(block.fingerprint, match.fingerprint)
+
+    def test_only_head_lines_retained(self):
+        lines, functions, classes, methods = stream_parse(iter(self.CODE), head=2, keep_lines=False)
+
+        self.assertEqual(len(lines), len(self.CODE))
+        with self.assertRaises(IndexError):
+            lines[0]
+        self.assertEqual(classes[0].lines, ['class First:', '    """Doc."""'])
+        self.assertEqual(len(classes[0]), 10)
+        self.assertEqual(methods[classes[0]][1].lines, ['    def method(self):', '        def inner():'])
+        self.assertEqual(classes[0].fingerprint, ParsedFile('module.py', self.CODE).classes[0].fingerprint)
+
+    def test_streamed_module_matches_read_module(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'module.py')
+            with open(filename, 'w') as f:
+                f.write('\n'.join(self.CODE) + '\n')
+
+            with StreamedFile(filename) as streamed:
+                streamed_lines = list(streamed)
+            lines, content_hash = PackageContext.get_lines_and_hash(filename)
+            self.assertEqual(streamed_lines, lines)
+            self.assertEqual(streamed.content_hash, content_hash)
+
+            streamed_module, = PackageContext.iter_modules([filename], lines_needed='head', stream_threshold=0)
+            read_module, = PackageContext.iter_modules([filename])
+            self.assertEqual(len(streamed_module.lines), len(read_module.lines))
+            self.assertEqual(streamed_module.methods, read_module.methods)
+            self.assertEqual(streamed_module.content_hash, read_module.content_hash)
+
+    def test_identical_large_files_parsed_once(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filenames = [os.path.join(tmpdir, name) for name in ('first.py', 'second.py')]
+            for filename in filenames:
+                with open(filename, 'w') as f:
+                    f.write('\n'.join(self.CODE) + '\n')
+
+            with patch.object(PackageContext, 'stream_module', wraps=PackageContext.stream_module) as stream_module:
+                first, second = PackageContext.iter_modules(filenames, lines_needed='head', stream_threshold=0)
+
+            self.assertEqual(stream_module.call_count, 1)
+            self.assertEqual(second.filename, filenames[1])
+            self.assertEqual(second.content_hash, first.content_hash)
+            self.assertEqual(second.methods, first.methods)
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from pystats.results.binary_snapshot import BinarySnapshot, write_binary_snapshot
+from pystats.results.diff import diff_snapshots
+from pystats.results.snapshot import iter_snapshot
+
+
+class TestBinarySnapshot(unittest.TestCase):
+    RECORDS = [
+        {'path': 'pkg/b.py', 'values': {'num_lines': 12},
+         'blocks': [['class', 'B', {'num_lines': 6, 'num_methods': 1}],
+                    ['method', 'B.m(self)', {'num_lines': 4, 'missing_docstring': 1}],
+                    ['function', 'f(x)', {'num_lines': 3, 'missing_docstring': 0, 'ratio': 0.5}]]},
+        {'path': 'pkg/a.py', 'values': {'num_lines': 2}, 'blocks': []},
+        {'path': 'pkg/c.py', 'values': {}, 'blocks': [['function', 'g()', {'num_lines': 1}]]},
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'results.pysnap')
+        write_binary_snapshot(self.path, self.RECORDS)
+
+    def test_round_trip(self):
+        with BinarySnapshot(self.path) as snapshot:
+            self.assertEqual(3, len(snapshot))
+            self.assertEqual(4, snapshot.num_blocks)
+            self.assertEqual(self.RECORDS, list(snapshot))
+        self.assertEqual(self.RECORDS, list(iter_snapshot(self.path)))
+
+    def test_lookup_by_path(self):
+        with BinarySnapshot(self.path) as snapshot:
+            self.assertEqual(self.RECORDS[1], snapshot.get('pkg/a.py'))
+            self.assertEqual(2, snapshot.find_module('pkg/c.py'))
+            self.assertIsNone(snapshot.get('pkg/d.py'))
+            self.assertIsNone(snapshot.get(''))
+
+    def test_diff_against_binary_snapshot(self):
+        new_path = os.path.join(self.tmpdir.name, 'new.pysnap')
+        records = [dict(self.RECORDS[0], values={'num_lines': 13}), self.RECORDS[2]]
+        records.append({'path': 'pkg/d.py', 'values': {}, 'blocks': []})
+        write_binary_snapshot(new_path, records)
+
+        changes = {d.path: d.status for d in diff_snapshots(self.path, new_path)}
+        self.assertEqual({'pkg/b.py': 'changed', 'pkg/d.py': 'added', 'pkg/a.py': 'removed'}, changes)
+
+    def test_not_a_snapshot(self):
+        path = os.path.join(self.tmpdir.name, 'other')
+        with open(path, 'wb') as f:
+            f.write(b'not a snapshot')
+        with self.assertRaises(ValueError):
+            BinarySnapshot(path)
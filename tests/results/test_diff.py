@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+from pystats.app.pystats_app import PyStatsApp
+from pystats.results.diff import diff_snapshots, render_diff
+from pystats.results.snapshot import iter_snapshot
+
+
+class TestSnapshotDiff(unittest.TestCase):
+    OLD = {
+        'a.py': (
+            'class Foo:\n'
+            '    def bar(self):\n'
+            '        """Doc."""\n'
+            '        return 1\n'
+            'def grow(x):\n'
+            '    return x\n'
+        ),
+        'gone.py': 'def g():\n    return 1\n',
+        'same.py': 'def s():\n    return 1\n',
+    }
+    NEW = {
+        'a.py': (
+            'class Foo:\n'
+            '    def bar(self):\n'
+            '        return 1\n'
+            'def grow(x):\n'
+            '    y = x\n'
+            '    return y\n'
+        ),
+        'new.py': 'x = 1\n',
+        'same.py': 'def s():\n    return 1\n',
+    }
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        self.addCleanup(os.chdir, self.cwd)
+
+    def snapshot(self, files, name):
+        package = os.path.join(self.tmpdir.name, 'pkg')
+        for filename in os.listdir(package) if os.path.isdir(package) else []:
+            os.remove(os.path.join(package, filename))
+        os.makedirs(package, exist_ok=True)
+        for filename, text in files.items():
+            with open(os.path.join(package, filename), 'w') as f:
+                f.write(text)
+
+        PyStatsApp().run('pkg', filename_base=name, snapshot=name + '.snap')
+        return name + '.snap'
+
+    def test_snapshot_records(self):
+        records = list(iter_snapshot(self.snapshot(self.OLD, 'old')))
+
+        self.assertEqual([r['path'] for r in records], ['pkg/a.py', 'pkg/gone.py', 'pkg/same.py'])
+        self.assertEqual(records[0]['values']['num_lines'], 6)
+        self.assertEqual(
+            records[0]['blocks'],
+            [
+                ['class', 'Foo', {'num_lines': 4, 'num_methods': 1}],
+                ['method', 'Foo.bar(self)', {'num_lines': 3, 'missing_docstring': 0}],
+                ['function', 'grow(x)', {'num_lines': 2, 'missing_docstring': 1}],
+            ]
+        )
+
+    def test_diff_reports_only_changes(self):
+        old = self.snapshot(self.OLD, 'old')
+        new = self.snapshot(self.NEW, 'new')
+
+        diffs = {d.path: d for d in diff_snapshots(old, new)}
+        self.assertEqual(sorted(diffs), ['pkg/a.py', 'pkg/gone.py', 'pkg/new.py'])
+        self.assertEqual(diffs['pkg/gone.py'].status, 'removed')
+        self.assertEqual(diffs['pkg/new.py'].status, 'added')
+
+        changes = {(c.kind, c.name): c for c in diffs['pkg/a.py'].block_changes}
+        self.assertEqual(changes[('method', 'Foo.bar(self)')].new_values['missing_docstring'], 1)
+        self.assertEqual(changes[('function', 'grow(x)')].new_values['num_lines'], 3)
+        self.assertEqual(diffs['pkg/a.py'].value_changes, {})
+
+        lines = list(render_diff(diff_snapshots(old, new)))
+        self.assertIn('- function `grow(x)`: **num_lines:** 2 → 3 (+1)', lines)
+        self.assertEqual(lines[-1], '**Modules:** 1 added, 1 removed, 1 changed')
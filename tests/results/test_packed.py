@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from pystats.app.pystats_app import PyStatsApp
+from pystats.context.package_context import PackageContext
+from pystats.results.packed import pack_results, unpack_results
+from pystats.results.partial import module_to_json, stat_to_json
+
+
+class TestPackedResults(unittest.TestCase):
+    SOURCE = [
+        'class One:',
+        '    def __init__(self, x):',
+        '        self.one = x',
+        '',
+        '    def two(self):',
+        '        """Doc."""',
+        '        return 2',
+        '',
+        'def func(a):',
+        '    return a',
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_module(self, name, lines):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n' if lines else '')
+        return path
+
+    def analyze(self, filenames):
+        shared_stats = {}
+        results = []
+        for module in PackageContext.parse_modules(filenames):
+            results.append((module, PyStatsApp.compute_stats(module, PackageContext.AVAILABLE_STATS, shared_stats)))
+        return results
+
+    def test_round_trip(self):
+        filenames = [self.write_module('a.py', self.SOURCE), self.write_module('b.py', self.SOURCE + ['x = 1'])]
+        results = self.analyze(filenames)
+
+        unpacked = unpack_results(pack_results(results))
+
+        self.assertEqual(len(unpacked), 2)
+        for (module, stats), (expected_module, expected_stats) in zip(unpacked, results):
+            self.assertEqual(module_to_json(module, 0), module_to_json(expected_module, 0))
+            self.assertEqual([stat_to_json(s) for s in stats], [stat_to_json(s) for s in expected_stats])
+            self.assertFalse(hasattr(module, 'lines'))
+
+    def test_identical_modules_stay_shared(self):
+        filenames = [self.write_module('a.py', self.SOURCE), self.write_module('b.py', self.SOURCE)]
+        results = self.analyze(filenames)
+
+        (first, first_stats), (second, second_stats) = unpack_results(pack_results(results))
+
+        self.assertEqual(second.filename, filenames[1])
+        self.assertIs(first.functions, second.functions)
+        self.assertIs(first.methods, second.methods)
+        # Content-only stats are shared, the filename-dependent one is not
+        dunder = [stat.name() for stat in first_stats].index('NumNonPythonFile')
+        self.assertIs(first_stats[0], second_stats[0])
+        self.assertIsNot(first_stats[dunder], second_stats[dunder])
+
+    def test_empty_modules_and_float_values(self):
+        module, stats = self.analyze([self.write_module('a.py', self.SOURCE)])[0]
+        stats[0].module_values['ratio'] = 0.25
+
+        unpacked = unpack_results(pack_results([None, (module, stats), None]))
+
+        self.assertIsNone(unpacked[0])
+        self.assertIsNone(unpacked[2])
+        self.assertEqual(unpacked[1][1][0].module_values['ratio'], 0.25)
+        self.assertIsInstance(unpacked[1][1][0].module_values['num_lines'], int)
+
+    def test_payload_excludes_source_lines(self):
+        source = self.SOURCE + [f'VALUE_{i} = "{"x" * 50}"' for i in range(200)]
+        results = self.analyze([self.write_module('a.py', source)])
+
+        self.assertNotIn(b'VALUE_0', pack_results(results))
+
+
+if __name__ == '__main__':
+    unittest.main()
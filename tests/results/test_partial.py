@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from pystats.app.pystats_app import PyStatsApp
+from pystats.context.package_context import PackageContext
+
+
+class TestShardedRun(unittest.TestCase):
+    MODULES = {
+        'pkg/__init__.py': [''],
+        'pkg/big.py': ['def f{}(x):\n    """Doc."""\n    return x\n'.format(i) for i in range(30)],
+        'pkg/small.py': ['def g():\n    return 1\n'],
+        'pkg/sub/__init__.py': ['x = 1\n'],
+        'pkg/sub/mid.py': ['class A:\n    def m(self):\n        return 2\n'] * 5,
+    }
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        for relpath, chunks in self.MODULES.items():
+            path = os.path.join(self.tmpdir.name, relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(''.join(chunks))
+        self.package = os.path.join(self.tmpdir.name, 'pkg')
+        self.out = os.path.join(self.tmpdir.name, 'out')
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_partition_covers_every_module_once(self):
+        filenames = PyStatsApp().getPaths(self.package)
+        parts = [PackageContext.partition_modules(filenames, i, 3) for i in (1, 2, 3)]
+
+        indexes = sorted(i for part in parts for i, _ in part)
+        self.assertEqual(indexes, list(range(len(filenames))))
+        # The largest module gets a shard to itself
+        self.assertEqual(len(parts[0]), 1)
+        self.assertTrue(str(parts[0][0][1]).endswith('big.py'))
+
+    def test_partition_rejects_invalid_shard(self):
+        with self.assertRaises(ValueError):
+            PackageContext.partition_modules([], 3, 2)
+
+    def test_merge_matches_single_run(self):
+        PyStatsApp().run(self.package, filename_base=self.out + '-single')
+
+        for shard in (1, 2, 3):
+            PyStatsApp().run(self.package, filename_base=self.out, shard=(shard, 3))
+        partials = [f'{self.out}.shard-{shard}-of-3.json' for shard in (3, 1, 2)]
+        PyStatsApp().merge(partials, filename_base=self.out + '-merged')
+
+        self.assertEqual(self.read(self.out + '-merged.md'), self.read(self.out + '-single.md'))
+
+    def test_merge_requires_every_shard(self):
+        for shard in (1, 2):
+            PyStatsApp().run(self.package, filename_base=self.out, shard=(shard, 3))
+
+        with self.assertRaises(ValueError):
+            PyStatsApp().merge([f'{self.out}.shard-{shard}-of-3.json' for shard in (1, 2)])
@@ -0,0 +1,85 @@
+import unittest
+
+from pystats.app.pystats_app import PyStatsApp
+from pystats.context.package_context import PackageContext
+from pystats.parsed_file import ParsedFile
+from pystats.results.partial import ModuleResult
+from pystats.results.result_cache import ResultCache
+from pystats.statistic import DunderMethodPythonPackage, NumFuncLines, WarnNoDocstring
+
+SOURCE = 'class One:\n    def __init__(self, x):\n        self.one = x\n\n\ndef func(a):\n    return a\n'
+
+
+def module_source(i):
+    return SOURCE + f'\n\ndef extra_{i}():\n    return {i}\n'
+
+
+def results(cache, sources, stat_names=None):
+    return list(PyStatsApp.analyze_sources(sources, stat_names=stat_names, cache=cache))
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_hit_gives_the_same_results(self):
+        cache = ResultCache()
+        (first, first_stats), = results(cache, [('a.py', SOURCE)])
+        (second, second_stats), = results(cache, [('b/__init__.py', SOURCE)])
+
+        self.assertIsInstance(first, ParsedFile)
+        self.assertIsInstance(second, ModuleResult)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(second.filename, 'b/__init__.py')
+        self.assertEqual(second.name, 'b/__init__')
+        self.assertEqual([b.signature for b in second.functions], [b.signature for b in first.functions])
+        for expected, stat in zip(first_stats, second_stats):
+            self.assertEqual(stat.name(), expected.name())
+            self.assertEqual(stat.module_values, expected.module_values)
+            self.assertEqual(list(stat.function_values.values()), list(expected.function_values.values()))
+
+    def test_filename_stats_are_computed_again(self):
+        cache = ResultCache()
+        results(cache, [('a.py', SOURCE)], stat_names=['NumNonPythonFile'])
+        (_, stats), = results(cache, [('__init__.py', SOURCE)], stat_names=['NumNonPythonFile'])
+
+        self.assertEqual(cache.hits, 1)
+        self.assertIsInstance(stats[0], DunderMethodPythonPackage)
+        self.assertEqual(stats[0].module_values, {'dunder_method': 1})
+
+    def test_key_depends_on_the_stats(self):
+        cache = ResultCache()
+        results(cache, [('a.py', SOURCE)], stat_names=['NumFuncLines'])
+        results(cache, [('a.py', SOURCE)], stat_names=['WarnNoDocstring'])
+
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 2, 2))
+        self.assertNotEqual(ResultCache.key('hash', [NumFuncLines]), ResultCache.key('hash', [WarnNoDocstring]))
+
+    def test_entry_limit_evicts_least_recently_used(self):
+        cache = ResultCache(max_entries=2)
+        results(cache, [('0.py', module_source(0)), ('1.py', module_source(1))])
+        results(cache, [('0.py', module_source(0))])
+        results(cache, [('2.py', module_source(2))])
+
+        self.assertEqual((len(cache), cache.evictions), (2, 1))
+        results(cache, [('0.py', module_source(0)), ('1.py', module_source(1))])
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+    def test_byte_limit(self):
+        module = next(PackageContext.iter_sources([('a.py', module_source(0))]))
+        stats = PyStatsApp.compute_stats(module, PyStatsApp.get_requested_stats(), {})
+        cache = ResultCache()
+        cache.put(module, stats)
+        entry_bytes = cache.num_bytes
+
+        cache = ResultCache(max_bytes=entry_bytes * 2)
+        results(cache, [(f'{i}.py', module_source(0).replace('0', str(i))) for i in range(5)])
+
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.num_bytes, entry_bytes * 2)
+        self.assertEqual(cache.evictions, 3)
+
+        cache.clear()
+        self.assertEqual((len(cache), cache.num_bytes, cache.hits, cache.misses, cache.evictions), (0, 0, 0, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from pystats.app.pystats_app import PyStatsApp
+from pystats.results.result_store import ResultStore
+
+
+class TestResultStore(unittest.TestCase):
+    MODULES = {
+        'a.py': 'class A:\n    def m(self):\n        return 1\n',
+        'b.py': 'def f(x):\n    """Doc."""\n    return x\n\ndef g():\n    pass\n',
+    }
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.package = os.path.join(self.tmpdir.name, 'pkg')
+        os.makedirs(self.package)
+        self.write_modules(self.MODULES)
+        self.out = os.path.join(self.tmpdir.name, 'out')
+        self.db = os.path.join(self.tmpdir.name, 'results.db')
+
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def write_modules(self, modules):
+        for filename, text in modules.items():
+            with open(os.path.join(self.package, filename), 'w') as f:
+                f.write(text)
+
+    def test_runs_are_added(self):
+        PyStatsApp(verbose=False).run(self.package, filename_base=self.out, result_store=self.db)
+        self.write_modules({'b.py': 'def f(x):\n' + '    x += 1\n' * 10 + '    return x\n'})
+        PyStatsApp(verbose=False).run(self.package, filename_base=self.out, result_store=self.db)
+
+        with ResultStore(self.db) as store:
+            columns, rows = store.runs()
+            self.assertEqual([1, 2], [row[0] for row in rows])
+            # Module count and blocks (A, A.m, f, g then A, A.m, f)
+            self.assertEqual([(2, 4), (2, 3)], [(row[3], row[4]) for row in rows])
+
+            columns, rows = store.blocks(kind='function', path='pkg/b.py')
+            self.assertEqual([('pkg/b.py', 'function', 'f(x)', 12)], rows)
+
+            columns, rows = store.blocks(run_id=1, kind='method')
+            self.assertEqual([('pkg/a.py', 'method', 'A.m(self)', 2)], rows)
+
+            columns, rows = store.trend(minimum=3, kind='function', path='pkg')
+            self.assertEqual([(1, 1, 4), (2, 1, 12)], [(row[0], row[2], row[3]) for row in rows])
+
+            # Path prefixes match whole directories only
+            self.assertEqual([], store.blocks(path='pk')[1])
+
+    def test_query_renders_table(self):
+        PyStatsApp(verbose=False).run(self.package, filename_base=self.out, result_store=self.db)
+
+        output = os.path.join(self.tmpdir.name, 'query.md')
+        PyStatsApp(verbose=False).query(self.db, 'blocks', output=output, minimum=4)
+        with open(output) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(['| path | kind | name | num_lines |', '|---|---|---|---|',
+                          '| pkg/b.py | function | f(x) | 4 |'], lines)
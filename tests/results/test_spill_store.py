@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from pystats.app.pystats_app import PyStatsApp
+from pystats.context.package_context import PackageContext
+from pystats.results import spill_store
+from pystats.results.spill_store import SpillStore
+
+
+class TestSpillStore(unittest.TestCase):
+    MODULES = {
+        'a.py': 'class A:\n    def m(self):\n        return 1\n',
+        'b.py': 'def f(x):\n    """Doc."""\n    return x\n',
+        'c.py': 'def f(x):\n    """Doc."""\n    return x\n',
+    }
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.package = os.path.join(self.tmpdir.name, 'pkg')
+        os.makedirs(self.package)
+        for filename, text in self.MODULES.items():
+            with open(os.path.join(self.package, filename), 'w') as f:
+                f.write(text)
+        self.out = os.path.join(self.tmpdir.name, 'out')
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_spilled_run_matches_in_memory_run(self):
+        PyStatsApp().run(self.package, filename_base=self.out + '-memory')
+
+        app = PyStatsApp()
+        # A limit of one byte spills after the first module
+        app.run(self.package, filename_base=self.out + '-spilled', memory_limit=1)
+
+        self.assertEqual(self.read(self.out + '-spilled.md'), self.read(self.out + '-memory.md'))
+        self.assertIsNotNone(app.peak_rss)
+
+    def test_modules_read_back_in_order(self):
+        app = PyStatsApp()
+        # Without a growth margin, every module is spilled
+        store = SpillStore(memory_limit=1, spill_growth=0)
+        self.addCleanup(store.close)
+        filenames = sorted(os.path.join(self.package, f) for f in self.MODULES)
+        app.analyze(filenames, PackageContext.AVAILABLE_STATS, store=store)
+
+        modules = list(app.modules)
+        self.assertEqual(store.num_spills, 3)
+        self.assertEqual([os.path.basename(m.filename) for m in modules], ['a.py', 'b.py', 'c.py'])
+        self.assertFalse(hasattr(modules[0], 'lines'))
+        self.assertEqual(store[modules[1]][0].module_stats, ['**Num Module Lines:** 3'])
+
+    def test_spills_are_batched(self):
+        # The RSS stays over the limit after the first spill, and grows by 10 per module
+        rss = iter(range(100, 1000, 10))
+        original = spill_store.current_rss
+        spill_store.current_rss = lambda: next(rss)
+        self.addCleanup(setattr, spill_store, 'current_rss', original)
+
+        store = SpillStore(memory_limit=50, spill_growth=30)
+        self.addCleanup(store.close)
+        filenames = [os.path.join(self.package, 'a.py')] * 9
+        spilled = [store.add(module, []) for module in PackageContext.parse_modules(filenames)]
+
+        # Each `add` and `spill` reads the RSS: a spill after 1 module, then after each 3
+        self.assertEqual(spilled, [True, False, False, True, False, False, True, False, False])
+        self.assertEqual(store.num_spills, 3)
+        self.assertEqual(len(list(store.modules)), 9)
@@ -0,0 +1,48 @@
+import random
+import unittest
+
+from pystats.context.file_context import CodeBlock
+from pystats.report_model import BlockEntry, ModuleEntry
+from pystats.results import summary
+from pystats.results.summary import MetricColumns, summarize
+
+
+def block(start, length):
+    return BlockEntry(CodeBlock('def', 'f()', start, start + length), [], {})
+
+
+class TestSummary(unittest.TestCase):
+    def setUp(self):
+        a = block(0, 30)
+        a.methods = [block(1, 4), block(5, 25)]
+        self.modules = [
+            ModuleEntry('pkg/a', 'pkg/a.py', [], {}, [a], [block(30, 3)], num_lines=40),
+            ModuleEntry('pkg/sub/b', 'pkg/sub/b.py', [], {}, [], [block(0, 600), block(600, 10)], num_lines=620),
+            ModuleEntry('pkg/c', 'pkg/c.py', [], {}, [], [], num_lines=2),
+        ]
+
+    def test_pure_python_summary(self):
+        result = summarize(MetricColumns.from_modules(self.modules), use_numpy=False)
+
+        self.assertEqual([('class', 1, 30, 30.0, 30), ('method', 2, 29, 14.5, 25), ('function', 3, 613, 204.3, 600)],
+                         result.blocks)
+        self.assertEqual(('0-4', 1, 0), result.histogram[0])
+        self.assertEqual(('20-49', 0, 1), result.histogram[3])
+        self.assertEqual(('500+', 1, 0), result.histogram[-1])
+        self.assertEqual([('pkg', 2, 42, 21.0, 40), ('pkg/sub', 1, 620, 620.0, 620)], result.subpackages)
+
+    @unittest.skipIf(summary.np is None, 'NumPy is not installed')
+    def test_numpy_matches_pure_python(self):
+        rng = random.Random(0)
+        modules = list(self.modules)
+        for i in range(200):
+            functions = [block(0, int(rng.expovariate(0.02))) for _ in range(rng.randint(0, 20))]
+            modules.append(ModuleEntry(f'pkg/m{i % 7}/x', f'pkg/m{i % 7}/x{i}.py', [], {}, [], functions,
+                                       num_lines=rng.randint(1, 2000)))
+        columns = MetricColumns.from_modules(modules)
+
+        expected = summarize(columns, use_numpy=False)
+        actual = summarize(columns, use_numpy=True)
+        self.assertEqual(expected.blocks, actual.blocks)
+        self.assertEqual(expected.histogram, actual.histogram)
+        self.assertEqual(expected.subpackages, actual.subpackages)
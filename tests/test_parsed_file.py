@@ -0,0 +1,68 @@
+import unittest
+
+from pystats.parsed_file import MethodMap, ParsedFile
+
+
+class TestParsedFile(unittest.TestCase):
+    LINES = [
+        'class One:',
+        '    def __init__(self, x):',
+        '        self.one = x',
+        '',
+        'class Two:',
+        '    def two(self):',
+        '        return 2',
+        '',
+        'def func(a):',
+        '    return a',
+    ]
+
+    def test_blocks_are_parsed_on_access(self):
+        parsed_file = ParsedFile('one.py', self.LINES)
+
+        self.assertEqual(parsed_file.name, 'one')
+        self.assertEqual(parsed_file.num_lines, 10)
+        self.assertNotIn('functions', vars(parsed_file))
+        self.assertNotIn('_index', vars(parsed_file))
+
+        self.assertEqual([f.signature for f in parsed_file.functions], ['func(a)'])
+        self.assertNotIn('classes', vars(parsed_file))
+
+    def test_same_blocks_as_parse(self):
+        parsed_file = ParsedFile('one.py', self.LINES)
+        functions, classes, methods = parsed_file.parse()
+
+        self.assertEqual(parsed_file.functions, functions)
+        self.assertEqual(parsed_file.classes, classes)
+        self.assertEqual(parsed_file.methods, methods)
+        self.assertEqual(dict(parsed_file.methods), methods)
+
+    def test_methods_are_parsed_per_class(self):
+        parsed_file = ParsedFile('one.py', self.LINES)
+        one, two = parsed_file.classes
+
+        self.assertIsInstance(parsed_file.methods, MethodMap)
+        self.assertEqual([m.signature for m in parsed_file.methods[two]], ['two(self)'])
+        self.assertEqual(repr(parsed_file.methods), 'MethodMap(num_classes=2, num_parsed=1)')
+        self.assertIs(parsed_file.methods[two], parsed_file.methods[two])
+        self.assertNotIn(parsed_file.functions[0], parsed_file.methods)
+        with self.assertRaises(KeyError):
+            parsed_file.methods[parsed_file.functions[0]]
+
+    def test_shared_modules_parse_once(self):
+        first = ParsedFile('a/one.py', self.LINES, content_hash='hash')
+        second = ParsedFile.share('b/one.py', first)
+
+        self.assertIs(second.methods, first.methods)
+        self.assertIs(second.functions, first.functions)
+        self.assertNotIn('_index', vars(second))
+
+    def test_blocks_can_be_assigned(self):
+        parsed_file = ParsedFile('one.py', self.LINES)
+        parsed_file.functions = []
+
+        self.assertEqual(parsed_file.functions, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
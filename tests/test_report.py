@@ -0,0 +1,211 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+import pystats.statistic as statistic
+from pystats.app.pystats_app import PyStatsApp
+from pystats.parsed_file import ParsedFile
+from pystats.report import MarkdownReport, NDJSONReport, STDOUT
+from pystats.report_model import ModuleEntry, ReportModel, ReportTotals
+
+
+LINES = [
+    'class Circle:',
+    '    def radius(self):',
+    '        return 1',
+    '    def __init__(self):',
+    '        pass',
+    '',
+    'def volume(r):',
+    '    return r',
+    'def area(r):',
+    '    return r * r',
+]
+
+
+class TestReportModel(unittest.TestCase):
+    def setUp(self):
+        self.module = ParsedFile('shapes.py', LINES)
+        self.stats = {self.module: [
+            statistic.NumModuleLines(self.module),
+            statistic.NumFuncLines(self.module),
+            statistic.NumMethodLines(self.module),
+            statistic.WarnNoDocstring(self.module),
+        ]}
+
+    def test_blocks_sorted_with_merged_stats(self):
+        model = ReportModel([self.module], self.stats, ['shapes.py'])
+        module = model.modules[0]
+
+        self.assertEqual(['area(r)', 'volume(r)'], [f.signature for f in module.functions])
+        circle = module.classes[0]
+        self.assertEqual(['__init__(self)', 'radius(self)'], [m.signature for m in circle.methods])
+
+        # Each method collects the stats of every `Statistic`, in order
+        init = circle.methods[0]
+        self.assertEqual(['**Num Method Lines:** 3', '**WARNING:** Missing docstring.'], init.stats)
+        self.assertEqual(3, init.values['num_lines'])
+        self.assertEqual(10, module.values['num_lines'])
+
+    def test_model_built_once(self):
+        model = ReportModel([self.module], self.stats, ['shapes.py'])
+        self.assertIs(model.modules, model.modules)
+
+        report = MarkdownReport([self.module], self.stats, ['shapes.py'], model=model)
+        self.assertIs(model, report.model)
+        self.assertIn('- `__init__(self)`\n    - **Num Method Lines:** 3', report.render())
+
+    def test_uncached_model(self):
+        model = ReportModel([self.module], self.stats, ['shapes.py'], cache=False)
+        first = list(model.modules)
+        second = list(model.modules)
+        self.assertEqual([m.name for m in first], [m.name for m in second])
+        self.assertIsNot(first[0], second[0])
+
+
+class TestReportWriter(unittest.TestCase):
+    def setUp(self):
+        self.module = ParsedFile('shapes.py', LINES)
+        self.stats = {self.module: [statistic.NumFuncLines(self.module)]}
+        self.report = MarkdownReport([self.module, self.module], self.stats, ['shapes.py'])
+
+    def test_sections_per_module(self):
+        sections = list(self.report.iter_sections())
+        self.assertEqual(3, len(sections))
+        self.assertTrue(sections[1].startswith('\n\n---\n\n## module: shapes'))
+        self.assertEqual(''.join(sections), self.report.render())
+
+    def test_write_replaces_atomically(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename_base = os.path.join(tmpdir, 'out')
+            self.report.write(filename_base)
+            with open(filename_base + '.md') as file:
+                self.assertEqual(self.report.render(), file.read())
+            self.assertEqual(['out.md'], os.listdir(tmpdir))
+
+            # A failure while rendering leaves the previous report in place
+            def failing_sections():
+                yield 'partial'
+                raise RuntimeError('render failed')
+
+            self.report.iter_sections = failing_sections
+            with self.assertRaises(RuntimeError):
+                self.report.write(filename_base)
+            with open(filename_base + '.md') as file:
+                self.assertNotEqual('partial', file.read())
+            self.assertEqual(['out.md'], os.listdir(tmpdir))
+
+
+class TestNDJSONReport(unittest.TestCase):
+    def test_one_record_per_block(self):
+        module = ParsedFile('shapes.py', LINES)
+        stats = {module: [statistic.NumModuleLines(module), statistic.NumFuncLines(module),
+                          statistic.NumMethodLines(module)]}
+        report = NDJSONReport([module], stats, ['shapes.py'])
+
+        records = [json.loads(line) for line in report.render().splitlines()]
+        self.assertEqual(['module', 'class', 'method', 'method', 'function', 'function', 'directory'],
+                         [r['type'] for r in records])
+        self.assertEqual({'num_lines': 10}, records[0]['values'])
+        self.assertEqual('Circle', records[2]['class'])
+        self.assertEqual(('__init__(self)', 3), (records[2]['signature'], records[2]['values']['num_lines']))
+        self.assertEqual(('area(r)', 2), (records[4]['signature'], records[4]['values']['num_lines']))
+
+    def test_write_to_stdout(self):
+        module = ParsedFile('shapes.py', LINES)
+        report = NDJSONReport([module], {module: [statistic.NumModuleLines(module)]}, ['shapes.py'])
+
+        with redirect_stdout(io.StringIO()) as stdout:
+            report.write(STDOUT)
+        self.assertEqual(report.render(), stdout.getvalue())
+
+    def test_modules_written_as_analyzed(self):
+        module = ParsedFile('shapes.py', LINES)
+        stats = {module: [statistic.NumModuleLines(module), statistic.NumFuncLines(module)]}
+        stream = io.StringIO()
+        NDJSONReport.write_module(stream, module, stats[module])
+        report = NDJSONReport([module], stats, ['shapes.py'], modules_written=True)
+
+        self.assertEqual(NDJSONReport([module], stats, ['shapes.py']).render(), stream.getvalue() + report.render())
+        self.assertEqual(['directory'], [json.loads(line)['type'] for line in report.render().splitlines()])
+
+
+class TestDirectoryRollups(unittest.TestCase):
+    def test_rollups_bottom_up(self):
+        modules = [
+            ParsedFile(os.path.join('pkg', 'a.py'), LINES),
+            ParsedFile(os.path.join('pkg', 'sub', 'b.py'), ['def f():', '    """Doc."""']),
+        ]
+        stats = {m: [statistic.NumModuleLines(m), statistic.WarnNoDocstring(m)] for m in modules}
+        tree = ['pkg/', '├── a.py', '└── sub/', '    └── b.py']
+        model = ReportModel(modules, stats, tree)
+
+        self.assertEqual(['pkg', os.path.join('pkg', 'sub')], list(model.rollups))
+        self.assertEqual(
+            {'path': 'pkg', 'num_modules': 2, 'num_lines': 12, 'num_classes': 1,
+             'num_methods': 2, 'num_functions': 3, 'missing_docstrings': 4},
+            model.rollups['pkg'].as_dict()
+        )
+        self.assertEqual(1, model.rollups[os.path.join('pkg', 'sub')].num_functions)
+
+        annotated = model.annotated_tree()
+        self.assertEqual('├── a.py', annotated[1])
+        self.assertEqual('└── sub/  (modules: 1, lines: 2, classes: 0, methods: 0, '
+                         'functions: 1, missing docstrings: 0)', annotated[2])
+
+    def test_totals_gathered_in_one_pass(self):
+        modules = [ParsedFile(os.path.join('pkg', name), LINES) for name in ('a.py', 'b.py')]
+        stats = {m: [statistic.NumModuleLines(m), statistic.NumFuncLines(m)] for m in modules}
+        totals = ReportTotals()
+        for module in modules:
+            totals.add_module(ModuleEntry.build(module, stats[module]))
+        gathered = ReportModel(modules, stats, ['pkg/'], cache=False)
+
+        with patch.object(ModuleEntry, 'build', wraps=ModuleEntry.build) as build:
+            model = ReportModel(modules, stats, ['pkg/'], cache=False, totals=totals)
+            model.annotated_tree()
+            model.summary
+            self.assertEqual(build.call_count, 0)
+
+            gathered.annotated_tree()
+            gathered.summary
+            self.assertEqual(build.call_count, 2)
+
+        self.assertEqual(model.rollups['pkg'].as_dict(), gathered.rollups['pkg'].as_dict())
+        self.assertEqual(model.summary.blocks, gathered.summary.blocks)
+
+    def test_rollups_without_stats(self):
+        module = ParsedFile(os.path.join('pkg', 'a.py'), LINES)
+        model = ReportModel([module], {module: [statistic.NumFuncLines(module)]}, ['pkg/', '└── a.py'])
+
+        self.assertEqual(
+            {'path': 'pkg', 'num_modules': 1, 'num_lines': 10, 'num_classes': 1,
+             'num_methods': 2, 'num_functions': 2, 'missing_docstrings': None},
+            model.rollups['pkg'].as_dict()
+        )
+        self.assertEqual('pkg/  (modules: 1, lines: 10, classes: 1, methods: 2, functions: 2)',
+                         model.annotated_tree()[0])
+
+    def test_package_not_under_the_working_directory(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        package = os.path.join(tmpdir.name, 'src', 'pkg')
+        os.makedirs(os.path.join(package, 'sub'))
+        for name in ['a.py', os.path.join('sub', 'b.py')]:
+            with open(os.path.join(package, name), 'w') as f:
+                f.write('def f():\n    pass\n')
+
+        self.addCleanup(os.chdir, os.getcwd())
+        for path, cwd in [(package, os.getcwd()), (os.path.join('src', 'pkg'), tmpdir.name)]:
+            os.chdir(cwd)
+            app = PyStatsApp()
+            module_paths, app.tree_markdown = app.discover([path])
+            app.analyze(module_paths, PyStatsApp.get_requested_stats(['NumFuncLines']))
+
+            annotated = app.build_report_model().annotated_tree()
+            self.assertEqual('pkg/  (modules: 2, lines: 4, classes: 0, methods: 0, functions: 2)', annotated[0])
+            self.assertEqual('└── sub/  (modules: 1, lines: 2, classes: 0, methods: 0, functions: 1)', annotated[2])
@@ -1,8 +1,10 @@
 import unittest
-from unittest.mock import Mock, MagicMock
+from unittest.mock import MagicMock, Mock, patch
 
 import pystats.statistic as statistic
+from pystats.context import token_context
 from pystats.context.file_context import CodeBlock
+from pystats.parsed_file import ParsedFile
 
 
 class TestStats(unittest.TestCase):
@@ -143,3 +145,170 @@ class TestStats(unittest.TestCase):
 
         calculated_stat = statistic.DunderMethodPythonPackage(parsed_file)
         self.assertIn('**dunder method in the package:** 1', calculated_stat.package_stats[0])
+
+    def test_block_stats_memoized_by_fingerprint(self):
+        statistic.Statistic.BLOCK_CACHE.clear()
+        first = MagicMock(name='ParsedFile')
+        first.functions = [
+            CodeBlock('def', 'area(r)', 0, 3, lines=['def area(r):', '    """Doc."""', '    return r * r'])
+        ]
+        second = MagicMock(name='ParsedFile')
+        second.functions = [
+            CodeBlock('def', 'area(r)', 10, 13, lines=['def area(r):', '    """Doc."""', '    return r * r']),
+            CodeBlock('def', 'hello(name)', 13, 15, lines=['def hello(name):', '    return name']),
+        ]
+
+        statistic.NumFuncLines(first)
+        calculated_stat = statistic.NumFuncLines(second)
+
+        self.assertEqual(statistic.Statistic.BLOCK_CACHE.hits, 1)
+        self.assertEqual(statistic.Statistic.BLOCK_CACHE.misses, 2)
+        self.assertIn('**Num Function Lines:** 3', calculated_stat.function_stats[second.functions[0]])
+        self.assertIn('**Num Function Lines:** 2', calculated_stat.function_stats[second.functions[1]])
+        self.assertEqual(calculated_stat.function_values[second.functions[1]], {'num_lines': 2})
+
+    def test_block_stat_cache_is_bounded(self):
+        cache = statistic.BlockStatCache(maxsize=2)
+        blocks = [CodeBlock('def', f'f{i}()', 0, 1, lines=[f'def f{i}():']) for i in range(3)]
+        for block in blocks:
+            cache.get('Stat', block, lambda b: ([], {}))
+        cache.get('Stat', blocks[0], lambda b: ([], {}))
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+
+    def test_blocks_without_lines_are_not_cached(self):
+        statistic.Statistic.BLOCK_CACHE.clear()
+        parsed_file = MagicMock(name='ParsedFile')
+        # Read back from results: same signature and length, but not the same code
+        parsed_file.functions = [CodeBlock('def', 'f()', 0, 2), CodeBlock('def', 'f()', 5, 7)]
+        computed = []
+
+        def compute(block):
+            computed.append(block)
+            return [], {}
+
+        for block in parsed_file.functions:
+            statistic.Statistic.BLOCK_CACHE.get('Stat', block, compute)
+
+        self.assertEqual(computed, parsed_file.functions)
+        self.assertEqual(len(statistic.Statistic.BLOCK_CACHE), 0)
+
+    def test_function_lengths_logged_on_cache_hits(self):
+        statistic.Statistic.BLOCK_CACHE.clear()
+        parsed_file = MagicMock(name='ParsedFile')
+        parsed_file.functions = [CodeBlock('def', 'f()', 0, 2, lines=['def f():', '    pass'])]
+
+        for _ in range(2):
+            with patch.object(statistic.logger, 'info') as info:
+                statistic.NumFuncLines(parsed_file)
+            info.assert_called_once_with('Length of the function blocks is 2')
+        self.assertEqual(statistic.Statistic.BLOCK_CACHE.hits, 1)
+
+    TOKEN_SOURCE = [
+        '''"""Module docstring."""''',
+        'import os',
+        '',
+        '',
+        'def walk(path, depth=0):',
+        '''    """Walks `path`."""''',
+        '    # Skip files',
+        '    if not os.path.isdir(path) or depth > 3:',
+        '        return []',
+        '',
+        '    found = []',
+        '    for name in os.listdir(path):',
+        '        while name:',
+        '            found.append(name if name.endswith(".py") else None)',
+        '            name = ""',
+        '    return found',
+        '',
+        '',
+        'class Tree:',
+        '    def size(self):',
+        '        return 1',
+    ]
+
+    def test_token_stats(self):
+        statistic.Statistic.BLOCK_CACHE.clear()
+        parsed_file = ParsedFile('walk.py', self.TOKEN_SOURCE)
+        walk = parsed_file.functions[0]
+        size = parsed_file.methods[parsed_file.classes[0]][0]
+
+        complexity = statistic.CyclomaticComplexity(parsed_file)
+        num_tokens = statistic.NumTokens(parsed_file)
+        line_kinds = statistic.LineKinds(parsed_file)
+        nesting = statistic.MaxNestingDepth(parsed_file)
+
+        # if, or, for, while and the conditional expression's if
+        self.assertEqual(complexity.function_values[walk], {'complexity': 6})
+        self.assertEqual(complexity.function_values[size], {'complexity': 1})
+        self.assertIn('**Cyclomatic Complexity:** 6', complexity.function_stats[walk])
+        self.assertEqual(num_tokens.function_values[size], {'num_tokens': 8})
+        self.assertEqual(num_tokens.module_values['num_tokens'], parsed_file.tokens.num_tokens(0, 21))
+        self.assertEqual(line_kinds.function_values[walk],
+                         {'code_lines': 9, 'blank_lines': 3, 'comment_lines': 1, 'docstring_lines': 1})
+        self.assertEqual(line_kinds.module_values['docstring_lines'], 2)
+        self.assertEqual(nesting.function_values[walk], {'max_nesting': 2})
+        self.assertEqual(nesting.function_values[size], {'max_nesting': 0})
+
+    def test_token_stats_tokenize_once(self):
+        statistic.Statistic.BLOCK_CACHE.clear()
+        parsed_file = ParsedFile('walk.py', self.TOKEN_SOURCE)
+        shared = ParsedFile.share('copy.py', parsed_file)
+        calls = []
+
+        def counting_index(lines):
+            calls.append(lines)
+            return token_context.TokenIndex(lines)
+
+        with patch('pystats.parsed_file.TokenIndex', counting_index):
+            for stat in [statistic.CyclomaticComplexity, statistic.NumTokens,
+                         statistic.LineKinds, statistic.MaxNestingDepth]:
+                stat(parsed_file)
+                stat(shared)
+
+        self.assertEqual(len(calls), 1)
+
+    def test_tokens_of_invalid_code(self):
+        index = token_context.TokenIndex(['def broken(:', '    return (1,', '', '# end'])
+
+        self.assertFalse(index.complete)
+        self.assertEqual(index.line_kinds(0, 4)['blank'], 1)
+
+    def test_case_clauses_are_decisions(self):
+        index = token_context.TokenIndex([
+            'def classify(point):',
+            '    case = point',
+            '    match case:',
+            '        case (0, 0):',
+            '            return case',
+            '        case (x,',
+            '              y) if x == y:',
+            '            return x',
+            '        case _:',
+            '            return None',
+        ])
+
+        self.assertEqual(list(index.decisions), [0, 0, 0, 1, 0, 1, 1, 0, 1, 0])
+        self.assertEqual(index.complexity(0, 10), 5)
+
+    def test_one_line_case_clauses_are_decisions(self):
+        index = token_context.TokenIndex([
+            'def digit(name):',
+            '    case: str = name',
+            '    case = lambda: case',
+            '    match name:',
+            "        case 'one': return 1",
+            "        case 'two': return 2",
+            "        case 'three': return 3",
+            "        case 'four': return 4",
+            "        case 'five': return 5",
+            "        case 'six': return 6",
+            "        case 'seven': return 7",
+            "        case {'digit': int(value)}: return value",
+            '        case _: return None',
+        ])
+
+        self.assertEqual(list(index.decisions), [0, 0, 0, 0] + [1] * 9)
+        self.assertEqual(index.complexity(0, 13), 10)
@@ -10,3 +10,20 @@ class TestArgparser(unittest.TestCase):
         app = add_parser_options(PackageContext)
         args = app.parse_args('-h')
         self.assertEqual(args.input, ['-', 'h'])
+
+    def test_shard_option(self):
+        app = add_parser_options(PackageContext)
+        args = app.parse_args(['pkg', '--shard', '2/4'])
+        self.assertEqual(args.shard, (2, 4))
+
+        with self.assertRaises(SystemExit):
+            app.parse_args(['pkg', '--shard', '5/4'])
+
+    def test_jobs_option(self):
+        app = add_parser_options(PackageContext)
+        self.assertEqual(app.parse_args(['pkg']).jobs, 1)
+        self.assertEqual(app.parse_args(['pkg', '-j', '4']).jobs, 4)
+        self.assertGreaterEqual(app.parse_args(['pkg', '--jobs', '0']).jobs, 1)
+
+        with self.assertRaises(SystemExit):
+            app.parse_args(['pkg', '--jobs', '-1'])
@@ -0,0 +1,21 @@
+import os
+import unittest
+
+from pystats.utils.format_tree import DisplayablePath
+
+
+class TestFormatTree(unittest.TestCase):
+    def test_parse_markdown_path(self):
+        tree = ['pkg/', '├── a.py', '├── sub/', '│   └── b.py', '└── z.py']
+        self.assertEqual(
+            [('pkg', True), ('pkg/a.py', False), ('pkg/sub', True), ('pkg/sub/b.py', False), ('pkg/z.py', False)],
+            [(path, is_dir) for _, path, is_dir in DisplayablePath.parseMarkdownPath(tree)]
+        )
+
+    def test_parse_markdown_path_with_roots(self):
+        tree = ['pkg/', '└── a.py', 'other/', '└── sub/']
+        roots = [os.path.join('src', 'pkg'), os.path.join(os.pardir, 'other')]
+        self.assertEqual(
+            [roots[0], os.path.join(roots[0], 'a.py'), roots[1], os.path.join(roots[1], 'sub')],
+            [path for _, path, _ in DisplayablePath.parseMarkdownPath(tree, roots=roots)]
+        )
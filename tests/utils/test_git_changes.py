@@ -0,0 +1,122 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from pystats.app.pystats_app import PyStatsApp
+from pystats.utils.git_changes import get_added_and_deleted_files, get_changed_files
+
+
+@unittest.skipUnless(shutil.which('git'), 'git is not installed')
+class TestGitChanges(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.root = os.path.realpath(self.tmpdir.name)
+        self.package = os.path.join(self.root, 'pkg')
+        self.cache_dir = os.path.join(self.root, 'cache')
+
+        self.git('init', '-q')
+        self.write('pkg/__init__.py', '')
+        self.write('pkg/a.py', 'def a():\n    return 1\n')
+        self.write('pkg/b.py', 'def b():\n    return 2\n')
+        self.git('add', '.')
+        self.git('-c', 'user.name=t', '-c', 'user.email=t@t', 'commit', '-qm', 'init')
+
+    def git(self, *args):
+        subprocess.run(['git', *args], cwd=self.root, check=True, capture_output=True)
+
+    def write(self, relpath, text):
+        path = os.path.join(self.root, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_changed_and_untracked_files(self):
+        changed = self.write('pkg/a.py', 'def a():\n    return 3\n')
+        untracked = self.write('pkg/c.py', 'x = 1\n')
+
+        self.assertEqual(get_changed_files('HEAD', self.package), [changed, untracked])
+        self.assertEqual(get_added_and_deleted_files('HEAD', self.package), ({untracked}, set()))
+
+    def test_since_restricts_modules_but_keeps_package_counts(self):
+        self.write('pkg/a.py', 'def a():\n    return 3\n')
+
+        app = PyStatsApp()
+        module_paths, tree, num_modules = app.discover_changed([self.package], 'HEAD', cache_dir=self.cache_dir)
+
+        self.assertEqual(module_paths, [os.path.join(self.package, 'a.py')])
+        self.assertEqual(num_modules, 2)
+        self.assertEqual(tree[1:], ['├── __init__.py', '├── a.py', '└── b.py'])
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_since_report_counts_agree_with_the_package(self):
+        full = os.path.join(self.root, 'full')
+        PyStatsApp().run(self.package, filename_base=full, report_names=['MarkdownReport'])
+        self.write('pkg/a.py', 'def a():\n    return 3\n')
+        changed = os.path.join(self.root, 'changed')
+        PyStatsApp().run(self.package, filename_base=changed, report_names=['MarkdownReport'], since='HEAD',
+                         cache_dir=self.cache_dir)
+
+        with open(full + '.md') as f:
+            full_report = f.read()
+        with open(changed + '.md') as f:
+            changed_report = f.read()
+
+        # The full tree counts every module, as Num Modules does...
+        self.assertIn('modules: 2,', full_report.split('```')[1])
+        self.assertIn('**Num Modules:** 2', full_report)
+        # ...while under --since the tree is not annotated with the changed modules' counts
+        self.assertNotIn('modules:', changed_report.split('```')[1])
+        self.assertIn('**Num Modules:** 2', changed_report)
+        self.assertIn('**Changed Modules:** 1', changed_report)
+        self.assertIn('**Blocks (changed modules only).**', changed_report)
+        self.assertIn('**Distributions (changed modules only).**', changed_report)
+
+    def test_cached_snapshot_refreshed_when_modules_added(self):
+        app = PyStatsApp()
+        app.discover_changed([self.package], 'HEAD', cache_dir=self.cache_dir)
+
+        added = self.write('pkg/c.py', 'x = 1\n')
+        module_paths, tree, num_modules = app.discover_changed([self.package], 'HEAD', cache_dir=self.cache_dir)
+
+        self.assertEqual(module_paths, [added])
+        self.assertEqual(num_modules, 3)
+        self.assertTrue(tree[-1].endswith('c.py'))
+
+    def test_cached_snapshot_refreshed_when_other_files_added(self):
+        app = PyStatsApp()
+        app.discover_changed([self.package], 'HEAD', cache_dir=self.cache_dir)
+
+        self.write('pkg/data/schema.json', '{}')
+        module_paths, tree, num_modules = app.discover_changed([self.package], 'HEAD', cache_dir=self.cache_dir)
+
+        self.assertEqual(module_paths, [])
+        self.assertEqual(num_modules, 2)
+        self.assertEqual(tree[-2:], ['└── data/', '    └── schema.json'])
+
+    def test_changes_in_each_repository(self):
+        other = tempfile.TemporaryDirectory()
+        self.addCleanup(other.cleanup)
+        other_root = os.path.realpath(other.name)
+        os.makedirs(os.path.join(other_root, 'lib'))
+        with open(os.path.join(other_root, 'lib', 'c.py'), 'w') as f:
+            f.write('def c():\n    return 1\n')
+        for args in [('init', '-q'), ('add', '.'),
+                     ('-c', 'user.name=t', '-c', 'user.email=t@t', 'commit', '-qm', 'init')]:
+            subprocess.run(['git', *args], cwd=other_root, check=True, capture_output=True)
+
+        changed = self.write('pkg/a.py', 'def a():\n    return 3\n')
+        other_changed = os.path.join(other_root, 'lib', 'c.py')
+        with open(other_changed, 'w') as f:
+            f.write('def c():\n    return 2\n')
+
+        app = PyStatsApp()
+        module_paths, _, num_modules = app.discover_changed(
+            [self.package, os.path.join(other_root, 'lib')], 'HEAD', cache_dir=self.cache_dir
+        )
+
+        self.assertEqual(list(module_paths), [changed, other_changed])
+        self.assertEqual(num_modules, 3)
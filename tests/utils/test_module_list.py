@@ -0,0 +1,71 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+from pystats.app.pystats_app import PyStatsApp
+from pystats.context.package_context import PackageContext
+from pystats.utils.module_list import is_module_list, iter_module_list, iter_paths
+from pystats.utils.string_table import PathList
+
+
+class TestModuleList(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_module(self, name, num_functions):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            for i in range(num_functions):
+                f.write(f'def func_{i}(a):\n    return a + {i}\n\n')
+        return path
+
+    def test_is_module_list(self):
+        self.assertTrue(is_module_list('-'))
+        self.assertTrue(is_module_list('@modules.txt'))
+        self.assertFalse(is_module_list('pystats'))
+        self.assertFalse(is_module_list('module.py'))
+
+    def test_newline_separated(self):
+        stream = io.StringIO('a.py\r\nb/c.py\n\nd.py')
+
+        self.assertEqual(list(iter_paths(stream)), ['a.py', 'b/c.py', 'd.py'])
+
+    def test_nul_separated(self):
+        # As written by `git ls-files -z`: a newline in a path is kept
+        stream = io.StringIO('a.py\0odd\nname.py\0c.py\0')
+
+        self.assertEqual(list(iter_paths(stream)), ['a.py', 'odd\nname.py', 'c.py'])
+
+    def test_paths_across_chunks(self):
+        paths = [f'package/module_{i}.py' for i in range(100)]
+
+        self.assertEqual(list(iter_paths(io.StringIO('\n'.join(paths)), chunk_size=7)), paths)
+        self.assertEqual(list(iter_paths(io.StringIO('\0'.join(paths)), chunk_size=7)), paths)
+
+    def test_stdin(self):
+        self.addCleanup(setattr, sys, 'stdin', sys.stdin)
+        sys.stdin = io.StringIO('a.py\nb.py\n')
+
+        self.assertEqual(list(iter_module_list('-')), ['a.py', 'b.py'])
+
+    def test_discover_reads_the_list_lazily(self):
+        filenames = [self.write_module(f'mod_{i}.py', i) for i in range(3)]
+        argfile = os.path.join(self.tmpdir.name, 'modules.txt')
+        with open(argfile, 'w') as f:
+            f.write('\n'.join(filenames[1:]))
+
+        app = PyStatsApp()
+        module_paths, tree = app.discover([filenames[0], '@' + argfile])
+
+        self.assertNotIsInstance(module_paths, PathList)
+        self.assertEqual(tree, [])
+        app.analyze(module_paths, PackageContext.AVAILABLE_STATS)
+        self.assertEqual([m.filename for m in app.modules], filenames[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import random
+import unittest
+from bisect import bisect_left, bisect_right
+
+from pystats.utils.sketch import QuantileSketch
+
+
+class TestQuantileSketch(unittest.TestCase):
+    QUANTILES = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+    # Documented rank error for k=200 (about 1.7 / k), with a margin
+    MAX_RANK_ERROR = 0.01
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.values = [int(rng.lognormvariate(3, 1)) for _ in range(50000)]
+        self.sorted_values = sorted(self.values)
+
+    def rank_error(self, sketch, q):
+        """Returns the distance between q and the exact rank range of the estimate, as a fraction of the values."""
+        estimate = sketch.quantile(q)
+        n = len(self.sorted_values)
+        low = bisect_left(self.sorted_values, estimate) / n
+        high = bisect_right(self.sorted_values, estimate) / n
+        return 0 if low <= q <= high else min(abs(low - q), abs(high - q))
+
+    def test_exact_while_small(self):
+        sketch = QuantileSketch()
+        for value in range(1, 101):
+            sketch.update(value)
+        self.assertEqual([50, 90, 99], sketch.quantiles([0.5, 0.9, 0.99]))
+        self.assertEqual((1, 100), (sketch.min, sketch.max))
+
+    def test_error_bound(self):
+        sketch = QuantileSketch()
+        for value in self.values:
+            sketch.update(value)
+
+        self.assertEqual(len(self.values), sketch.count)
+        self.assertLess(sketch.num_items, 1000)
+        for q in self.QUANTILES:
+            self.assertLessEqual(self.rank_error(sketch, q), self.MAX_RANK_ERROR, q)
+
+    def test_merge_error_bound(self):
+        shards = [QuantileSketch(seed=shard) for shard in range(8)]
+        for i, value in enumerate(self.values):
+            shards[i % 8].update(value)
+
+        merged = QuantileSketch()
+        for shard in shards:
+            # Through JSON, as in partial result files
+            merged.merge(QuantileSketch.from_json(shard.to_json()))
+
+        self.assertEqual(len(self.values), merged.count)
+        self.assertEqual(max(self.values), merged.max)
+        for q in self.QUANTILES:
+            self.assertLessEqual(self.rank_error(merged, q), self.MAX_RANK_ERROR, q)
+
+    def test_empty(self):
+        sketch = QuantileSketch()
+        self.assertIsNone(sketch.quantile(0.5))
+        self.assertEqual(0, sketch.merge(QuantileSketch()).count)
@@ -0,0 +1,72 @@
+import os
+import tracemalloc
+import unittest
+
+from pystats.parsed_file import ParsedFile
+from pystats.utils.string_table import PathList, StringTable
+
+
+def allocated(build):
+    '''Returns what `build()` returns, and the memory it still holds.'''
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+class TestStringTable(unittest.TestCase):
+    PATHS = [
+        os.path.join('/repo', 'src', 'company', f'team_{d}', 'service', f'module_{m}.py')
+        for d in range(50) for m in range(100)
+    ]
+
+    def test_intern(self):
+        strings = StringTable()
+        first = strings.intern(''.join(['__init__', '(self)']))
+        second = strings.intern(''.join(['__init__', '(se', 'lf)']))
+
+        self.assertIs(first, second)
+        self.assertEqual(len(strings), 1)
+
+    def test_path_list_round_trip(self):
+        paths = ['a/b/c.py', 'c.py', '/abs/d.py', 'a//b.py', 'a/b/e.py']
+        path_list = PathList(paths)
+
+        self.assertEqual(list(path_list), paths)
+        self.assertEqual(path_list, paths)
+        self.assertEqual(path_list[1:3], paths[1:3])
+        self.assertEqual(len(path_list.strings.directories), 4)
+
+    def test_path_list_benchmark(self):
+        _, plain = allocated(lambda: [''.join(path) for path in self.PATHS])
+        _, interned = allocated(lambda: PathList(self.PATHS))
+
+        # 5000 paths in 50 directories: each directory is stored once
+        self.assertLess(interned, plain / 2)
+
+    def test_signature_benchmark(self):
+        lines = []
+        for c in range(20):
+            lines += [f'class Model{c}:', '    def __init__(self):', '        pass', '',
+                      '    def __repr__(self):', '        return ""', '']
+
+        def parse(strings):
+            modules = [ParsedFile(f'pkg/mod_{i}.py', lines, strings=strings) for i in range(100)]
+            for module in modules:
+                for class_block in module.classes:
+                    module.methods[class_block]
+            return modules
+
+        _, plain = allocated(lambda: parse(None))
+        modules, interned = allocated(lambda: parse(StringTable()))
+
+        self.assertIs(modules[0].methods[modules[0].classes[0]][0].signature,
+                      modules[1].methods[modules[1].classes[0]][0].signature)
+        self.assertLess(interned, plain)
+
+
+if __name__ == '__main__':
+    unittest.main()